@@ -0,0 +1,254 @@
+import multiprocessing
+import os
+import threading
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence
+from sqlalchemy import select, func, and_
+from sqlalchemy.orm import Session
+from config.config import config
+from fund_service.models import Fund, FundNetValue, FundStatus
+from news_service.models import News
+from .engine import BASE_CHANGE_RATE, DEFAULT_NET_VALUE
+from .impact import columnarize_news, impact_coefficient_matrix, keyword_overlap_matrix
+from .keyword_index import fund_keyword_index
+
+SECONDS_PER_DAY = 86400
+NEWS_WINDOW_SECONDS = 24 * 3600
+# 每个进程任务处理的基金数
+PARTITION_SIZE = 100
+
+# 所有回测请求共享的进程池（惰性创建）
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn：回测在请求线程池中运行，避免从多线程进程fork
+            _pool = ProcessPoolExecutor(
+                max_workers=config.calculation.BACKTEST_WORKERS or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+def _reset_pool(pool: ProcessPoolExecutor):
+    """工作进程异常退出后丢弃损坏的进程池，下次使用时重建"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+class BacktestInput:
+    """回测输入：全部以数组形式预先加载，可安全地分发到进程池"""
+
+    def __init__(self, fund_ids, start_date, days, news, fund_keyword_ids, start_net_values, stored_net_values):
+        self.fund_ids = list(fund_ids)
+        self.start_date = start_date
+        self.days = days
+        self.news = news
+        self.fund_keyword_ids = fund_keyword_ids
+        self.start_net_values = start_net_values
+        # 已存储净值矩阵 (天数, 基金数)，缺失为NaN
+        self.stored_net_values = stored_net_values
+
+    @property
+    def day_ends(self) -> np.ndarray:
+        """每个回测日的截止时间（UTC时间戳）"""
+        start_epoch = (self.start_date - datetime(1970, 1, 1)).total_seconds()
+        return start_epoch + SECONDS_PER_DAY * np.arange(1, self.days + 1, dtype=np.float64)
+
+    def dates(self) -> List[str]:
+        return [(self.start_date + timedelta(days=i)).date().isoformat() for i in range(self.days)]
+
+def prepare_backtest(db: Session, fund_ids: Optional[Sequence[str]] = None, days: Optional[int] = None,
+                     end_date: Optional[datetime] = None) -> BacktestInput:
+    """加载回测窗口内的新闻、基金关键词与已存储净值"""
+    days = days or config.calculation.BACKTESTING_DAYS
+    end_date = (end_date or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    start_date = end_date - timedelta(days=days)
+
+    if not fund_ids:
+        fund_ids = db.execute(
+            select(Fund.id).where(Fund.status == FundStatus.ACTIVE).order_by(Fund.id)
+        ).scalars().all()
+    fund_ids = list(fund_ids)
+    positions = {fund_id: j for j, fund_id in enumerate(fund_ids)}
+
+    # 新闻：回测首日需要前24小时的窗口
+    news_rows = db.execute(
+        select(News.id, News.sentiment_score, News.published_at, News.source, News.keywords)
+        .where(
+            News.published_at > start_date - timedelta(seconds=NEWS_WINDOW_SECONDS),
+            News.published_at <= end_date
+        )
+        .order_by(News.published_at.asc())
+    ).all()
+    # 先刷新索引再编码：冷启动进程中词表为空，新闻关键词会全部编为"未见"ID而失去关联性；
+    # 新闻与基金关键词取自同一个已刷新索引的词表（词表只增不改，已分配的ID不变）
+    fund_keyword_index.ensure_fresh()
+    news = columnarize_news(
+        [
+            {'id': news_id, 'sentiment_score': sentiment, 'published_at': published_at,
+             'source': source, 'keywords': keywords}
+            for news_id, sentiment, published_at, source, keywords in news_rows
+        ],
+        fund_keyword_index.keyword_vocab
+    )
+    fund_keyword_ids = fund_keyword_index.fund_keyword_ids(fund_ids)
+
+    # 起始净值：回测开始前最后一条已存储净值
+    start_net_values = np.full(len(fund_ids), DEFAULT_NET_VALUE, dtype=np.float64)
+    last_dates = (
+        select(FundNetValue.fund_id, func.max(FundNetValue.date).label('last_date'))
+        .where(FundNetValue.fund_id.in_(fund_ids), FundNetValue.date < start_date)
+        .group_by(FundNetValue.fund_id)
+        .subquery()
+    )
+    for fund_id, net_value in db.execute(
+        select(FundNetValue.fund_id, FundNetValue.net_value).join(
+            last_dates,
+            and_(FundNetValue.fund_id == last_dates.c.fund_id, FundNetValue.date == last_dates.c.last_date)
+        )
+    ):
+        start_net_values[positions[fund_id]] = net_value
+
+    # 回测窗口内的已存储净值，用于对比
+    stored_net_values = np.full((days, len(fund_ids)), np.nan, dtype=np.float64)
+    for fund_id, nav_date, net_value in db.execute(
+        select(FundNetValue.fund_id, FundNetValue.date, FundNetValue.net_value)
+        .where(
+            FundNetValue.fund_id.in_(fund_ids),
+            FundNetValue.date >= start_date,
+            FundNetValue.date < end_date
+        )
+    ):
+        stored_net_values[(nav_date - start_date).days, positions[fund_id]] = net_value
+
+    return BacktestInput(fund_ids, start_date, days, news, fund_keyword_ids, start_net_values, stored_net_values)
+
+def simulate_paths(news: Dict, fund_keyword_ids, start_net_values: np.ndarray, day_ends: np.ndarray) -> np.ndarray:
+    """按天重放新闻，计算一组基金的净值路径 (天数, 基金数)
+
+    每天的新闻影响系数取截至当天、24小时窗口内新闻对基金影响系数的均值；
+    由于限幅以前一日净值为基准，日净值比值 = clip((1+基础变化率)×影响系数, 1-限幅, 1+限幅)，
+    净值路径为起始净值乘以比值的累积乘积
+    """
+    fund_count = len(start_net_values)
+    published_at = news['published_at']
+    overlap = keyword_overlap_matrix(news['keyword_ids'], fund_keyword_ids)
+
+    window_starts = np.searchsorted(published_at, day_ends - NEWS_WINDOW_SECONDS, side='right')
+    window_ends = np.searchsorted(published_at, day_ends, side='right')
+
+    coefficients = np.ones((len(day_ends), fund_count), dtype=np.float64)
+    for day, (lo, hi, day_end) in enumerate(zip(window_starts, window_ends, day_ends)):
+        if hi > lo:
+            coefficients[day] = impact_coefficient_matrix(
+                news['sentiment'][lo:hi],
+                published_at[lo:hi],
+                news['source_code'][lo:hi],
+                None,
+                None,
+                now=day_end,
+                overlap=overlap[lo:hi]
+            ).mean(axis=0)
+
+    max_daily_change = config.calculation.MAX_DAILY_CHANGE
+    ratios = np.clip((1 + BASE_CHANGE_RATE) * coefficients, 1 - max_daily_change, 1 + max_daily_change)
+    return start_net_values * np.cumprod(ratios, axis=0)
+
+def path_statistics(path: np.ndarray, stored: np.ndarray, start_net_value: float) -> Dict:
+    """单个基金回测路径的汇总统计及与已存储净值的对比"""
+    series = np.concatenate(([start_net_value], path))
+    returns = series[1:] / series[:-1] - 1.0
+    drawdowns = series / np.maximum.accumulate(series) - 1.0
+
+    stats = {
+        'start_net_value': float(start_net_value),
+        'end_net_value': float(path[-1]) if len(path) else float(start_net_value),
+        'total_return': float(path[-1] / start_net_value - 1.0) * 100 if len(path) else 0.0,
+        'daily_volatility': float(np.std(returns)) * 100 if len(returns) else 0.0,
+        'max_drawdown': float(drawdowns.min()) * 100,
+        'compared_days': 0,
+        'mean_abs_error': None,
+        'rmse': None
+    }
+    observed = ~np.isnan(stored)
+    if observed.any():
+        errors = path[observed] - stored[observed]
+        stats['compared_days'] = int(observed.sum())
+        stats['mean_abs_error'] = float(np.abs(errors).mean())
+        stats['rmse'] = float(np.sqrt((errors ** 2).mean()))
+    return stats
+
+def _backtest_partition(news, fund_ids, fund_keyword_ids, start_net_values, stored_net_values, day_ends):
+    """进程池任务：回测一个基金分区"""
+    paths = simulate_paths(news, fund_keyword_ids, start_net_values, day_ends)
+    return [
+        {
+            'fund_id': fund_id,
+            'net_values': np.round(paths[:, j], 4).tolist(),
+            'statistics': path_statistics(paths[:, j], stored_net_values[:, j], start_net_values[j])
+        }
+        for j, fund_id in enumerate(fund_ids)
+    ]
+
+def stream_backtest(backtest: BacktestInput, partition_size: int = PARTITION_SIZE) -> Iterator[Dict]:
+    """按基金分区在共享进程池中并行回测，分区完成即逐个产出基金结果，最后产出汇总
+
+    客户端断开（生成器被关闭）时取消尚未开始的分区
+    """
+    started = time.perf_counter()
+    day_ends = backtest.day_ends
+    errors = []
+
+    yield {'type': 'dates', 'dates': backtest.dates()}
+
+    pool = _get_pool()
+    futures = []
+    try:
+        for start in range(0, len(backtest.fund_ids), partition_size):
+            stop = start + partition_size
+            futures.append(pool.submit(
+                _backtest_partition,
+                backtest.news,
+                backtest.fund_ids[start:stop],
+                backtest.fund_keyword_ids[start:stop],
+                backtest.start_net_values[start:stop],
+                backtest.stored_net_values[:, start:stop],
+                day_ends
+            ))
+        for future in as_completed(futures):
+            for result in future.result():
+                if result['statistics']['mean_abs_error'] is not None:
+                    errors.append(result['statistics']['mean_abs_error'])
+                yield dict(result, type='fund')
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+
+    elapsed = time.perf_counter() - started
+    yield {
+        'type': 'summary',
+        'funds': len(backtest.fund_ids),
+        'days': backtest.days,
+        'news_items': len(backtest.news['ids']),
+        'mean_abs_error': float(np.mean(errors)) if errors else None,
+        'elapsed_seconds': round(elapsed, 3)
+    }
\ No newline at end of file
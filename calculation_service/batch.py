@@ -0,0 +1,147 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+from common.cache import cache
+from common.monitoring import StageTimer
+from .engine import (
+    latest_cache_key, load_previous_net_values,
+    adjustment_factor_from_params, compute_net_values, build_results
+)
+from .run_context import CalculationRunContext
+from .writer import result_writer
+
+# 保留分阶段耗时汇总的最近运行数
+MAX_BATCH_SUMMARIES = 50
+
+# 按运行ID保存的批量计算汇总：同一运行的多个分区/块合并为一条
+_batch_summaries: "OrderedDict[str, Dict]" = OrderedDict()
+_batch_summaries_lock = threading.Lock()
+
+def _record_news_impacts(run_context, fund_ids, impact_matrix, overlap):
+    """记录批量计算中与基金关键词有交集的 (新闻, 基金) 影响（写后批量落库）"""
+    news_items = run_context.snapshot.news_items
+    factors = {}
+    for i, j in zip(*np.nonzero(overlap)):
+        news = news_items[i]
+        if i not in factors:
+            factors[i] = {
+                'sentiment_score': news.get('sentiment_score', 0),
+                'source': news.get('source', ''),
+                'published_at': news.get('published_at', ''),
+                'news_snapshot_id': run_context.snapshot.snapshot_id
+            }
+        result_writer.add_news_impact(
+            news['id'],
+            fund_ids[j],
+            float(impact_matrix[i, j]),
+            factors=factors[i],
+            source_news_impact=news.get('impact_coefficient', 0)
+        )
+
+def batch_calculate_fund_net_values(fund_ids, date=None, include_news_impact=True, params=None, db=None, run_context=None,
+                                    timer=None):
+    """批量计算基金净值
+
+    上一期净值通过一次MGET批量加载；新闻窗口在整个运行中只拉取一次，
+    作为不可变快照由所有基金共享，影响系数矩阵一次算出；
+    净值公式与限幅在NumPy数组上一次完成
+    """
+    timer = timer or StageTimer("batch")
+    if date is None:
+        date = datetime.utcnow()
+    
+    with timer.stage("cache_lookup"):
+        previous_net_values = load_previous_net_values(fund_ids, db)
+    news_impact_coefficients = np.ones(len(fund_ids), dtype=np.float64)
+    news_impact_counts = np.zeros(len(fund_ids), dtype=np.int64)
+    
+    if include_news_impact:
+        if run_context is None:
+            with timer.stage("news_fetch"):
+                run_context = CalculationRunContext.create()
+        with timer.stage("impact"):
+            news_impact_coefficients, news_impact_counts, impact_matrix, overlap = run_context.news_factors(fund_ids)
+        if db:
+            with timer.stage("impact_record"):
+                _record_news_impacts(run_context, fund_ids, impact_matrix, overlap)
+    
+    with timer.stage("compute"):
+        net_values, change_percentages = compute_net_values(
+            previous_net_values,
+            news_impact_coefficients,
+            adjustment_factor_from_params(params)
+        )
+        return build_results(net_values, previous_net_values, change_percentages, news_impact_counts)
+
+def run_batch_calculation(fund_ids: list, db: Session, run_context=None):
+    """一次向量化计算全部基金，日志写后批量落库，缓存单次pipeline写入"""
+    timer = StageTimer("batch")
+    calculation_time = datetime.utcnow()
+    if run_context is None:
+        with timer.stage("news_fetch"):
+            run_context = CalculationRunContext.create()
+    results = batch_calculate_fund_net_values(fund_ids, db=db, run_context=run_context, timer=timer)
+    
+    input_params = run_context.input_params(
+        date=None,
+        include_news_impact=True,
+        parameters=None
+    )
+    with timer.stage("log_write"):
+        for fund_id, result in zip(fund_ids, results):
+            result_writer.add_calculation_log(
+                fund_id,
+                input_params=input_params,
+                result=result['net_value'],
+                status="success"
+            )
+    
+    # 更新缓存（与标量路径一致不设过期时间，下一轮计算以此为上一期净值）
+    with timer.stage("cache_update"):
+        cache.set_many({
+            latest_cache_key(fund_id): {
+                'fund_id': fund_id,
+                'net_value': result['net_value'],
+                'calculation_time': calculation_time.isoformat()
+            }
+            for fund_id, result in zip(fund_ids, results)
+        }, expire_seconds=None)
+    _record_batch_summary(run_context.run_id, timer.finish(len(fund_ids)))
+    return results
+
+def _merge_summary(merged: Dict, summary: Dict):
+    """将一个分区的汇总并入运行汇总：次数与耗时累加，分位数取最新的样本窗口值"""
+    merged['batches'] += 1
+    merged['fund_count'] += summary['fund_count']
+    merged['total_seconds'] = round(merged['total_seconds'] + summary['total_seconds'], 6)
+    merged['funds_per_second'] = (
+        round(merged['fund_count'] / merged['total_seconds'], 2) if merged['total_seconds'] > 0 else 0.0
+    )
+    for name, stage in summary['stages'].items():
+        previous = merged['stages'].get(name)
+        if previous is not None:
+            stage = dict(stage, count=previous['count'] + stage['count'],
+                         total_seconds=round(previous['total_seconds'] + stage['total_seconds'], 6))
+        merged['stages'][name] = stage
+
+def _record_batch_summary(run_id: str, summary: Dict):
+    with _batch_summaries_lock:
+        merged = _batch_summaries.pop(run_id, None)
+        if merged is None:
+            merged = dict(summary, run_id=run_id, batches=1, stages=dict(summary['stages']))
+        else:
+            _merge_summary(merged, summary)
+        _batch_summaries[run_id] = merged
+        while len(_batch_summaries) > MAX_BATCH_SUMMARIES:
+            _batch_summaries.popitem(last=False)
+
+def batch_summary(run_id: Optional[str] = None) -> Optional[Dict]:
+    """指定运行（默认最近更新的运行）的分阶段耗时汇总，total_seconds为各分区耗时之和"""
+    with _batch_summaries_lock:
+        if run_id is None:
+            run_id = next(reversed(_batch_summaries), None)
+        summary = _batch_summaries.get(run_id)
+        return dict(summary, stages=dict(summary['stages'])) if summary else None
\ No newline at end of file
@@ -0,0 +1,185 @@
+import asyncio
+import threading
+from typing import Dict, List, Optional
+import httpx
+from config.config import config
+
+class ServiceCallError(Exception):
+    """服务间调用失败（超时、连接错误或非预期状态码）"""
+
+class NewsServiceClient:
+    """计算服务访问新闻服务的异步客户端
+
+    - 持久连接池（keep-alive），所有调用复用同一个httpx.AsyncClient
+    - 信号量限制并发请求数，避免慢服务拖垮计算服务
+    - 每次调用有截止时间，超时抛出ServiceCallError；分页拉取新闻窗口另有跨页的总截止时间
+    - 请求对冲：首个请求在hedge_delay内未返回时并行发起第二个，取先成功者
+
+    客户端绑定在一个专用的后台事件循环上，同步代码通过call()调用，
+    异步代码通过await acall()调用，二者共享同一个连接池。
+    """
+
+    def __init__(self, base_url: Optional[str] = None, timeout: Optional[float] = None,
+                 max_connections: Optional[int] = None, max_concurrency: Optional[int] = None,
+                 hedge_delay: Optional[float] = None, window_deadline: Optional[float] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        settings = config.microservices
+        self.base_url = (base_url or settings.NEWS_SERVICE_URL).rstrip('/')
+        self.timeout = timeout if timeout is not None else settings.CLIENT_TIMEOUT
+        self.max_connections = max_connections or settings.CLIENT_MAX_CONNECTIONS
+        self.max_concurrency = max_concurrency or settings.CLIENT_MAX_CONCURRENCY
+        self.hedge_delay = hedge_delay if hedge_delay is not None else settings.CLIENT_HEDGE_DELAY
+        self.window_deadline = window_deadline if window_deadline is not None else settings.CLIENT_WINDOW_DEADLINE
+        self._transport = transport
+        self._client = None
+        self._semaphore = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # 后台事件循环
+    def _ensure_loop(self):
+        """启动专用的后台事件循环线程（仅一次）"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="news-service-client",
+                    daemon=True
+                )
+                self._thread.start()
+        return self._loop
+
+    def submit(self, coro):
+        """将协程提交到客户端的事件循环，返回concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def call(self, coro):
+        """在同步代码中执行客户端协程并等待结果"""
+        return self.submit(coro).result()
+
+    async def acall(self, coro):
+        """在其他事件循环中执行客户端协程并等待结果"""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def close(self):
+        """关闭连接池并停止后台事件循环"""
+        if self._loop is None:
+            return
+        if self._client is not None:
+            self.call(self._client.aclose())
+            self._client = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+
+    # HTTP调用
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                transport=self._transport
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def _send(self, path: str, params: Optional[Dict]) -> httpx.Response:
+        client = self._get_client()
+        async with self._semaphore:
+            return await client.get(path, params=params)
+
+    async def _hedged_get(self, path: str, params: Optional[Dict]) -> httpx.Response:
+        """对冲请求：首个请求慢于hedge_delay时追加一个请求，返回先成功的响应"""
+        primary = asyncio.ensure_future(self._send(path, params))
+        if not self.hedge_delay:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay)
+        if done:
+            return primary.result()
+
+        pending = {primary, asyncio.ensure_future(self._send(path, params))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get(self, path: str, params: Optional[Dict] = None, deadline: Optional[float] = None) -> httpx.Response:
+        """带截止时间的GET请求"""
+        deadline = deadline if deadline is not None else self.timeout
+        try:
+            return await asyncio.wait_for(self._hedged_get(path, params), deadline)
+        except asyncio.TimeoutError:
+            raise ServiceCallError(f"GET {path} exceeded deadline of {deadline}s")
+        except httpx.HTTPError as e:
+            raise ServiceCallError(f"GET {path} failed: {str(e)}")
+
+    # 新闻服务接口
+    async def get_news(self, news_id: str, deadline: Optional[float] = None) -> Optional[dict]:
+        """获取新闻详情，不存在时返回None"""
+        response = await self.get(f"/news/{news_id}", deadline=deadline)
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise ServiceCallError(f"News service returned {response.status_code}")
+        return response.json()
+
+    async def get_latest_news(self, hours: int = 24, limit: int = 10, offset: int = 0,
+                              fund_id: Optional[str] = None, deadline: Optional[float] = None) -> List[dict]:
+        """获取最新新闻的一页"""
+        params = {'hours': hours, 'limit': limit, 'offset': offset}
+        if fund_id:
+            params['fund_id'] = fund_id
+        response = await self.get("/news/latest", params=params, deadline=deadline)
+        if response.status_code != 200:
+            raise ServiceCallError(f"News service returned {response.status_code}")
+        return response.json()
+
+    async def get_news_window(self, hours: int = 24, page_size: int = 500,
+                              deadline: Optional[float] = None) -> List[dict]:
+        """分页拉取整个新闻时间窗口
+
+        deadline为所有分页共享的总截止时间，每页的截止时间取单次超时与剩余时间中的较小者；
+        按offset分页时新插入的新闻会使后续页整体后移，重复出现的新闻按ID去重
+        """
+        deadline = deadline if deadline is not None else self.window_deadline
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + deadline
+        news_items = []
+        seen_ids = set()
+        offset = 0
+        while True:
+            remaining = expires_at - loop.time()
+            if remaining <= 0:
+                raise ServiceCallError(f"News window exceeded deadline of {deadline}s after {len(news_items)} items")
+            page = await self.get_latest_news(hours=hours, limit=page_size, offset=offset,
+                                              deadline=min(self.timeout, remaining))
+            for news in page:
+                news_id = news.get('id')
+                if news_id is not None:
+                    if news_id in seen_ids:
+                        continue
+                    seen_ids.add(news_id)
+                news_items.append(news)
+            if len(page) < page_size:
+                return news_items
+            offset += page_size
+
+# 计算服务共享的新闻服务客户端
+news_client = NewsServiceClient()
\ No newline at end of file
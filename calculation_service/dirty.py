@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from common.cache import cache
+from fund_service.models import Fund, FundStatus
+from .keyword_index import fund_keyword_index
+
+# 待重算基金集合（Redis Set，多个计算进程共享）
+DIRTY_FUNDS_KEY = "calc:dirty_funds"
+# 基金类型映射的刷新间隔（秒），之后新建的基金在刷新后才会被按类型标记
+FUND_TYPES_REFRESH_SECONDS = 300
+
+def _fund_type_value(fund_type) -> str:
+    return str(getattr(fund_type, 'value', fund_type)).lower()
+
+class DirtyFundTracker:
+    """按新闻到达追踪需要重算净值的基金
+
+    新闻处理后，只有关键词与之有交集、或基金类型与新闻分类匹配的基金被标记为待重算；
+    重算时取出并清空待重算集合，其余基金沿用缓存中的净值与新闻因子；重算失败时调用方需重新标记。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local_dirty: Set[str] = set()
+        self._funds_by_type: Dict[str, Set[str]] = {}
+        self.fund_types_loaded = False
+        self._fund_types_loaded_at = 0.0
+
+    def load_fund_types(self, db: Session):
+        """加载活跃基金的类型映射"""
+        rows = db.execute(
+            select(Fund.id, Fund.fund_type).where(Fund.status == FundStatus.ACTIVE)
+        ).all()
+        funds_by_type = {}
+        for fund_id, fund_type in rows:
+            funds_by_type.setdefault(_fund_type_value(fund_type), set()).add(fund_id)
+        with self._lock:
+            self._funds_by_type = funds_by_type
+            self.fund_types_loaded = True
+            self._fund_types_loaded_at = time.monotonic()
+
+    def ensure_fund_types(self, db: Session):
+        """首次使用或超过FUND_TYPES_REFRESH_SECONDS后重新加载基金类型映射"""
+        if not self.fund_types_loaded or time.monotonic() - self._fund_types_loaded_at >= FUND_TYPES_REFRESH_SECONDS:
+            self.load_fund_types(db)
+
+    def affected_funds(self, keywords: Optional[Iterable[str]] = None,
+                       fund_types: Optional[Iterable[str]] = None) -> Set[str]:
+        """计算一条新闻影响到的基金：关键词有交集的基金 ∪ 类型匹配的基金"""
+        fund_keyword_index.ensure_fresh()
+        affected = set(fund_keyword_index.match(keywords or ()))
+        with self._lock:
+            for fund_type in fund_types or ():
+                affected |= self._funds_by_type.get(_fund_type_value(fund_type), set())
+        return affected
+
+    def mark(self, fund_ids: Iterable[str]):
+        """将基金标记为待重算"""
+        fund_ids = list(fund_ids)
+        if not fund_ids:
+            return
+        if cache.client:
+            try:
+                cache.client.sadd(DIRTY_FUNDS_KEY, *fund_ids)
+                return
+            except Exception as e:
+                print(f"Redis sadd error: {str(e)}")
+        with self._lock:
+            self._local_dirty.update(fund_ids)
+
+    def mark_news(self, keywords: Optional[Iterable[str]] = None,
+                  fund_types: Optional[Iterable[str]] = None) -> Set[str]:
+        """新闻到达时标记受影响的基金，返回被标记的基金ID"""
+        affected = self.affected_funds(keywords, fund_types)
+        self.mark(affected)
+        return affected
+
+    def drain(self) -> List[str]:
+        """原子地取出并清空待重算集合"""
+        fund_ids = set()
+        if cache.client:
+            try:
+                pipe = cache.client.pipeline(transaction=True)
+                pipe.smembers(DIRTY_FUNDS_KEY)
+                pipe.delete(DIRTY_FUNDS_KEY)
+                members, _ = pipe.execute()
+                fund_ids.update(members)
+            except Exception as e:
+                print(f"Redis drain error: {str(e)}")
+        with self._lock:
+            fund_ids |= self._local_dirty
+            self._local_dirty = set()
+        return sorted(fund_ids)
+
+    def pending_count(self) -> int:
+        """待重算基金数量"""
+        count = 0
+        if cache.client:
+            try:
+                count = cache.client.scard(DIRTY_FUNDS_KEY)
+            except Exception as e:
+                print(f"Redis scard error: {str(e)}")
+        with self._lock:
+            return count + len(self._local_dirty)
+
+# 进程级追踪器实例
+dirty_fund_tracker = DirtyFundTracker()
\ No newline at end of file
@@ -0,0 +1,93 @@
+import numpy as np
+from typing import List, Optional, Dict
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from common.cache import cache
+from config.config import config
+from database.database import SessionLocal
+from fund_service.models import Fund
+
+# 净值计算公共参数（标量路径与批量路径共用，保证结果一致）
+BASE_CHANGE_RATE = 0.001  # 假设每日基础变化率为0.1%
+DEFAULT_NET_VALUE = 1.0  # 默认初始净值
+
+def latest_cache_key(fund_id: str) -> str:
+    """基金最新净值的缓存键"""
+    return f"fund_latest:{fund_id}"
+
+def load_db_net_values(fund_ids: List[str], db: Optional[Session] = None) -> Dict[str, float]:
+    """缓存未命中时从funds表一次查询基金的最新净值"""
+    if not fund_ids:
+        return {}
+    session = db or SessionLocal()
+    try:
+        rows = session.execute(select(Fund.id, Fund.latest_nav).where(Fund.id.in_(list(fund_ids)))).all()
+        return {fund_id: latest_nav for fund_id, latest_nav in rows if latest_nav is not None}
+    except Exception as e:
+        print(f"Error loading latest net values: {e}")
+        return {}
+    finally:
+        if db is None:
+            session.close()
+
+def load_previous_net_values(fund_ids: List[str], db: Optional[Session] = None) -> np.ndarray:
+    """一次MGET批量加载基金的上一期净值；缓存未命中的基金回退到数据库中的最新净值，
+    数据库中也没有时才使用默认初始净值"""
+    cached = cache.get_many([latest_cache_key(fund_id) for fund_id in fund_ids])
+    values = {
+        fund_id: item['net_value']
+        for fund_id, item in zip(fund_ids, cached) if item and item.get('net_value') is not None
+    }
+    missing = [fund_id for fund_id in fund_ids if fund_id not in values]
+    if missing:
+        values.update(load_db_net_values(missing, db))
+    return np.array([values.get(fund_id, DEFAULT_NET_VALUE) for fund_id in fund_ids], dtype=np.float64)
+
+def adjustment_factor_from_params(params: Optional[Dict]) -> float:
+    """根据计算参数得到调整因子"""
+    if params and 'adjustment' in params:
+        return 1.0 + params['adjustment']
+    return 1.0
+
+def compute_net_values(previous_net_values, news_impact_coefficients, adjustment_factors=1.0):
+    """向量化计算净值
+
+    与calculate_fund_net_value的标量公式逐元素一致：
+    基础变化率 -> 新闻影响系数 -> 调整因子 -> ±MAX_DAILY_CHANGE限幅
+    返回 (净值数组, 变化百分比数组)，均未做四舍五入
+    """
+    previous = np.asarray(previous_net_values, dtype=np.float64)
+    news_coef = np.broadcast_to(np.asarray(news_impact_coefficients, dtype=np.float64), previous.shape)
+    adjustment = np.broadcast_to(np.asarray(adjustment_factors, dtype=np.float64), previous.shape)
+
+    # 运算顺序与标量路径保持一致，保证浮点结果逐位相同
+    net_values = previous * (1 + BASE_CHANGE_RATE) * news_coef * adjustment
+
+    # 应用净值限制（防止异常波动）
+    max_daily_change = config.calculation.MAX_DAILY_CHANGE
+    lower = previous * (1 - max_daily_change)
+    upper = previous * (1 + max_daily_change)
+    net_values = np.maximum(lower, np.minimum(upper, net_values))
+
+    change_percentages = ((net_values - previous) / previous) * 100
+    return net_values, change_percentages
+
+def build_results(net_values, previous_net_values, change_percentages, news_impact_counts) -> List[Dict]:
+    """将数组结果转换为与标量路径相同格式的结果字典
+
+    使用Python内置round，避免np.round在个别小数上与标量路径的舍入结果不同
+    """
+    return [
+        {
+            'net_value': round(net_value, 4),
+            'previous_net_value': previous,
+            'change_percentage': round(change, 2),
+            'news_impact_count': int(count)
+        }
+        for net_value, previous, change, count in zip(
+            net_values.tolist(),
+            np.asarray(previous_net_values, dtype=np.float64).tolist(),
+            change_percentages.tolist(),
+            np.asarray(news_impact_counts).tolist()
+        )
+    ]
\ No newline at end of file
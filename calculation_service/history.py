@@ -0,0 +1,54 @@
+import numpy as np
+from datetime import datetime
+from typing import Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from fund_service.models import FundNetValue
+
+# 1970-01-01是星期四，偏移3天后按7整除即得到以周一为起点的自然周编号
+_WEEK_OFFSET_DAYS = 3
+
+def load_net_value_series(db: Session, fund_id: str, start_date: datetime, end_date: datetime) -> Tuple[np.ndarray, np.ndarray]:
+    """一次索引查询读取区间内的净值序列
+
+    只查询日期与净值两列，不构造ORM对象；返回 (日期数组datetime64[s], 净值数组float64)
+    """
+    rows = db.execute(
+        select(FundNetValue.date, FundNetValue.net_value)
+        .where(
+            FundNetValue.fund_id == fund_id,
+            FundNetValue.date >= start_date,
+            FundNetValue.date <= end_date
+        )
+        .order_by(FundNetValue.date.asc())
+    ).all()
+    if not rows:
+        return np.empty(0, dtype='datetime64[s]'), np.empty(0, dtype=np.float64)
+    dates, net_values = zip(*rows)
+    return np.array(dates, dtype='datetime64[s]'), np.array(net_values, dtype=np.float64)
+
+def period_keys(dates: np.ndarray, frequency: str) -> np.ndarray:
+    """按自然日/自然周（周一起）/自然月计算每个日期所属周期的编号"""
+    days = dates.astype('datetime64[D]').astype(np.int64)
+    if frequency == 'daily':
+        return days
+    if frequency == 'weekly':
+        return (days + _WEEK_OFFSET_DAYS) // 7
+    if frequency == 'monthly':
+        return dates.astype('datetime64[M]').astype(np.int64)
+    raise ValueError(f"Unsupported frequency: {frequency}")
+
+def resample_last(dates: np.ndarray, net_values: np.ndarray, frequency: str) -> Tuple[np.ndarray, np.ndarray]:
+    """按周期边界重采样，每个周期取最后一个观测值（日期需升序）"""
+    if len(dates) == 0:
+        return dates, net_values
+    keys = period_keys(dates, frequency)
+    last_in_period = np.flatnonzero(np.append(keys[1:] != keys[:-1], True))
+    return dates[last_in_period], net_values[last_in_period]
+
+def change_percentages(net_values: np.ndarray) -> np.ndarray:
+    """相邻两期的变化百分比，首期为NaN"""
+    changes = np.full(len(net_values), np.nan, dtype=np.float64)
+    if len(net_values) > 1:
+        changes[1:] = (net_values[1:] / net_values[:-1] - 1.0) * 100
+    return changes
\ No newline at end of file
@@ -0,0 +1,252 @@
+import numpy as np
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+import time
+
+# 新闻来源可靠性权重（模块级常量，避免每次计算重建）
+SOURCE_RELIABILITY = {
+    'xinhua': 0.9,
+    'people': 0.85,
+    'cnn': 0.8,
+    'reuters': 0.85,
+    'bbc': 0.8,
+    'bloomberg': 0.85
+}
+DEFAULT_SOURCE_RELIABILITY = 0.7
+
+# 来源编码：按SOURCE_RELIABILITY的顺序编号，未知来源编码为-1
+SOURCE_CODES = {source: code for code, source in enumerate(SOURCE_RELIABILITY)}
+UNKNOWN_SOURCE_CODE = -1
+# 按来源编码查表的权重数组，最后一位对应未知来源（编码-1）
+_SOURCE_WEIGHT_TABLE = np.array(
+    list(SOURCE_RELIABILITY.values()) + [DEFAULT_SOURCE_RELIABILITY],
+    dtype=np.float64
+)
+
+# 影响系数参数
+TIME_DECAY_HOURS = 24 * 7  # 一周内的新闻权重递减
+MIN_TIME_WEIGHT = 0.1
+KEYWORD_RELEVANCE_STEP = 0.1
+MIN_IMPACT = 0.1
+MAX_IMPACT = 2.0
+
+def encode_source(source: str) -> int:
+    """将新闻来源编码为整数"""
+    return SOURCE_CODES.get((source or '').lower(), UNKNOWN_SOURCE_CODE)
+
+def parse_published_at(published_at) -> datetime:
+    """解析新闻发布时间（ISO字符串或datetime），返回UTC的naive datetime"""
+    if isinstance(published_at, str):
+        published_at = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
+    if published_at.tzinfo is not None:
+        published_at = published_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return published_at
+
+def to_epoch(published_at) -> float:
+    """将新闻发布时间转换为UTC时间戳（秒）"""
+    return parse_published_at(published_at).replace(tzinfo=timezone.utc).timestamp()
+
+def decay_bucket_start(now: datetime, bucket_seconds: int) -> datetime:
+    """now所在时间衰减分桶的起点（UTC naive datetime）
+
+    标量与批量计算统一以此作为时间衰减的计算时间，同一分桶内结果一致
+    """
+    epoch = (now - datetime(1970, 1, 1)).total_seconds()
+    return datetime.utcfromtimestamp(int(epoch // bucket_seconds) * bucket_seconds)
+
+def encode_keywords(keywords, keyword_vocab: Dict[str, int], unseen_vocab: Dict[str, int]) -> List[int]:
+    """将关键词列表编码为去重后的关键词ID列表
+
+    keyword_vocab为共享词表，只读不写；不在其中的关键词不可能与任何基金重合，
+    在本次调用的unseen_vocab中编为负数ID，不会与共享词表的ID冲突
+    """
+    ids = set()
+    for keyword in keywords or []:
+        keyword_id = keyword_vocab.get(keyword)
+        if keyword_id is None:
+            keyword_id = unseen_vocab.setdefault(keyword, -1 - len(unseen_vocab))
+        ids.add(keyword_id)
+    return sorted(ids)
+
+def columnarize_news(news_items: Sequence[dict], keyword_vocab: Dict[str, int]) -> Dict:
+    """将新闻字典列表转换为列式数组
+
+    返回字段：ids、sentiment（缺失为NaN）、published_at（UTC时间戳）、
+    source_code（来源编码）、keyword_ids（每条新闻的关键词ID列表）
+    """
+    count = len(news_items)
+    sentiment = np.full(count, np.nan, dtype=np.float64)
+    published_at = np.zeros(count, dtype=np.float64)
+    source_code = np.full(count, UNKNOWN_SOURCE_CODE, dtype=np.int64)
+    keyword_ids = []
+    unseen_vocab: Dict[str, int] = {}
+
+    for i, news in enumerate(news_items):
+        if news.get('sentiment_score') is not None:
+            sentiment[i] = news['sentiment_score']
+        if news.get('published_at'):
+            published_at[i] = to_epoch(news['published_at'])
+        source_code[i] = encode_source(news.get('source', ''))
+        keyword_ids.append(encode_keywords(news.get('keywords'), keyword_vocab, unseen_vocab))
+
+    return {
+        'ids': [news.get('id') for news in news_items],
+        'sentiment': sentiment,
+        'published_at': published_at,
+        'source_code': source_code,
+        'keyword_ids': keyword_ids
+    }
+
+def keyword_overlap_matrix(news_keyword_ids: Sequence[Sequence[int]],
+                           fund_keyword_ids: Sequence[Optional[Sequence[int]]]) -> np.ndarray:
+    """计算新闻×基金的关键词交集大小矩阵
+
+    只在新闻中出现过的关键词上构建指示矩阵，用一次矩阵乘法得到全部交集大小
+    """
+    news_count = len(news_keyword_ids)
+    fund_count = len(fund_keyword_ids)
+
+    # 将新闻关键词重映射到紧凑的局部词表
+    local_vocab = {}
+    for ids in news_keyword_ids:
+        for keyword_id in ids:
+            local_vocab.setdefault(keyword_id, len(local_vocab))
+    if not local_vocab or fund_count == 0:
+        return np.zeros((news_count, fund_count), dtype=np.int64)
+
+    news_matrix = np.zeros((news_count, len(local_vocab)), dtype=np.float32)
+    for i, ids in enumerate(news_keyword_ids):
+        news_matrix[i, [local_vocab[keyword_id] for keyword_id in ids]] = 1.0
+
+    fund_matrix = np.zeros((fund_count, len(local_vocab)), dtype=np.float32)
+    for j, ids in enumerate(fund_keyword_ids):
+        columns = [local_vocab[keyword_id] for keyword_id in ids or () if keyword_id in local_vocab]
+        fund_matrix[j, columns] = 1.0
+
+    # 交集大小为小整数，float32矩阵乘法结果精确
+    return np.rint(news_matrix @ fund_matrix.T).astype(np.int64)
+
+def impact_coefficient_matrix(sentiment, published_at, source_code,
+                              news_keyword_ids: Sequence[Sequence[int]],
+                              fund_keyword_ids: Sequence[Optional[Sequence[int]]],
+                              now: Optional[float] = None,
+                              overlap: Optional[np.ndarray] = None) -> np.ndarray:
+    """批量计算新闻×基金的影响系数矩阵
+
+    与calculate_impact_coefficient的语义一致：时间衰减、来源权重、
+    关键词关联乘数及0.1-2.0限幅；情感得分缺失（NaN）的新闻影响系数为1.0。
+    fund_keyword_ids中的None表示该基金没有关键词数据（关联乘数为1.0）。
+    overlap可传入预先计算好的交集大小矩阵（如来自关键词倒排索引）。
+    返回形状为 (新闻数, 基金数) 的数组
+    """
+    sentiment = np.asarray(sentiment, dtype=np.float64)
+    published_at = np.asarray(published_at, dtype=np.float64)
+    source_code = np.asarray(source_code, dtype=np.int64)
+    if now is None:
+        now = time.time()
+
+    # 基于发布时间的权重 - 越新的新闻权重越高
+    time_diff_hours = (now - published_at) / 3600
+    time_weight = np.maximum(MIN_TIME_WEIGHT, 1.0 - (time_diff_hours / TIME_DECAY_HOURS))
+
+    # 基于来源的权重（编码-1正好索引到表尾的默认权重）
+    source_weight = _SOURCE_WEIGHT_TABLE[source_code]
+
+    # 将情感得分映射到0.5-1.5范围
+    base_impact = 0.5 + (sentiment + 1.0) * 0.5
+    news_factor = base_impact * time_weight * source_weight
+
+    # 关联性乘数
+    if overlap is None:
+        overlap = keyword_overlap_matrix(news_keyword_ids, fund_keyword_ids)
+    relevance_multiplier = 1.0 + (KEYWORD_RELEVANCE_STEP * overlap)
+
+    final_impact = np.clip(news_factor[:, None] * relevance_multiplier, MIN_IMPACT, MAX_IMPACT)
+
+    # 缺少情感得分的新闻不产生影响
+    final_impact[np.isnan(sentiment)] = 1.0
+    return final_impact
+
+def impact_memo_key(news_data: dict, fund_id: str, bucket: int, index_version: int) -> tuple:
+    """影响系数备忘键：(新闻ID, 基金ID, 时间衰减分桶, 关键词索引版本, 新闻指纹)
+
+    新闻指纹包含情感得分、来源、发布时间与关键词，任一变化都不再命中旧条目
+    """
+    return (
+        news_data['id'],
+        fund_id,
+        bucket,
+        index_version,
+        news_data['sentiment_score'],
+        news_data.get('source'),
+        str(news_data.get('published_at')),
+        tuple(news_data.get('keywords') or ())
+    )
+
+class ImpactMemo:
+    """影响系数的有界LRU备忘缓存
+
+    键为 (news_id, fund_id, 时间衰减分桶, 关键词索引版本, 新闻指纹)：
+    - 同一分桶内时间衰减按分桶起点计算，分桶切换后自然失效
+    - 基金关键词变化会递增关键词索引版本，旧条目不再命中
+    - 新闻指纹包含情感得分与来源，新闻被重新处理后旧条目不再命中
+    失效条目不主动删除，由LRU淘汰。
+
+    只用于单基金的标量计算路径；批量计算、调度器和分布式工作者使用向量化的
+    impact_coefficient_matrix，逐元素查表反而比整矩阵计算更慢，不经过此缓存。
+    """
+
+    def __init__(self, max_entries: int = 100000, bucket_seconds: int = 300):
+        self.max_entries = max_entries
+        self.bucket_seconds = bucket_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def decay_bucket(self, now: Optional[float] = None) -> int:
+        """当前时间所属的时间衰减分桶"""
+        return int((time.time() if now is None else now) // self.bucket_seconds)
+
+    def bucket_start(self, bucket: int) -> datetime:
+        """分桶起点（UTC naive datetime），作为该分桶内统一的计算时间"""
+        return datetime.utcfromtimestamp(bucket * self.bucket_seconds)
+
+    def get_or_compute(self, key, compute):
+        """命中则返回缓存值，否则调用compute()计算并写入"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """命中/未命中计数"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,348 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Optional, Sequence, Set, Tuple
+from config.config import config
+from common.cache import cache
+from database.database import SessionLocal
+from .run_context import CalculationRunContext
+
+# 作业状态在Redis中的保留时间（秒）
+JOB_STATUS_TTL = 24 * 3600
+
+def _job_key(job_id: str) -> str:
+    return f"calc:job:{job_id}"
+
+def _job_chunks_key(job_id: str) -> str:
+    """已记录结果的块序号集合，重复投递的块只计数一次"""
+    return f"calc:job:{job_id}:chunks"
+
+class InProcessJobQueue:
+    """进程内作业队列，语义与Redis Stream消费组一致（投递、确认、超时重新认领）"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._ready = deque()
+        # 已投递未确认的消息：message_id -> (消息, 投递时间, 消费者)
+        self._pending: Dict[str, Tuple[dict, float, str]] = {}
+        self._jobs: Dict[str, dict] = {}
+        self._recorded_chunks: Dict[str, Set[int]] = {}
+
+    def put(self, message: dict) -> str:
+        message_id = str(uuid.uuid4())
+        with self._condition:
+            self._ready.append((message_id, message))
+            self._condition.notify()
+        return message_id
+
+    def get(self, consumer: str, block_ms: int = 1000) -> Optional[Tuple[str, dict]]:
+        with self._condition:
+            if not self._ready:
+                self._condition.wait(block_ms / 1000)
+            if not self._ready:
+                return None
+            message_id, message = self._ready.popleft()
+            self._pending[message_id] = (message, time.monotonic(), consumer)
+            return message_id, message
+
+    def ack(self, message_id: str):
+        with self._condition:
+            self._pending.pop(message_id, None)
+
+    def reclaim(self, consumer: str, min_idle_ms: int) -> Optional[Tuple[str, dict]]:
+        """认领一条投递后超过min_idle_ms仍未确认的消息（消费者崩溃）"""
+        deadline = time.monotonic() - min_idle_ms / 1000
+        with self._condition:
+            for message_id, (message, delivered_at, _) in self._pending.items():
+                if delivered_at < deadline:
+                    self._pending[message_id] = (message, time.monotonic(), consumer)
+                    return message_id, message
+        return None
+
+    def create_job(self, job_id: str, fields: dict):
+        with self._condition:
+            self._jobs[job_id] = dict(fields, completed_chunks=0, failed_chunks=0,
+                                      completed_funds=0, worker_seconds=0.0)
+            self._recorded_chunks[job_id] = set()
+
+    def record_chunk(self, job_id: str, chunk: int, status: str, fund_count: int, duration: float) -> bool:
+        """记录块结果，同一块已记录过时（重新认领后重复处理）不再计数并返回False"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or chunk in self._recorded_chunks[job_id]:
+                return False
+            self._recorded_chunks[job_id].add(chunk)
+            if status == "done":
+                job['completed_chunks'] += 1
+                job['completed_funds'] += fund_count
+            else:
+                job['failed_chunks'] += 1
+            job['worker_seconds'] += duration
+            job['updated_at'] = time.time()
+            return True
+
+    def job_status(self, job_id: str) -> Optional[dict]:
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+class RedisStreamJobQueue:
+    """基于Redis Stream消费组的作业队列
+
+    消息在XACK之前一直留在消费组的待确认列表中，消费者崩溃后由其他消费者
+    通过XAUTOCLAIM在空闲超时后重新认领；作业进度记录在Hash中。
+    """
+
+    def __init__(self, client=None, stream: Optional[str] = None, group: Optional[str] = None):
+        self.client = client or cache.client
+        self.stream = stream or config.calculation.QUEUE_STREAM
+        self.group = group or f"{self.stream}:workers"
+        self._group_ready = False
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            self.client.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    @staticmethod
+    def _decode(entry) -> Optional[Tuple[str, dict]]:
+        message_id, fields = entry
+        if not fields:
+            return None
+        return message_id, json.loads(fields['payload'])
+
+    def put(self, message: dict) -> str:
+        self._ensure_group()
+        return self.client.xadd(self.stream, {'payload': json.dumps(message)})
+
+    def get(self, consumer: str, block_ms: int = 1000) -> Optional[Tuple[str, dict]]:
+        self._ensure_group()
+        response = self.client.xreadgroup(self.group, consumer, {self.stream: '>'}, count=1, block=block_ms)
+        for _, entries in response or []:
+            for entry in entries:
+                return self._decode(entry)
+        return None
+
+    def ack(self, message_id: str):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.xack(self.stream, self.group, message_id)
+        pipe.xdel(self.stream, message_id)
+        pipe.execute()
+
+    def reclaim(self, consumer: str, min_idle_ms: int) -> Optional[Tuple[str, dict]]:
+        self._ensure_group()
+        response = self.client.xautoclaim(self.stream, self.group, consumer, min_idle_ms, start_id='0-0', count=1)
+        for entry in response[1]:
+            decoded = self._decode(entry)
+            if decoded:
+                return decoded
+        return None
+
+    def create_job(self, job_id: str, fields: dict):
+        key = _job_key(job_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(key, mapping={name: json.dumps(value) for name, value in fields.items()})
+        pipe.hset(key, mapping={'completed_chunks': 0, 'failed_chunks': 0,
+                                'completed_funds': 0, 'worker_seconds': 0})
+        pipe.expire(key, JOB_STATUS_TTL)
+        pipe.execute()
+
+    def record_chunk(self, job_id: str, chunk: int, status: str, fund_count: int, duration: float) -> bool:
+        """记录块结果：先SADD块序号，同一块已记录过时（重新认领后重复处理）不再计数并返回False"""
+        chunks_key = _job_chunks_key(job_id)
+        if not self.client.sadd(chunks_key, chunk):
+            return False
+        key = _job_key(job_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.expire(chunks_key, JOB_STATUS_TTL)
+        if status == "done":
+            pipe.hincrby(key, 'completed_chunks', 1)
+            pipe.hincrby(key, 'completed_funds', fund_count)
+        else:
+            pipe.hincrby(key, 'failed_chunks', 1)
+        pipe.hincrbyfloat(key, 'worker_seconds', duration)
+        pipe.hset(key, 'updated_at', json.dumps(time.time()))
+        pipe.execute()
+        return True
+
+    def job_status(self, job_id: str) -> Optional[dict]:
+        raw = self.client.hgetall(_job_key(job_id))
+        if not raw:
+            return None
+        return {name: json.loads(value) for name, value in raw.items()}
+
+class NavJobCoordinator:
+    """将基金集合切分为块推入队列，并汇总各块的完成情况"""
+
+    def __init__(self, queue, chunk_size: Optional[int] = None):
+        self.queue = queue
+        self.chunk_size = chunk_size or config.calculation.QUEUE_CHUNK_SIZE
+
+    def submit(self, fund_ids: Sequence[str], run_context: Optional[CalculationRunContext] = None) -> str:
+        """提交一次分布式计算作业，返回作业ID；所有块共享同一新闻快照"""
+        if run_context is None:
+            run_context = CalculationRunContext.create()
+        fund_ids = list(fund_ids)
+        job_id = run_context.run_id
+        chunks = [fund_ids[start:start + self.chunk_size] for start in range(0, len(fund_ids), self.chunk_size)]
+        self.queue.create_job(job_id, {
+            'job_id': job_id,
+            'news_snapshot_id': run_context.snapshot.snapshot_id,
+            'fund_count': len(fund_ids),
+            'total_chunks': len(chunks),
+            'submitted_at': time.time()
+        })
+        local_contexts.put(run_context)
+        for index, chunk in enumerate(chunks):
+            self.queue.put({
+                'job_id': job_id,
+                'chunk': index,
+                'fund_ids': chunk,
+                'news_snapshot_id': run_context.snapshot.snapshot_id,
+                'attempts': 0
+            })
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """作业进度、耗时与吞吐"""
+        job = self.queue.job_status(job_id)
+        if job is None:
+            return None
+        finished = job['completed_chunks'] + job['failed_chunks']
+        elapsed = job.get('updated_at', job['submitted_at']) - job['submitted_at']
+        job['finished'] = finished >= job['total_chunks']
+        job['elapsed_seconds'] = round(elapsed, 3)
+        job['funds_per_second'] = round(job['completed_funds'] / elapsed, 2) if elapsed > 0 else 0.0
+        return job
+
+    def wait(self, job_id: str, timeout: float, poll_interval: float = 0.2) -> Optional[Dict]:
+        """等待作业完成或超时，返回最新进度"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.status(job_id)
+            if job is None or job['finished'] or time.monotonic() >= deadline:
+                return job
+            time.sleep(poll_interval)
+
+class _RunContextCache:
+    """按作业ID缓存运行上下文，同一作业的多个块只加载一次新闻快照"""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, run_context: CalculationRunContext):
+        with self._lock:
+            self._contexts[run_context.run_id] = run_context
+            self._contexts.move_to_end(run_context.run_id)
+            while len(self._contexts) > self.max_entries:
+                self._contexts.popitem(last=False)
+
+    def get(self, snapshot_id: str, job_id: str) -> Optional[CalculationRunContext]:
+        with self._lock:
+            run_context = self._contexts.get(job_id)
+            if run_context is not None:
+                self._contexts.move_to_end(job_id)
+                return run_context
+        run_context = CalculationRunContext.replay(snapshot_id)
+        if run_context is not None:
+            run_context.run_id = job_id
+            self.put(run_context)
+        return run_context
+
+# 进程内共享的运行上下文缓存
+local_contexts = _RunContextCache()
+
+class NavCalculationWorker:
+    """作业队列消费者：计算基金块的净值并确认
+
+    失败的块以attempts+1重新入队，超过max_attempts后记为失败；
+    消费者崩溃时未确认的块在visibility_timeout后被其他消费者重新认领。
+    """
+
+    def __init__(self, queue, calculate: Callable, session_factory=None, consumer: Optional[str] = None,
+                 max_attempts: Optional[int] = None, visibility_timeout: Optional[int] = None):
+        # calculate(fund_ids, db, run_context)：计算一个块的基金净值
+        self.queue = queue
+        self.calculate = calculate
+        self.session_factory = session_factory or SessionLocal
+        self.consumer = consumer or f"worker-{uuid.uuid4().hex[:8]}"
+        self.max_attempts = max_attempts or config.calculation.QUEUE_MAX_ATTEMPTS
+        self.visibility_timeout = visibility_timeout or config.calculation.QUEUE_VISIBILITY_TIMEOUT
+        self.processed_chunks = 0
+        self._stop_event = threading.Event()
+
+    def _next_message(self, block_ms: int) -> Optional[Tuple[str, dict]]:
+        return (self.queue.reclaim(self.consumer, self.visibility_timeout * 1000)
+                or self.queue.get(self.consumer, block_ms))
+
+    def process_one(self, block_ms: int = 1000) -> bool:
+        """处理一个块，队列为空时返回False"""
+        delivered = self._next_message(block_ms)
+        if delivered is None:
+            return False
+        message_id, message = delivered
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            run_context = local_contexts.get(message['news_snapshot_id'], message['job_id'])
+            if run_context is None:
+                raise RuntimeError(f"News snapshot {message['news_snapshot_id']} not available")
+            self.calculate(message['fund_ids'], db, run_context)
+            self.queue.record_chunk(message['job_id'], message['chunk'], "done", len(message['fund_ids']),
+                                    time.perf_counter() - started)
+        except Exception as e:
+            db.rollback()
+            attempts = message['attempts'] + 1
+            print(f"Calculation chunk {message['chunk']} of job {message['job_id']} failed "
+                  f"(attempt {attempts}/{self.max_attempts}): {e}")
+            if attempts < self.max_attempts:
+                self.queue.put(dict(message, attempts=attempts))
+            else:
+                self.queue.record_chunk(message['job_id'], message['chunk'], "failed", len(message['fund_ids']),
+                                        time.perf_counter() - started)
+        finally:
+            db.close()
+        self.queue.ack(message_id)
+        self.processed_chunks += 1
+        return True
+
+    def run(self, block_ms: int = 1000):
+        """持续消费直到stop()"""
+        while not self._stop_event.is_set():
+            try:
+                self.process_one(block_ms)
+            except Exception as e:
+                print(f"Calculation worker {self.consumer} error: {e}")
+                self._stop_event.wait(1.0)
+
+    def stop(self):
+        self._stop_event.set()
+
+def create_job_queue(backend: Optional[str] = None):
+    """按配置创建作业队列：redis（默认）或memory"""
+    backend = backend or config.calculation.QUEUE_BACKEND
+    if backend == "memory":
+        return InProcessJobQueue()
+    return RedisStreamJobQueue()
+
+def main():
+    """独立的计算工作进程：python -m calculation_service.job_queue"""
+    from .batch import run_batch_calculation
+    worker = NavCalculationWorker(RedisStreamJobQueue(), run_batch_calculation)
+    print(f"Calculation worker {worker.consumer} consuming {config.calculation.QUEUE_STREAM}")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,213 @@
+import threading
+import time
+import numpy as np
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+from common.cache import cache
+
+# Redis中基金关键词的存储格式：fund_keywords:{fund_id} -> "关键词1,关键词2,..."
+FUND_KEYWORDS_KEY_PREFIX = "fund_keywords:"
+# 关键词变更版本号，任一进程修改关键词后递增，其他进程据此刷新索引
+FUND_KEYWORDS_VERSION_KEY = "fund_keywords_version"
+# 检查远端版本号的最小间隔（秒）
+REFRESH_CHECK_INTERVAL = 60
+# 从Redis加载关键词时每批MGET的键数
+LOAD_BATCH_SIZE = 1000
+
+def _parse_keywords(raw) -> frozenset:
+    """解析逗号分隔的关键词字符串"""
+    if not raw:
+        return frozenset()
+    if isinstance(raw, bytes):
+        raw = raw.decode('utf-8')
+    return frozenset(keyword.strip() for keyword in raw.split(',') if keyword.strip())
+
+class FundKeywordIndex:
+    """进程内的基金关键词倒排索引
+
+    关键词 -> 基金ID集合（倒排表）。给定新闻关键词，一次查询即可得到
+    所有受影响的基金及其关键词交集大小，无需逐条新闻访问Redis。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, set] = {}
+        self._fund_keywords: Dict[str, frozenset] = {}
+        # 关键词 -> 整数ID，供列式新闻数组与影响系数内核使用
+        self.keyword_vocab: Dict[str, int] = {}
+        # 本地版本号，每次索引内容变化时递增
+        self.version = 0
+        self._remote_version = None
+        self._last_refresh_check = 0.0
+        self.loaded = False
+
+    def load(self, fund_keywords: Dict[str, Iterable[str]]):
+        """用完整的 基金ID -> 关键词 映射重建索引"""
+        postings = {}
+        normalized = {}
+        for fund_id, keywords in fund_keywords.items():
+            keywords = frozenset(keywords)
+            normalized[fund_id] = keywords
+            for keyword in keywords:
+                postings.setdefault(keyword, set()).add(fund_id)
+
+        with self._lock:
+            self._postings = postings
+            self._fund_keywords = normalized
+            for keyword in postings:
+                self.keyword_vocab.setdefault(keyword, len(self.keyword_vocab))
+            self.version += 1
+            self.loaded = True
+
+    def update_fund(self, fund_id: str, keywords: Iterable[str]):
+        """更新单个基金的关键词"""
+        keywords = frozenset(keywords)
+        with self._lock:
+            old_keywords = self._fund_keywords.get(fund_id, frozenset())
+            if old_keywords == keywords and fund_id in self._fund_keywords:
+                return
+            for keyword in old_keywords - keywords:
+                postings = self._postings.get(keyword)
+                if postings is not None:
+                    postings.discard(fund_id)
+                    if not postings:
+                        del self._postings[keyword]
+            for keyword in keywords - old_keywords:
+                self._postings.setdefault(keyword, set()).add(fund_id)
+                self.keyword_vocab.setdefault(keyword, len(self.keyword_vocab))
+            self._fund_keywords[fund_id] = keywords
+            self.version += 1
+
+    def remove_fund(self, fund_id: str):
+        """从索引中移除基金"""
+        with self._lock:
+            keywords = self._fund_keywords.pop(fund_id, None)
+            if keywords is None:
+                return
+            for keyword in keywords:
+                postings = self._postings.get(keyword)
+                if postings is not None:
+                    postings.discard(fund_id)
+                    if not postings:
+                        del self._postings[keyword]
+            self.version += 1
+
+    def has_fund(self, fund_id: str) -> bool:
+        """基金是否有关键词数据"""
+        return fund_id in self._fund_keywords
+
+    def get_keywords(self, fund_id: str) -> Optional[frozenset]:
+        """获取基金的关键词集合，无数据时返回None"""
+        return self._fund_keywords.get(fund_id)
+
+    def match(self, keywords: Iterable[str]) -> Dict[str, int]:
+        """返回与给定关键词有交集的全部基金及交集大小，交集为0的基金不出现"""
+        counts = Counter()
+        with self._lock:
+            for keyword in set(keywords or ()):
+                postings = self._postings.get(keyword)
+                if postings:
+                    counts.update(postings)
+        return dict(counts)
+
+    def overlap(self, fund_id: str, keywords: Iterable[str]) -> Optional[int]:
+        """单个基金与新闻关键词的交集大小，基金无关键词数据时返回None"""
+        fund_keywords = self._fund_keywords.get(fund_id)
+        if fund_keywords is None:
+            return None
+        return len(fund_keywords.intersection(keywords or ()))
+
+    def overlap_matrix(self, news_keywords: Sequence[Iterable[str]], fund_ids: Sequence[str]) -> np.ndarray:
+        """新闻×基金的关键词交集大小矩阵
+
+        只遍历倒排表命中的基金，交集为0的基金不产生任何计算
+        """
+        positions = {fund_id: j for j, fund_id in enumerate(fund_ids)}
+        matrix = np.zeros((len(news_keywords), len(fund_ids)), dtype=np.int64)
+        for i, keywords in enumerate(news_keywords):
+            for fund_id, count in self.match(keywords).items():
+                j = positions.get(fund_id)
+                if j is not None:
+                    matrix[i, j] = count
+        return matrix
+
+    def fund_keyword_ids(self, fund_ids: Sequence[str]) -> List[Optional[List[int]]]:
+        """按keyword_vocab编码基金关键词，无关键词数据的基金为None"""
+        with self._lock:
+            return [
+                None if fund_id not in self._fund_keywords
+                else sorted(self.keyword_vocab[keyword] for keyword in self._fund_keywords[fund_id])
+                for fund_id in fund_ids
+            ]
+
+    # Redis同步
+    def load_from_cache(self):
+        """从Redis加载全部基金关键词并重建索引"""
+        if not cache.client:
+            self.load({})
+            return
+        try:
+            remote_version = cache.client.get(FUND_KEYWORDS_VERSION_KEY)
+            fund_keywords = {}
+            keys = [
+                key.decode('utf-8') if isinstance(key, bytes) else key
+                for key in cache.client.scan_iter(match=f"{FUND_KEYWORDS_KEY_PREFIX}*", count=LOAD_BATCH_SIZE)
+            ]
+            for offset in range(0, len(keys), LOAD_BATCH_SIZE):
+                batch = keys[offset:offset + LOAD_BATCH_SIZE]
+                for key, raw in zip(batch, cache.client.mget(batch)):
+                    fund_keywords[key[len(FUND_KEYWORDS_KEY_PREFIX):]] = _parse_keywords(raw)
+            self.load(fund_keywords)
+            self._remote_version = remote_version
+        except Exception as e:
+            print(f"Fund keyword index load error: {str(e)}")
+            if not self.loaded:
+                self.load({})
+        self._last_refresh_check = time.monotonic()
+
+    def ensure_fresh(self):
+        """首次使用时加载索引；之后按间隔检查远端版本号，变化时整体刷新"""
+        if not self.loaded:
+            self.load_from_cache()
+            return
+        now = time.monotonic()
+        if now - self._last_refresh_check < REFRESH_CHECK_INTERVAL or not cache.client:
+            return
+        self._last_refresh_check = now
+        try:
+            remote_version = cache.client.get(FUND_KEYWORDS_VERSION_KEY)
+        except Exception as e:
+            print(f"Fund keyword version check error: {str(e)}")
+            return
+        if remote_version != self._remote_version:
+            self.load_from_cache()
+
+    def set_fund_keywords(self, fund_id: str, keywords: Iterable[str]):
+        """写入基金关键词（Redis + 本地索引），并递增版本号通知其他进程刷新"""
+        keywords = frozenset(keyword.strip() for keyword in keywords if keyword and keyword.strip())
+        if cache.client:
+            try:
+                pipe = cache.client.pipeline()
+                pipe.set(f"{FUND_KEYWORDS_KEY_PREFIX}{fund_id}", ','.join(sorted(keywords)))
+                pipe.incr(FUND_KEYWORDS_VERSION_KEY)
+                _, new_version = pipe.execute()
+                self._advance_remote_version(new_version)
+            except Exception as e:
+                print(f"Fund keyword write error: {str(e)}")
+        self.update_fund(fund_id, keywords)
+
+    def _advance_remote_version(self, new_version):
+        """只有INCR结果恰为已知版本号+1（期间没有其他进程修改）时才记录；
+        否则其他进程的修改尚未加载，清空检查时间使下次ensure_fresh立即重新加载"""
+        with self._lock:
+            try:
+                expected = int(self._remote_version or 0) + 1
+            except ValueError:
+                expected = None
+            if int(new_version) == expected:
+                self._remote_version = str(new_version)
+            else:
+                self._last_refresh_check = 0.0
+
+# 进程级索引实例
+fund_keyword_index = FundKeywordIndex()
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, String, Float, Integer, DateTime, ForeignKey, JSON, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 from database.database import Base
@@ -16,6 +16,9 @@ class CalculationLog(Base):
 
 class NewsImpact(Base):
     __tablename__ = "news_impacts"
+    __table_args__ = (
+        UniqueConstraint('news_id', 'fund_id', name='unique_news_fund'),
+    )
     
     id = Column(String(36), primary_key=True)
     news_id = Column(String(36), nullable=False)
@@ -23,4 +26,39 @@ class NewsImpact(Base):
     impact_coefficient = Column(Float, nullable=False)
     calculated_at = Column(DateTime, default=datetime.utcnow)
     factors = Column(JSON)
-    source_news_impact = Column(Float)
\ No newline at end of file
+    source_news_impact = Column(Float)
+
+class CalculationRun(Base):
+    __tablename__ = "calculation_runs"
+    
+    id = Column(String(36), primary_key=True)
+    # 运行中为固定值，结束后置空；唯一约束保证同一时刻最多一个运行
+    active_slot = Column(String(20), unique=True)
+    owner = Column(String(100))
+    status = Column(String(20), default="running")
+    started_at = Column(DateTime, default=datetime.utcnow)
+    heartbeat_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+    news_snapshot_id = Column(String(64))
+    fund_count = Column(Integer, default=0)
+    partition_count = Column(Integer, default=0)
+    failed_partitions = Column(Integer, default=0)
+    duration_seconds = Column(Float)
+    funds_per_second = Column(Float)
+
+class CalculationPartition(Base):
+    __tablename__ = "calculation_partitions"
+    __table_args__ = (
+        UniqueConstraint('run_id', 'partition_index', name='unique_run_partition'),
+    )
+    
+    id = Column(String(36), primary_key=True)
+    run_id = Column(String(36), nullable=False, index=True)
+    partition_index = Column(Integer, nullable=False)
+    fund_ids = Column(JSON, nullable=False)
+    status = Column(String(20), default="pending")
+    owner = Column(String(100))
+    lease_expires_at = Column(DateTime)
+    attempts = Column(Integer, default=0)
+    duration_seconds = Column(Float)
+    error_message = Column(String(500))
\ No newline at end of file
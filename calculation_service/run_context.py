@@ -0,0 +1,152 @@
+import hashlib
+import json
+import uuid
+import numpy as np
+from datetime import datetime
+from typing import List, Optional, Sequence
+from common.cache import cache
+from config.config import config
+from .impact import columnarize_news, impact_coefficient_matrix, decay_bucket_start
+from .keyword_index import fund_keyword_index
+from .client import news_client
+
+# 新闻窗口参数
+NEWS_WINDOW_HOURS = 24
+NEWS_PAGE_SIZE = 500
+# 快照保留时间（秒），用于按快照ID复现计算
+SNAPSHOT_EXPIRE_SECONDS = 7 * 24 * 3600
+
+def _snapshot_cache_key(snapshot_id: str) -> str:
+    return f"news_snapshot:{snapshot_id}"
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+class NewsSnapshot:
+    """一次计算运行共享的新闻窗口快照（不可变、列式）
+
+    快照ID由窗口截止时间和新闻内容决定，相同输入得到相同ID；
+    时间衰减统一以窗口截止时间为基准，保证同一快照的计算结果可复现。
+    窗口截止时间取时间衰减分桶起点，与标量计算路径的衰减基准一致。
+    """
+
+    __slots__ = ('snapshot_id', 'window_end', 'window_hours', 'news_items',
+                 'ids', 'sentiment', 'published_at', 'source_code', 'keywords')
+
+    def __init__(self, news_items: Sequence[dict], window_end: datetime, window_hours: int = NEWS_WINDOW_HOURS):
+        news_items = tuple(sorted(news_items, key=lambda news: str(news.get('id'))))
+        columns = columnarize_news(news_items, fund_keyword_index.keyword_vocab)
+
+        object.__setattr__(self, 'window_end', window_end)
+        object.__setattr__(self, 'window_hours', window_hours)
+        object.__setattr__(self, 'news_items', news_items)
+        object.__setattr__(self, 'ids', tuple(columns['ids']))
+        object.__setattr__(self, 'sentiment', _readonly(columns['sentiment']))
+        object.__setattr__(self, 'published_at', _readonly(columns['published_at']))
+        object.__setattr__(self, 'source_code', _readonly(columns['source_code']))
+        object.__setattr__(self, 'keywords', tuple(tuple(news.get('keywords') or ()) for news in news_items))
+        object.__setattr__(self, 'snapshot_id', self._fingerprint())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("NewsSnapshot is immutable")
+
+    def __len__(self):
+        return len(self.news_items)
+
+    def _fingerprint(self) -> str:
+        """根据窗口和新闻内容计算快照ID"""
+        digest = hashlib.sha256()
+        digest.update(f"{self.window_end.isoformat()}|{self.window_hours}".encode('utf-8'))
+        for news in self.news_items:
+            digest.update(json.dumps(news, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    @property
+    def window_end_epoch(self) -> float:
+        return (self.window_end - datetime(1970, 1, 1)).total_seconds()
+
+    def overlap_matrix(self, fund_ids: Sequence[str]) -> np.ndarray:
+        """快照内全部新闻与给定基金的关键词交集大小矩阵 (新闻数, 基金数)"""
+        fund_keyword_index.ensure_fresh()
+        return fund_keyword_index.overlap_matrix(self.keywords, fund_ids)
+
+    def impact_matrix(self, fund_ids: Sequence[str], overlap: Optional[np.ndarray] = None) -> np.ndarray:
+        """计算快照内全部新闻对给定基金的影响系数矩阵 (新闻数, 基金数)"""
+        if overlap is None:
+            overlap = self.overlap_matrix(fund_ids)
+        return impact_coefficient_matrix(
+            self.sentiment,
+            self.published_at,
+            self.source_code,
+            None,
+            None,
+            now=self.window_end_epoch,
+            overlap=overlap
+        )
+
+    def save(self):
+        """将快照原始数据写入缓存，供按ID复现"""
+        cache.set(_snapshot_cache_key(self.snapshot_id), {
+            'window_end': self.window_end.isoformat(),
+            'window_hours': self.window_hours,
+            'news_items': list(self.news_items)
+        }, SNAPSHOT_EXPIRE_SECONDS)
+
+    @classmethod
+    def load(cls, snapshot_id: str) -> Optional["NewsSnapshot"]:
+        """按快照ID从缓存恢复快照"""
+        data = cache.get(_snapshot_cache_key(snapshot_id))
+        if not data:
+            return None
+        return cls(data['news_items'], datetime.fromisoformat(data['window_end']), data['window_hours'])
+
+def fetch_news_window(hours: int = NEWS_WINDOW_HOURS, page_size: int = NEWS_PAGE_SIZE) -> List[dict]:
+    """分页拉取新闻窗口（按新闻ID去重）：批量计算每次运行只拉取一次，标量计算使用同一选择"""
+    return news_client.call(news_client.get_news_window(hours, page_size))
+
+class CalculationRunContext:
+    """一次净值计算运行的上下文，运行内所有基金共享同一个新闻快照"""
+
+    def __init__(self, snapshot: NewsSnapshot, run_id: Optional[str] = None):
+        self.run_id = run_id or str(uuid.uuid4())
+        self.snapshot = snapshot
+        self.started_at = datetime.utcnow()
+
+    @classmethod
+    def create(cls, hours: int = NEWS_WINDOW_HOURS) -> "CalculationRunContext":
+        """拉取新闻窗口并创建运行上下文；拉取失败时使用空快照（不计新闻影响）"""
+        window_end = decay_bucket_start(datetime.utcnow(), config.calculation.IMPACT_DECAY_BUCKET_SECONDS)
+        try:
+            news_items = fetch_news_window(hours)
+        except Exception as e:
+            print(f"Error fetching news window: {e}")
+            news_items = []
+        snapshot = NewsSnapshot(news_items, window_end, hours)
+        snapshot.save()
+        return cls(snapshot)
+
+    @classmethod
+    def replay(cls, snapshot_id: str) -> Optional["CalculationRunContext"]:
+        """按快照ID复现一次计算运行"""
+        snapshot = NewsSnapshot.load(snapshot_id)
+        return cls(snapshot) if snapshot else None
+
+    def news_factors(self, fund_ids: Sequence[str]):
+        """返回 (每个基金的平均新闻影响系数, 新闻条数, 影响系数矩阵, 关键词交集矩阵)"""
+        fund_count = len(fund_ids)
+        if len(self.snapshot) == 0:
+            return (np.ones(fund_count, dtype=np.float64),
+                    np.zeros(fund_count, dtype=np.int64),
+                    np.empty((0, fund_count), dtype=np.float64),
+                    np.empty((0, fund_count), dtype=np.int64))
+        overlap = self.snapshot.overlap_matrix(fund_ids)
+        matrix = self.snapshot.impact_matrix(fund_ids, overlap)
+        return (matrix.mean(axis=0),
+                np.full(fund_count, len(self.snapshot), dtype=np.int64),
+                matrix,
+                overlap)
+
+    def input_params(self, **params) -> dict:
+        """计算日志的输入参数，附带快照ID以便复现"""
+        return dict(params, run_id=self.run_id, news_snapshot_id=self.snapshot.snapshot_id)
\ No newline at end of file
@@ -0,0 +1,361 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import select, update, func, or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from config.config import config
+from database.database import SessionLocal
+from fund_service.models import Fund, FundStatus
+from .models import CalculationRun, CalculationPartition
+from .run_context import CalculationRunContext
+
+# 运行中的CalculationRun.active_slot取值，唯一约束保证同一时刻只有一个运行
+ACTIVE_RUN_SLOT = "nav"
+# 等待其他工作者持有的分区完成时的轮询间隔（秒）
+LEASE_POLL_SECONDS = 1.0
+
+def _default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class CalculationScheduler:
+    """定时净值计算调度器
+
+    每隔interval秒为全部活跃基金发起一次计算运行：基金按partition_size切分为分区，
+    工作线程通过带过期时间的租约认领分区，工作者崩溃后分区在租约过期后可被重新认领。
+    上一次运行未结束（心跳未过期）时跳过本次；其他进程的调度器遇到进行中的运行时，
+    协助认领其未完成的分区。数据库操作只使用可移植的INSERT/条件UPDATE，可在SQLite上运行。
+    """
+
+    def __init__(self, calculate: Callable, session_factory=None, interval: Optional[int] = None,
+                 workers: Optional[int] = None, partition_size: Optional[int] = None,
+                 lease_seconds: Optional[int] = None, context_factory: Optional[Callable] = None,
+                 owner: Optional[str] = None):
+        # calculate(fund_ids, db, run_context)：计算一个分区的基金净值
+        self.calculate = calculate
+        self.session_factory = session_factory or SessionLocal
+        self.interval = interval or config.calculation.CALCULATION_INTERVAL
+        self.workers = workers or config.calculation.SCHEDULER_WORKERS
+        self.partition_size = partition_size or config.calculation.SCHEDULER_PARTITION_SIZE
+        self.lease_seconds = lease_seconds or config.calculation.SCHEDULER_LEASE_SECONDS
+        self.context_factory = context_factory or CalculationRunContext.create
+        self.owner = owner or _default_owner()
+        self.last_run: Optional[Dict] = None
+        self._run_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # 运行生命周期
+    def _expire_stale_runs(self, db: Session, now: datetime):
+        """释放心跳超时的运行（所属进程已退出），使新运行可以开始"""
+        db.execute(
+            update(CalculationRun)
+            .where(
+                CalculationRun.active_slot == ACTIVE_RUN_SLOT,
+                CalculationRun.heartbeat_at < now - timedelta(seconds=self.lease_seconds)
+            )
+            .values(status="abandoned", active_slot=None, finished_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    def start_run(self, db: Session):
+        """占用运行槽位并切分分区，返回 (运行记录, 运行上下文)；已有运行进行中时返回None"""
+        now = datetime.utcnow()
+        self._expire_stale_runs(db, now)
+
+        run = CalculationRun(
+            id=str(uuid.uuid4()),
+            active_slot=ACTIVE_RUN_SLOT,
+            owner=self.owner,
+            status="running",
+            started_at=now,
+            heartbeat_at=now
+        )
+        db.add(run)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return None
+
+        try:
+            fund_ids = db.execute(
+                select(Fund.id).where(Fund.status == FundStatus.ACTIVE).order_by(Fund.id)
+            ).scalars().all()
+            run_context = self.context_factory()
+            partitions = [
+                fund_ids[start:start + self.partition_size]
+                for start in range(0, len(fund_ids), self.partition_size)
+            ]
+            db.add_all([
+                CalculationPartition(
+                    id=str(uuid.uuid4()),
+                    run_id=run.id,
+                    partition_index=index,
+                    fund_ids=list(partition),
+                    status="pending",
+                    attempts=0
+                )
+                for index, partition in enumerate(partitions)
+            ])
+            run.news_snapshot_id = run_context.snapshot.snapshot_id
+            run.fund_count = len(fund_ids)
+            run.partition_count = len(partitions)
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._finish(db, run.id, "failed", now)
+            raise
+        return run, run_context
+
+    def _finish(self, db: Session, run_id: str, status: str, started_at: datetime,
+                failed_partitions: int = 0) -> Dict:
+        """结束运行：释放槽位并记录耗时与吞吐"""
+        finished_at = datetime.utcnow()
+        run = db.get(CalculationRun, run_id)
+        duration = (finished_at - started_at).total_seconds()
+        run.status = status
+        run.failed_partitions = failed_partitions
+        run.active_slot = None
+        run.finished_at = finished_at
+        run.duration_seconds = round(duration, 3)
+        run.funds_per_second = round(run.fund_count / duration, 2) if duration > 0 and run.fund_count else 0.0
+        db.commit()
+        return run_summary(run)
+
+    def _heartbeat(self, db: Session, run_id: str):
+        db.execute(
+            update(CalculationRun)
+            .where(CalculationRun.id == run_id)
+            .values(heartbeat_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    # 分区租约
+    def claim_partition(self, db: Session, run_id: str) -> Optional[CalculationPartition]:
+        """认领一个待处理或租约已过期的分区，条件UPDATE保证同一分区只被一个工作者认领"""
+        now = datetime.utcnow()
+        claimable = or_(
+            CalculationPartition.status == "pending",
+            and_(CalculationPartition.status == "running", CalculationPartition.lease_expires_at < now)
+        )
+        candidates = db.execute(
+            select(CalculationPartition.id)
+            .where(CalculationPartition.run_id == run_id, claimable)
+            .order_by(CalculationPartition.partition_index)
+            .limit(self.workers)
+        ).scalars().all()
+
+        for partition_id in candidates:
+            result = db.execute(
+                update(CalculationPartition)
+                .where(CalculationPartition.id == partition_id, claimable)
+                .values(
+                    status="running",
+                    owner=self.owner,
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    attempts=CalculationPartition.attempts + 1
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            if result.rowcount == 1:
+                return db.get(CalculationPartition, partition_id)
+        return None
+
+    def _complete_partition(self, db: Session, partition_id: str, status: str, duration: float,
+                            error_message: Optional[str] = None):
+        """只在仍持有租约时写回分区状态"""
+        db.execute(
+            update(CalculationPartition)
+            .where(CalculationPartition.id == partition_id, CalculationPartition.owner == self.owner)
+            .values(
+                status=status,
+                lease_expires_at=None,
+                duration_seconds=round(duration, 3),
+                error_message=error_message[:500] if error_message else None
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    def renew_lease(self, db: Session, partition_id: str) -> bool:
+        """延长仍由本工作者持有的分区租约，租约已被接管时返回False"""
+        result = db.execute(
+            update(CalculationPartition)
+            .where(
+                CalculationPartition.id == partition_id,
+                CalculationPartition.owner == self.owner,
+                CalculationPartition.status == "running"
+            )
+            .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount == 1
+
+    def _keep_alive(self, run_id: str, partition_id: str, done: threading.Event):
+        """分区计算期间每三分之一租约时长续租一次并更新运行心跳，直到done被设置"""
+        db = self.session_factory()
+        try:
+            while not done.wait(self.lease_seconds / 3):
+                if not self.renew_lease(db, partition_id):
+                    print(f"Lease on partition {partition_id} of run {run_id} was lost")
+                    return
+                self._heartbeat(db, run_id)
+        except Exception as e:
+            db.rollback()
+            print(f"Lease renewal error for partition {partition_id}: {e}")
+        finally:
+            db.close()
+
+    def _work(self, run_id: str, run_context):
+        """工作线程：循环认领并计算分区，直到没有可认领的分区；计算期间由续租线程保持租约"""
+        db = self.session_factory()
+        try:
+            while not self._stop_event.is_set():
+                partition = self.claim_partition(db, run_id)
+                if partition is None:
+                    return
+                done = threading.Event()
+                renewer = threading.Thread(target=self._keep_alive, args=(run_id, partition.id, done),
+                                           name=f"calculation-lease-{partition.partition_index}", daemon=True)
+                renewer.start()
+                started = time.perf_counter()
+                try:
+                    self.calculate(list(partition.fund_ids), db, run_context)
+                    status, error_message = "done", None
+                except Exception as e:
+                    db.rollback()
+                    print(f"Calculation partition {partition.partition_index} of run {run_id} failed: {e}")
+                    status, error_message = "failed", str(e)
+                finally:
+                    done.set()
+                    renewer.join()
+                self._complete_partition(db, partition.id, status, time.perf_counter() - started, error_message)
+                self._heartbeat(db, run_id)
+        finally:
+            db.close()
+
+    def _work_parallel(self, run_id: str, run_context):
+        threads = [
+            threading.Thread(target=self._work, args=(run_id, run_context),
+                             name=f"calculation-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _unfinished_partitions(self, db: Session, run_id: str) -> int:
+        return db.execute(
+            select(func.count(CalculationPartition.id)).where(
+                CalculationPartition.run_id == run_id,
+                CalculationPartition.status.in_(["pending", "running"])
+            )
+        ).scalar()
+
+    def _failed_partitions(self, db: Session, run_id: str) -> int:
+        return db.execute(
+            select(func.count(CalculationPartition.id)).where(
+                CalculationPartition.run_id == run_id,
+                CalculationPartition.status == "failed"
+            )
+        ).scalar()
+
+    def run_once(self) -> Dict:
+        """执行一次计算运行；上一次运行仍在进行时跳过（并协助处理其分区）"""
+        if not self._run_lock.acquire(blocking=False):
+            return {"status": "skipped", "reason": "previous run still in progress"}
+        db = self.session_factory()
+        try:
+            started = self.start_run(db)
+            if started is None:
+                self._assist_active_run(db)
+                return {"status": "skipped", "reason": "another run is active"}
+
+            run, run_context = started
+            run_id, started_at = run.id, run.started_at
+            self._work_parallel(run_id, run_context)
+            # 其他工作者持有的分区：等待完成，租约过期则由本进程接管
+            while self._unfinished_partitions(db, run_id) and not self._stop_event.is_set():
+                self._heartbeat(db, run_id)
+                time.sleep(LEASE_POLL_SECONDS)
+                self._work(run_id, run_context)
+
+            failed = self._failed_partitions(db, run_id)
+            status = "interrupted" if self._stop_event.is_set() else ("partial" if failed else "success")
+            self.last_run = self._finish(db, run_id, status, started_at, failed)
+            return self.last_run
+        finally:
+            db.close()
+            self._run_lock.release()
+
+    def _assist_active_run(self, db: Session):
+        """协助其他进程发起的运行，使用同一新闻快照计算其未完成的分区"""
+        run = db.execute(
+            select(CalculationRun).where(CalculationRun.active_slot == ACTIVE_RUN_SLOT)
+        ).scalars().first()
+        if run is None or run.owner == self.owner or not run.news_snapshot_id:
+            return
+        run_context = CalculationRunContext.replay(run.news_snapshot_id)
+        if run_context is None:
+            return
+        run_context.run_id = run.id
+        self._work_parallel(run.id, run_context)
+
+    # 定时线程
+    def _loop(self):
+        next_run = time.monotonic() + self.interval
+        while not self._stop_event.wait(max(0.0, next_run - time.monotonic())):
+            next_run = time.monotonic() + self.interval
+            try:
+                summary = self.run_once()
+                print(f"Scheduled calculation run: {summary}")
+            except Exception as e:
+                print(f"Scheduled calculation error: {e}")
+
+    def start(self):
+        """启动定时线程，每interval秒发起一次运行"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="calculation-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止定时线程，进行中的运行在当前分区完成后结束"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def recent_runs(self, db: Session, limit: int = 20) -> List[Dict]:
+        """最近的运行记录"""
+        runs = db.execute(
+            select(CalculationRun).order_by(CalculationRun.started_at.desc()).limit(limit)
+        ).scalars().all()
+        return [run_summary(run) for run in runs]
+
+def run_summary(run: CalculationRun) -> Dict:
+    """运行记录的耗时与吞吐摘要"""
+    return {
+        "run_id": run.id,
+        "status": run.status,
+        "owner": run.owner,
+        "started_at": run.started_at.isoformat() if run.started_at else None,
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+        "news_snapshot_id": run.news_snapshot_id,
+        "fund_count": run.fund_count,
+        "partition_count": run.partition_count,
+        "failed_partitions": run.failed_partitions,
+        "duration_seconds": run.duration_seconds,
+        "funds_per_second": run.funds_per_second
+    }
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from datetime import datetime
+from datetime import datetime, date
 from typing import Optional, List, Dict
 
 class CalculateNetValueRequest(BaseModel):
@@ -23,14 +23,13 @@ class HistoricalNetValueRequest(BaseModel):
     end_date: datetime
     frequency: str = Field("daily", regex="^(daily|weekly|monthly)$")
 
-class HistoricalNetValueItem(BaseModel):
-    date: datetime
-    net_value: float
-    change_percentage: Optional[float] = None
-
 class HistoricalNetValueResponse(BaseModel):
+    # 列式结构：dates/net_values/change_percentages按下标一一对应
     fund_id: str
-    data: List[HistoricalNetValueItem]
+    frequency: str
+    dates: List[date]
+    net_values: List[float]
+    change_percentages: List[Optional[float]]
     total_items: int
 
 class NewsImpactRequest(BaseModel):
@@ -43,4 +42,30 @@ class NewsImpactResponse(BaseModel):
     impact_coefficient: float
     calculated_at: datetime
     factors: Dict
-    source_news_impact: Optional[float] = None
\ No newline at end of file
+    source_news_impact: Optional[float] = None
+
+class FundKeywordsRequest(BaseModel):
+    keywords: List[str] = Field(..., max_items=200)
+
+class NewsArrivalRequest(BaseModel):
+    news_id: str = Field(..., max_length=36)
+    keywords: Optional[List[str]] = None
+    categories: Optional[List[str]] = None
+    related_fund_types: Optional[List[str]] = None
+
+class BacktestRequest(BaseModel):
+    fund_ids: Optional[List[str]] = None  # 为空时回测全部活跃基金
+    days: Optional[int] = Field(None, ge=1, le=3650)
+    end_date: Optional[datetime] = None
+
+class SimulationRequest(BaseModel):
+    fund_id: str = Field(..., max_length=36)
+    horizon_days: int = Field(30, ge=1, le=756)
+    paths: int = Field(10000, ge=100, le=1000000)
+    seed: int = Field(0, ge=0)
+    percentiles: List[float] = Field([5, 25, 50, 75, 95], min_items=1, max_items=20)
+    history_days: int = Field(365, ge=30, le=3650)  # 估计漂移与波动率使用的历史天数
+
+class DistributedCalculationRequest(BaseModel):
+    fund_ids: Optional[List[str]] = None  # 为空时计算全部活跃基金
+    chunk_size: Optional[int] = Field(None, ge=1, le=10000)
\ No newline at end of file
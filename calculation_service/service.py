@@ -1,59 +1,95 @@
 from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from .models import CalculationLog, NewsImpact
 from .schemas import (
     CalculateNetValueRequest, CalculateNetValueResponse,
     HistoricalNetValueRequest, HistoricalNetValueResponse,
-    HistoricalNetValueItem,
-    NewsImpactRequest, NewsImpactResponse
+    NewsImpactRequest, NewsImpactResponse,
+    FundKeywordsRequest, NewsArrivalRequest, BacktestRequest,
+    SimulationRequest, DistributedCalculationRequest
 )
-from database.database import get_db
-from common.cache import redis_client
-import uuid
+from database.database import get_db, SessionLocal
+from common.cache import redis_client, cache
+from config.config import config
+from common.monitoring import StageTimer
+from .engine import (
+    BASE_CHANGE_RATE, DEFAULT_NET_VALUE,
+    latest_cache_key, load_db_net_values, adjustment_factor_from_params
+)
+from .impact import (
+    SOURCE_RELIABILITY, DEFAULT_SOURCE_RELIABILITY,
+    TIME_DECAY_HOURS, MIN_TIME_WEIGHT, parse_published_at, ImpactMemo, impact_memo_key
+)
+from .keyword_index import fund_keyword_index
+from .run_context import CalculationRunContext, fetch_news_window
+from .batch import run_batch_calculation, batch_summary
+from .client import news_client
+from .writer import result_writer
+from .dirty import dirty_fund_tracker
+from .backtest import prepare_backtest, stream_backtest, shutdown_pool as shutdown_backtest_pool
+from .simulation import estimate_drift_volatility, simulate_net_value_bands
+from .history import load_net_value_series, resample_last, change_percentages
+from .scheduler import CalculationScheduler
+from .job_queue import create_job_queue, NavJobCoordinator, NavCalculationWorker
+from fund_service.models import Fund, FundStatus
+from sqlalchemy import select
+import threading
 import numpy as np
 from datetime import datetime, timedelta
-import requests
+from typing import Optional
 import json
 from fastapi import HTTPException, Depends
 
+# 影响系数备忘缓存（进程内）
+impact_memo = ImpactMemo(
+    max_entries=config.calculation.IMPACT_MEMO_SIZE,
+    bucket_seconds=config.calculation.IMPACT_DECAY_BUCKET_SECONDS
+)
+
 # 核心计算函数
 def calculate_impact_coefficient(news_data, fund_id):
-    """计算新闻对基金的影响系数"""
-    if not news_data or 'sentiment_score' not in news_data:
+    """计算新闻对基金的影响系数
+
+    带新闻ID的调用按 (新闻, 基金, 时间衰减分桶, 关键词索引版本, 新闻指纹) 备忘；
+    时间衰减统一按分桶起点计算，与批量计算快照的窗口截止时间一致
+    """
+    if not news_data or news_data.get('sentiment_score') is None:
         return 1.0
     
+    bucket = impact_memo.decay_bucket()
+    if news_data.get('id') is None:
+        return _compute_impact_coefficient(news_data, fund_id, impact_memo.bucket_start(bucket))
+    
+    fund_keyword_index.ensure_fresh()
+    key = impact_memo_key(news_data, fund_id, bucket, fund_keyword_index.version)
+    return impact_memo.get_or_compute(
+        key,
+        lambda: _compute_impact_coefficient(news_data, fund_id, impact_memo.bucket_start(bucket))
+    )
+
+def _compute_impact_coefficient(news_data, fund_id, now):
+    """计算新闻对基金的影响系数（now为计算时间，UTC naive datetime）"""
     # 情感得分
     sentiment_score = news_data['sentiment_score']
     
     # 计算重要性权重（这里简化实现）
     # 基于发布时间的权重 - 越新的新闻权重越高
-    published_at = datetime.fromisoformat(news_data['published_at'].replace('Z', '+00:00'))
-    time_diff_hours = (datetime.utcnow() - published_at).total_seconds() / 3600
-    time_weight = max(0.1, 1.0 - (time_diff_hours / (24 * 7)))  # 一周内的新闻权重递减
+    published_at = parse_published_at(news_data['published_at'])
+    time_diff_hours = (now - published_at).total_seconds() / 3600
+    time_weight = max(MIN_TIME_WEIGHT, 1.0 - (time_diff_hours / TIME_DECAY_HOURS))  # 一周内的新闻权重递减
     
     # 基于来源的权重
-    source_reliability = {
-        'xinhua': 0.9,
-        'people': 0.85,
-        'cnn': 0.8,
-        'reuters': 0.85,
-        'bbc': 0.8,
-        'bloomberg': 0.85
-    }
-    source = news_data['source'].lower()
-    source_weight = source_reliability.get(source, 0.7)
+    source = (news_data.get('source') or '').lower()
+    source_weight = SOURCE_RELIABILITY.get(source, DEFAULT_SOURCE_RELIABILITY)
     
     # 关联性乘数（基于关键词匹配，这里简化实现）
     relevance_multiplier = 1.0
     if 'keywords' in news_data and news_data['keywords']:
-        # 假设我们有一个基金相关关键词的缓存
-        cache_key = f"fund_keywords:{fund_id}"
-        fund_keywords = redis_client.get(cache_key)
-        if fund_keywords:
-            fund_keywords = set(fund_keywords.decode('utf-8').split(','))
-            news_keywords = set(news_data['keywords'])
-            common_keywords = fund_keywords.intersection(news_keywords)
-            relevance_multiplier = 1.0 + (0.1 * len(common_keywords))
+        # 基金关键词来自进程内倒排索引，无需逐条新闻访问Redis
+        fund_keyword_index.ensure_fresh()
+        common_keyword_count = fund_keyword_index.overlap(fund_id, news_data['keywords'])
+        if common_keyword_count:
+            relevance_multiplier = 1.0 + (0.1 * common_keyword_count)
     
     # 计算最终影响系数
     # 将情感得分映射到0.5-1.5范围
@@ -65,82 +101,98 @@ def calculate_impact_coefficient(news_data, fund_id):
     
     return final_impact
 
-def calculate_fund_net_value(fund_id, date=None, include_news_impact=True, params=None, db=None):
-    """计算基金净值"""
+def _calculate_news_factor(fund_id, db=None, timer=None):
+    """计算最近24小时新闻窗口对该基金的平均影响系数
+
+    与批量计算使用同一新闻选择（窗口内全部新闻）和同一时间衰减基准（衰减分桶起点），
+    只记录与基金关键词有交集的新闻影响。返回 (新闻影响系数, 新闻条数)
+    """
+    timer = timer or StageTimer("single")
+    news_impact_coefficient = 1.0
+    news_impact_count = 0
+    
+    try:
+        # 通过新闻服务客户端获取相关新闻（连接池复用、带截止时间）
+        with timer.stage("news_fetch"):
+            news_items = fetch_news_window()
+        
+        # 计算每条新闻的影响系数并取平均值
+        if news_items:
+            impact_coefficients = []
+            for news in news_items:
+                with timer.stage("impact"):
+                    impact_coefficient = calculate_impact_coefficient(news, fund_id)
+                impact_coefficients.append(impact_coefficient)
+                
+                # 记录与基金相关的新闻影响（写后批量落库）
+                if db and fund_keyword_index.overlap(fund_id, news.get('keywords')):
+                    with timer.stage("impact_record"):
+                        result_writer.add_news_impact(
+                            news['id'],
+                            fund_id,
+                            impact_coefficient,
+                            factors={
+                                'sentiment_score': news.get('sentiment_score', 0),
+                                'source': news.get('source', ''),
+                                'published_at': news.get('published_at', '')
+                            },
+                            source_news_impact=news.get('impact_coefficient', 0)
+                        )
+            
+            news_impact_coefficient = np.mean(impact_coefficients)
+            news_impact_count = len(news_items)
+    except Exception as e:
+        print(f"Error fetching news: {e}")
+    
+    return news_impact_coefficient, news_impact_count
+
+def calculate_fund_net_value(fund_id, date=None, include_news_impact=True, params=None, db=None, timer=None):
+    """计算基金净值（timer为空时独立计时并上报单基金计算耗时）"""
+    own_timer = timer is None
+    timer = timer or StageTimer("single")
     if date is None:
         date = datetime.utcnow()
     
     # 从缓存或数据库获取基金的最新净值
-    cache_key = f"fund_latest:{fund_id}"
-    latest_fund_data = redis_client.get(cache_key)
+    cache_key = latest_cache_key(fund_id)
+    with timer.stage("cache_lookup"):
+        latest_fund_data = redis_client.get(cache_key)
     
     if latest_fund_data:
         latest_fund_data = json.loads(latest_fund_data)
-        previous_net_value = latest_fund_data.get('net_value', 1.0)
+        previous_net_value = latest_fund_data.get('net_value', DEFAULT_NET_VALUE)
     else:
-        # 这里简化处理，实际应该从数据库查询
-        previous_net_value = 1.0  # 默认初始净值
+        # 缓存未命中时从数据库取最新净值，没有时才使用默认初始净值
+        previous_net_value = load_db_net_values([fund_id], db).get(fund_id, DEFAULT_NET_VALUE)
     
     # 计算基础变化率（这里简化实现，实际应基于资产配置和市场数据）
-    base_change_rate = 0.001  # 假设每日基础变化率为0.1%
+    base_change_rate = BASE_CHANGE_RATE
     
     # 计算新闻影响
     news_impact_coefficient = 1.0
     news_impact_count = 0
     
     if include_news_impact:
-        # 获取最近24小时内与该基金相关的新闻
-        try:
-            # 假设我们通过API调用来获取相关新闻
-            news_response = requests.get(f"http://localhost:8001/news/latest?fund_id={fund_id}&hours=24")
-            if news_response.status_code == 200:
-                news_items = news_response.json()
-                
-                # 计算每条新闻的影响系数并取平均值
-                if news_items:
-                    impact_coefficients = []
-                    for news in news_items:
-                        impact_coefficient = calculate_impact_coefficient(news, fund_id)
-                        impact_coefficients.append(impact_coefficient)
-                        
-                        # 记录新闻影响
-                        if db:
-                            news_impact = NewsImpact(
-                                id=str(uuid.uuid4()),
-                                news_id=news['id'],
-                                fund_id=fund_id,
-                                impact_coefficient=impact_coefficient,
-                                factors={
-                                    'sentiment_score': news.get('sentiment_score', 0),
-                                    'source': news.get('source', ''),
-                                    'published_at': news.get('published_at', '')
-                                },
-                                source_news_impact=news.get('impact_coefficient', 0)
-                            )
-                            db.add(news_impact)
-                    
-                    news_impact_coefficient = np.mean(impact_coefficients)
-                    news_impact_count = len(news_items)
-        except Exception as e:
-            print(f"Error fetching news: {e}")
+        news_impact_coefficient, news_impact_count = _calculate_news_factor(fund_id, db, timer)
     
-    # 计算调整因子（简化实现）
-    adjustment_factor = 1.0
-    if params and 'adjustment' in params:
-        adjustment_factor = 1.0 + params['adjustment']
-    
-    # 计算最终净值
-    net_value = previous_net_value * (1 + base_change_rate) * news_impact_coefficient * adjustment_factor
-    
-    # 应用净值限制（防止异常波动）
-    max_daily_change = 0.1  # 每日最大变化10%
-    min_net_value = previous_net_value * (1 - max_daily_change)
-    max_net_value = previous_net_value * (1 + max_daily_change)
-    net_value = max(min_net_value, min(max_net_value, net_value))
-    
-    # 计算变化百分比
-    change_percentage = ((net_value - previous_net_value) / previous_net_value) * 100
+    with timer.stage("compute"):
+        # 计算调整因子（简化实现）
+        adjustment_factor = adjustment_factor_from_params(params)
+        
+        # 计算最终净值
+        net_value = previous_net_value * (1 + base_change_rate) * news_impact_coefficient * adjustment_factor
+        
+        # 应用净值限制（防止异常波动）
+        max_daily_change = config.calculation.MAX_DAILY_CHANGE  # 每日最大变化10%
+        min_net_value = previous_net_value * (1 - max_daily_change)
+        max_net_value = previous_net_value * (1 + max_daily_change)
+        net_value = max(min_net_value, min(max_net_value, net_value))
+        
+        # 计算变化百分比
+        change_percentage = ((net_value - previous_net_value) / previous_net_value) * 100
     
+    if own_timer:
+        timer.finish()
     return {
         'net_value': round(net_value, 4),
         'previous_net_value': previous_net_value,
@@ -151,6 +203,7 @@ def calculate_fund_net_value(fund_id, date=None, include_news_impact=True, param
 # 基金净值计算函数
 def calculate_net_value(request: CalculateNetValueRequest, db: Session = Depends(get_db)):
     """计算基金净值"""
+    timer = StageTimer("single")
     try:
         # 执行净值计算
         result = calculate_fund_net_value(
@@ -158,31 +211,32 @@ def calculate_net_value(request: CalculateNetValueRequest, db: Session = Depends
             request.date,
             request.include_news_impact,
             request.parameters,
-            db
+            db,
+            timer=timer
         )
         
-        # 创建计算日志
-        log = CalculationLog(
-            id=str(uuid.uuid4()),
-            fund_id=request.fund_id,
-            input_params={
-                'date': request.date.isoformat() if request.date else None,
-                'include_news_impact': request.include_news_impact,
-                'parameters': request.parameters
-            },
-            result=result['net_value'],
-            status="success"
-        )
-        db.add(log)
-        db.commit()
+        # 创建计算日志（写后批量落库）
+        with timer.stage("log_write"):
+            result_writer.add_calculation_log(
+                request.fund_id,
+                input_params={
+                    'date': request.date.isoformat() if request.date else None,
+                    'include_news_impact': request.include_news_impact,
+                    'parameters': request.parameters
+                },
+                result=result['net_value'],
+                status="success"
+            )
         
         # 更新缓存
         cache_key = f"fund_latest:{request.fund_id}"
-        redis_client.set(cache_key, json.dumps({
-            'fund_id': request.fund_id,
-            'net_value': result['net_value'],
-            'calculation_time': datetime.utcnow().isoformat()
-        }))
+        with timer.stage("cache_update"):
+            redis_client.set(cache_key, json.dumps({
+                'fund_id': request.fund_id,
+                'net_value': result['net_value'],
+                'calculation_time': datetime.utcnow().isoformat()
+            }))
+        timer.finish()
         
         return CalculateNetValueResponse(
             fund_id=request.fund_id,
@@ -195,9 +249,8 @@ def calculate_net_value(request: CalculateNetValueRequest, db: Session = Depends
         )
     except Exception as e:
         # 记录错误日志
-        log = CalculationLog(
-            id=str(uuid.uuid4()),
-            fund_id=request.fund_id,
+        result_writer.add_calculation_log(
+            request.fund_id,
             input_params={
                 'date': request.date.isoformat() if request.date else None,
                 'include_news_impact': request.include_news_impact,
@@ -206,112 +259,251 @@ def calculate_net_value(request: CalculateNetValueRequest, db: Session = Depends
             status="error",
             error_message=str(e)
         )
-        db.add(log)
-        db.commit()
         
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/calculate/historical", response_model=HistoricalNetValueResponse)
 def get_historical_net_value(request: HistoricalNetValueRequest, db: Session = Depends(get_db)):
-    """获取基金历史净值数据"""
+    """获取基金历史净值数据
+
+    一次索引查询读取fund_net_values，在NumPy数组上按自然日/周/月边界重采样，
+    以列式结构返回，避免逐行构造Pydantic对象
+    """
     # 验证日期范围
     if request.start_date > request.end_date:
         raise HTTPException(status_code=400, detail="Start date must be before end date")
     
-    # 生成日期列表（简化实现）
-    dates = []
-    current_date = request.start_date
-    delta = {
-        'daily': timedelta(days=1),
-        'weekly': timedelta(weeks=1),
-        'monthly': timedelta(days=30)  # 简化处理，实际应考虑月份天数差异
-    }[request.frequency]
-    
-    while current_date <= request.end_date:
-        dates.append(current_date)
-        current_date += delta
-    
-    # 为每个日期计算净值（这里简化实现，实际应该从数据库查询历史数据）
-    data = []
-    previous_value = 1.0  # 假设初始净值为1.0
-    
-    for date in dates:
-        # 模拟净值计算
-        # 在实际应用中，这里应该查询数据库中的历史净值数据
-        # 为了演示，我们生成随机变化
-        random_change = np.random.normal(0.001, 0.005)
-        net_value = previous_value * (1 + random_change)
-        change_percentage = ((net_value - previous_value) / previous_value) * 100 if previous_value else 0
-        
-        data.append(HistoricalNetValueItem(
-            date=date,
-            net_value=round(net_value, 4),
-            change_percentage=round(change_percentage, 2)
-        ))
-        
-        previous_value = net_value
+    dates, net_values = load_net_value_series(db, request.fund_id, request.start_date, request.end_date)
+    dates, net_values = resample_last(dates, net_values, request.frequency)
+    changes = np.round(change_percentages(net_values), 2)
     
-    return HistoricalNetValueResponse(
-        fund_id=request.fund_id,
-        data=data,
-        total_items=len(data)
-    )
+    return {
+        'fund_id': request.fund_id,
+        'frequency': request.frequency,
+        'dates': np.datetime_as_string(dates, unit='D').tolist(),
+        'net_values': net_values.tolist(),
+        'change_percentages': [None if np.isnan(change) else change for change in changes.tolist()],
+        'total_items': len(net_values)
+    }
 
 @app.post("/calculate/news_impact", response_model=NewsImpactResponse)
 def calculate_news_impact(request: NewsImpactRequest, db: Session = Depends(get_db)):
     """评估新闻对基金的影响"""
     try:
         # 从新闻服务获取新闻详情
-        news_response = requests.get(f"http://localhost:8001/news/{request.news_id}")
-        if news_response.status_code != 200:
+        news_data = news_client.call(news_client.get_news(request.news_id))
+        if news_data is None:
             raise HTTPException(status_code=404, detail="News not found")
         
-        news_data = news_response.json()
-        
         # 计算影响系数
         impact_coefficient = calculate_impact_coefficient(news_data, request.fund_id)
         
-        # 保存计算结果
-        news_impact = NewsImpact(
-            id=str(uuid.uuid4()),
-            news_id=request.news_id,
-            fund_id=request.fund_id,
-            impact_coefficient=impact_coefficient,
-            factors={
-                'sentiment_score': news_data.get('sentiment_score', 0),
-                'source': news_data.get('source', ''),
-                'published_at': news_data.get('published_at', '')
-            },
-            source_news_impact=news_data.get('impact_coefficient', 0)
+        # 保存计算结果（按unique_news_fund唯一键upsert，写后批量落库）
+        factors = {
+            'sentiment_score': news_data.get('sentiment_score', 0),
+            'source': news_data.get('source', ''),
+            'published_at': news_data.get('published_at', '')
+        }
+        source_news_impact = news_data.get('impact_coefficient', 0)
+        result_writer.add_news_impact(
+            request.news_id,
+            request.fund_id,
+            impact_coefficient,
+            factors=factors,
+            source_news_impact=source_news_impact
         )
-        db.add(news_impact)
-        db.commit()
         
         return NewsImpactResponse(
             news_id=request.news_id,
             fund_id=request.fund_id,
             impact_coefficient=impact_coefficient,
             calculated_at=datetime.utcnow(),
-            factors=news_impact.factors,
-            source_news_impact=news_impact.source_news_impact
+            factors=factors,
+            source_news_impact=source_news_impact
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/calculate/backtest")
+def backtest_net_values(request: BacktestRequest, db: Session = Depends(get_db)):
+    """在历史窗口上重放新闻回测净值规则，以NDJSON流式返回每个基金的结果与汇总"""
+    backtest = prepare_backtest(db, request.fund_ids, request.days, request.end_date)
+    lines = (json.dumps(item, ensure_ascii=False) + "\n" for item in stream_backtest(backtest))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@app.on_event("shutdown")
+def stop_backtest_pool():
+    shutdown_backtest_pool()
+
+@app.post("/calculate/simulate")
+def simulate_net_value(request: SimulationRequest, db: Session = Depends(get_db)):
+    """蒙特卡洛模拟基金未来净值分布，返回分位数带"""
+    if any(percentile < 0 or percentile > 100 for percentile in request.percentiles):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100")
+    
+    cache_key = (
+        f"nav_simulation:{request.fund_id}:{request.horizon_days}:{request.seed}:"
+        f"{request.paths}:{request.history_days}:{','.join(f'{p:g}' for p in request.percentiles)}"
+    )
+    cached = cache.get(cache_key)
+    if cached:
+        return cached
+    
+    end_date = datetime.utcnow()
+    _, net_values = load_net_value_series(
+        db, request.fund_id, end_date - timedelta(days=request.history_days), end_date
+    )
+    drift, volatility = estimate_drift_volatility(net_values)
+    start_net_value = float(net_values[-1]) if len(net_values) else DEFAULT_NET_VALUE
+    
+    result = simulate_net_value_bands(
+        start_net_value, drift, volatility,
+        request.horizon_days, request.paths, request.seed, request.percentiles
+    )
+    result['fund_id'] = request.fund_id
+    cache.set(cache_key, result, 3600)
+    return result
+
+@app.get("/calculate/impact_cache/stats")
+def get_impact_cache_stats():
+    """影响系数备忘缓存的命中统计
+
+    只统计单基金标量计算路径（单基金净值计算与/calculate/news_impact）；批量计算使用向量化内核，不经过备忘缓存
+    """
+    return dict(impact_memo.stats(), scope="single_fund")
+
+@app.put("/calculate/keywords/{fund_id}")
+def update_fund_keywords(fund_id: str, request: FundKeywordsRequest):
+    """更新基金关键词，同步刷新关键词倒排索引"""
+    fund_keyword_index.set_fund_keywords(fund_id, request.keywords)
+    return {"fund_id": fund_id, "keywords": sorted(fund_keyword_index.get_keywords(fund_id) or [])}
+
 @app.post("/calculate/batch")
-def batch_calculate_net_value(fund_ids: list, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """批量计算基金净值"""
-    for fund_id in fund_ids:
-        background_tasks.add_task(_batch_calculate_task, fund_id, db)
+def batch_calculate_net_value(fund_ids: list, background_tasks: BackgroundTasks, wait: bool = False):
+    """批量计算基金净值；wait=true时同步执行并返回本次运行的各阶段耗时汇总"""
+    if wait:
+        run_context = CalculationRunContext.create()
+        db = SessionLocal()
+        try:
+            run_batch_calculation(fund_ids, db, run_context)
+        finally:
+            db.close()
+        return {"message": f"Batch calculation finished for {len(fund_ids)} funds",
+                "summary": batch_summary(run_context.run_id)}
+    
+    background_tasks.add_task(_batch_calculate_task, fund_ids)
     
     return {"message": f"Batch calculation started for {len(fund_ids)} funds"}
 
-def _batch_calculate_task(fund_id: str, db: Session):
-    """后台批量计算任务"""
+@app.get("/calculate/batch/summary")
+def get_last_batch_summary(run_id: Optional[str] = None):
+    """指定运行（默认最近一次）批量计算的各阶段耗时与吞吐，p50/p95跨分区和运行汇总"""
+    summary = batch_summary(run_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Batch calculation summary not found")
+    return summary
+
+def _batch_calculate_task(fund_ids: list):
+    """后台批量计算任务（请求结束后运行，使用独立的数据库会话）"""
+    db = SessionLocal()
     try:
-        calculate_net_value(
-            CalculateNetValueRequest(fund_id=fund_id),
-            db
-        )
+        run_batch_calculation(fund_ids, db)
     except Exception as e:
-        print(f"Batch calculation error for fund {fund_id}: {e}")
\ No newline at end of file
+        print(f"Batch calculation error for {len(fund_ids)} funds: {e}")
+    finally:
+        db.close()
+
+# 增量重算：新闻到达时只标记受影响的基金
+@app.post("/calculate/news_arrived")
+def mark_news_arrived(request: NewsArrivalRequest, db: Session = Depends(get_db)):
+    """新闻处理完成后调用，标记关键词或基金类型受影响的基金为待重算"""
+    dirty_fund_tracker.ensure_fund_types(db)
+    affected = dirty_fund_tracker.mark_news(
+        request.keywords,
+        (request.categories or []) + (request.related_fund_types or [])
+    )
+    return {"news_id": request.news_id, "marked_funds": len(affected)}
+
+@app.post("/calculate/recompute")
+def recompute_dirty_funds(background_tasks: BackgroundTasks):
+    """只重算待重算集合中的基金，其余基金沿用缓存中的净值"""
+    fund_ids = dirty_fund_tracker.drain()
+    if fund_ids:
+        background_tasks.add_task(_recompute_task, fund_ids)
+    return {"message": f"Recalculation started for {len(fund_ids)} funds"}
+
+def _recompute_task(fund_ids: list):
+    """重算已取出的待重算基金；失败时重新标记，留待下次重算"""
+    db = SessionLocal()
+    try:
+        run_batch_calculation(fund_ids, db)
+    except Exception as e:
+        print(f"Recalculation error for {len(fund_ids)} funds, marking them dirty again: {e}")
+        dirty_fund_tracker.mark(fund_ids)
+    finally:
+        db.close()
+
+# 定时计算调度：每CALCULATION_INTERVAL秒按分区重算全部活跃基金
+calculation_scheduler = CalculationScheduler(run_batch_calculation)
+
+@app.on_event("startup")
+def start_calculation_scheduler():
+    if config.calculation.SCHEDULER_ENABLED:
+        calculation_scheduler.start()
+
+@app.on_event("shutdown")
+def stop_calculation_scheduler():
+    calculation_scheduler.stop(timeout=30)
+
+@app.post("/calculate/scheduler/run")
+def trigger_scheduled_run(background_tasks: BackgroundTasks):
+    """立即发起一次全量计算运行；上一次运行未结束时该次运行会被跳过"""
+    background_tasks.add_task(calculation_scheduler.run_once)
+    return {"message": "Scheduled calculation run triggered"}
+
+@app.get("/calculate/scheduler/runs")
+def get_scheduler_runs(limit: int = 20, db: Session = Depends(get_db)):
+    """最近运行的耗时与吞吐"""
+    return {
+        "interval_seconds": calculation_scheduler.interval,
+        "last_run": calculation_scheduler.last_run,
+        "runs": calculation_scheduler.recent_runs(db, limit)
+    }
+
+# 分布式计算：协调者将基金切块推入作业队列，任意数量的工作进程消费
+job_queue = create_job_queue()
+nav_job_coordinator = NavJobCoordinator(job_queue)
+local_queue_workers = []
+
+@app.on_event("startup")
+def start_local_queue_workers():
+    """在计算服务进程内启动QUEUE_LOCAL_WORKERS个消费线程（独立工作进程见job_queue.main）"""
+    for _ in range(config.calculation.QUEUE_LOCAL_WORKERS):
+        worker = NavCalculationWorker(job_queue, run_batch_calculation)
+        threading.Thread(target=worker.run, name=f"calculation-{worker.consumer}", daemon=True).start()
+        local_queue_workers.append(worker)
+
+@app.on_event("shutdown")
+def stop_local_queue_workers():
+    for worker in local_queue_workers:
+        worker.stop()
+
+@app.post("/calculate/distributed")
+def submit_distributed_calculation(request: DistributedCalculationRequest, db: Session = Depends(get_db)):
+    """提交分布式净值计算作业"""
+    fund_ids = request.fund_ids or db.execute(
+        select(Fund.id).where(Fund.status == FundStatus.ACTIVE).order_by(Fund.id)
+    ).scalars().all()
+    coordinator = nav_job_coordinator
+    if request.chunk_size:
+        coordinator = NavJobCoordinator(job_queue, request.chunk_size)
+    job_id = coordinator.submit(fund_ids)
+    return coordinator.status(job_id)
+
+@app.get("/calculate/distributed/{job_id}")
+def get_distributed_calculation(job_id: str):
+    """分布式计算作业的进度、耗时与吞吐"""
+    job = nav_job_coordinator.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
\ No newline at end of file
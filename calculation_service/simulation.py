@@ -0,0 +1,99 @@
+import numpy as np
+from typing import Dict, Sequence, Tuple
+from config.config import config
+
+# 历史数据不足时使用的默认日漂移与波动率
+DEFAULT_DRIFT = 0.001
+DEFAULT_VOLATILITY = 0.005
+# 每个分块模拟的路径数；分块数量只取决于路径数，保证同一种子结果可复现
+CHUNK_PATHS = 10000
+# 路径数×天数不超过该值时精确计算分位数，否则使用按天直方图近似
+EXACT_PERCENTILE_CELLS = 5000000
+HISTOGRAM_BINS = 4096
+
+def estimate_drift_volatility(net_values: np.ndarray) -> Tuple[float, float]:
+    """由历史净值的对数收益率估计日漂移与波动率"""
+    net_values = net_values[net_values > 0]
+    if len(net_values) < 3:
+        return DEFAULT_DRIFT, DEFAULT_VOLATILITY
+    log_returns = np.diff(np.log(net_values))
+    return float(log_returns.mean()), float(log_returns.std(ddof=1))
+
+def _chunk_log_paths(rng: np.random.Generator, paths: int, horizon: int, drift: float, volatility: float) -> np.ndarray:
+    """生成一个分块的对数净值增量累积 (路径数, 天数)，日变化按±MAX_DAILY_CHANGE限幅"""
+    max_daily_change = config.calculation.MAX_DAILY_CHANGE
+    daily_returns = np.expm1(rng.normal(drift, volatility, size=(paths, horizon)))
+    np.clip(daily_returns, -max_daily_change, max_daily_change, out=daily_returns)
+    return np.cumsum(np.log1p(daily_returns, out=daily_returns), axis=1)
+
+def _histogram_percentiles(counts: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+                           percentiles: Sequence[float]) -> np.ndarray:
+    """由按天直方图计算分位数（桶内线性插值），返回 (分位数个数, 天数)"""
+    bins = counts.shape[1]
+    cumulative = np.cumsum(counts, axis=1)
+    total = cumulative[:, -1]
+    width = (upper - lower) / bins
+    result = np.empty((len(percentiles), counts.shape[0]), dtype=np.float64)
+    for k, percentile in enumerate(percentiles):
+        target = total * percentile / 100.0
+        bin_index = np.minimum((cumulative < target[:, None]).sum(axis=1), bins - 1)
+        days = np.arange(counts.shape[0])
+        before = np.where(bin_index > 0, cumulative[days, bin_index - 1], 0)
+        in_bin = np.maximum(counts[days, bin_index], 1)
+        fraction = np.clip((target - before) / in_bin, 0.0, 1.0)
+        result[k] = lower + (bin_index + fraction) * width
+    return result
+
+def simulate_net_value_bands(start_net_value: float, drift: float, volatility: float, horizon: int,
+                             paths: int, seed: int, percentiles: Sequence[float]) -> Dict:
+    """生成带种子的蒙特卡洛净值路径并返回分位数带
+
+    路径按CHUNK_PATHS分块生成，每块使用由种子派生的独立随机流；
+    规模较小时保留全部路径精确计算分位数，规模较大时只累积按天直方图，内存占用与路径数无关
+    """
+    chunk_count = -(-paths // CHUNK_PATHS)
+    streams = [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(chunk_count)]
+    exact = paths * horizon <= EXACT_PERCENTILE_CELLS
+
+    # 直方图范围：第t天的对数累计变化在[t·ln(1-c), t·ln(1+c)]之间
+    max_daily_change = config.calculation.MAX_DAILY_CHANGE
+    steps = np.arange(1, horizon + 1, dtype=np.float64)
+    lower = steps * np.log1p(-max_daily_change)
+    upper = steps * np.log1p(max_daily_change)
+    counts = None if exact else np.zeros((horizon, HISTOGRAM_BINS), dtype=np.int64)
+    exact_chunks = []
+    ratio_sum = np.zeros(horizon, dtype=np.float64)
+
+    for i, rng in enumerate(streams):
+        chunk_paths = min(CHUNK_PATHS, paths - i * CHUNK_PATHS)
+        log_paths = _chunk_log_paths(rng, chunk_paths, horizon, drift, volatility)
+        ratio_sum += np.exp(log_paths).sum(axis=0)
+        if exact:
+            exact_chunks.append(log_paths)
+        else:
+            bins = ((log_paths - lower) / (upper - lower) * HISTOGRAM_BINS).astype(np.int64)
+            np.clip(bins, 0, HISTOGRAM_BINS - 1, out=bins)
+            flat = (np.arange(horizon) * HISTOGRAM_BINS + bins).ravel()
+            counts += np.bincount(flat, minlength=horizon * HISTOGRAM_BINS).reshape(horizon, HISTOGRAM_BINS)
+
+    if exact:
+        bands = np.percentile(np.concatenate(exact_chunks, axis=0), percentiles, axis=0)
+    else:
+        bands = _histogram_percentiles(counts, lower, upper, percentiles)
+
+    mean_path = start_net_value * ratio_sum / paths
+    return {
+        'start_net_value': start_net_value,
+        'drift': drift,
+        'volatility': volatility,
+        'horizon_days': horizon,
+        'paths': paths,
+        'seed': seed,
+        'exact': exact,
+        'mean': np.round(mean_path, 4).tolist(),
+        'bands': {
+            f"p{percentile:g}": np.round(start_net_value * np.exp(band), 4).tolist()
+            for percentile, band in zip(percentiles, bands)
+        },
+        'expected_terminal_net_value': round(float(mean_path[-1]), 4)
+    }
\ No newline at end of file
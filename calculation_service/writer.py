@@ -0,0 +1,227 @@
+import atexit
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import insert
+from config.config import config
+from common.monitoring import NET_VALUE_STAGE_TIME
+from database.database import SessionLocal, upsert_rows
+from .models import CalculationLog, NewsImpact
+
+# 放弃写入的行以JSON记录到该日志，供人工排查与补录
+dead_letter_logger = logging.getLogger("calculation_service.dead_letter")
+
+# NewsImpact按unique_news_fund唯一键去重/更新的列
+NEWS_IMPACT_CONFLICT_COLUMNS = ['news_id', 'fund_id']
+NEWS_IMPACT_UPDATE_COLUMNS = ['impact_coefficient', 'calculated_at', 'factors', 'source_news_impact']
+
+class BulkWriter:
+    """NewsImpact与CalculationLog的写后批量落库器
+
+    计算路径只把行追加到内存缓冲，缓冲达到max_batch_size时唤醒落库线程，
+    或每隔flush_interval秒用多行INSERT一次性写入；NewsImpact按(news_id, fund_id)做upsert。
+    写入失败的行放回缓冲，之后逐行重试以隔离无法写入的行，累计max_retries次失败后
+    转入死信日志；缓冲达到max_buffer_size时新行直接转入死信日志。
+    进程退出时自动落库剩余数据。
+    """
+
+    def __init__(self, session_factory=None, max_batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None, max_retries: Optional[int] = None,
+                 max_buffer_size: Optional[int] = None):
+        self.session_factory = session_factory or SessionLocal
+        self.max_batch_size = max_batch_size or config.calculation.WRITE_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else config.calculation.WRITE_FLUSH_INTERVAL
+        self.max_retries = max_retries or config.calculation.WRITE_MAX_RETRIES
+        self.max_buffer_size = max_buffer_size or config.calculation.WRITE_MAX_BUFFER
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # 以(news_id, fund_id)为键，同一批内后写入的覆盖先写入的
+        self._news_impacts: Dict[tuple, dict] = {}
+        self._calculation_logs: List[dict] = []
+        # 行ID -> 已失败的写入次数（只在持有_flush_lock时读写）
+        self._attempts: Dict[str, int] = {}
+        self.dead_letters = 0
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread = None
+
+    def add_news_impact(self, news_id, fund_id, impact_coefficient, factors=None, source_news_impact=None):
+        """缓冲一条新闻影响记录"""
+        row = {
+            'id': str(uuid.uuid4()),
+            'news_id': news_id,
+            'fund_id': fund_id,
+            'impact_coefficient': impact_coefficient,
+            'calculated_at': datetime.utcnow(),
+            'factors': factors,
+            'source_news_impact': source_news_impact
+        }
+        with self._lock:
+            key = (news_id, fund_id)
+            accepted = key in self._news_impacts or self._pending_count() < self.max_buffer_size
+            if accepted:
+                self._news_impacts[key] = row
+            should_flush = self._pending_count() >= self.max_batch_size
+        if not accepted:
+            self._dead_letter('news_impact', row, "buffer full")
+        if should_flush:
+            self._request_flush()
+
+    def add_calculation_log(self, fund_id, input_params=None, result=None, status="success", error_message=None):
+        """缓冲一条计算日志"""
+        row = {
+            'id': str(uuid.uuid4()),
+            'fund_id': fund_id,
+            'calculation_time': datetime.utcnow(),
+            'input_params': input_params,
+            'result': result,
+            'status': status,
+            'error_message': error_message[:500] if error_message else None
+        }
+        with self._lock:
+            accepted = self._pending_count() < self.max_buffer_size
+            if accepted:
+                self._calculation_logs.append(row)
+            should_flush = self._pending_count() >= self.max_batch_size
+        if not accepted:
+            self._dead_letter('calculation_log', row, "buffer full")
+        if should_flush:
+            self._request_flush()
+
+    def _pending_count(self) -> int:
+        return len(self._news_impacts) + len(self._calculation_logs)
+
+    def pending_count(self) -> int:
+        """缓冲中尚未落库的行数"""
+        with self._lock:
+            return self._pending_count()
+
+    def _request_flush(self):
+        """缓冲已满一批：唤醒落库线程，不在调用方（请求线程）中同步写库"""
+        if self._thread is not None:
+            self._wake_event.set()
+        else:
+            self.flush()
+
+    def _dead_letter(self, kind: str, row: dict, reason: str):
+        self.dead_letters += 1
+        dead_letter_logger.error(json.dumps({'kind': kind, 'reason': reason, 'row': row}, default=str))
+
+    def _write(self, news_impacts: List[dict], calculation_logs: List[dict]):
+        """在一个事务中写入给定的行"""
+        db = self.session_factory()
+        started = time.perf_counter()
+        try:
+            if news_impacts:
+                upsert_rows(
+                    db,
+                    NewsImpact.__table__,
+                    news_impacts,
+                    NEWS_IMPACT_CONFLICT_COLUMNS,
+                    NEWS_IMPACT_UPDATE_COLUMNS,
+                    chunk_size=self.max_batch_size
+                )
+            for start in range(0, len(calculation_logs), self.max_batch_size):
+                db.execute(insert(CalculationLog.__table__).values(
+                    calculation_logs[start:start + self.max_batch_size]
+                ))
+            db.commit()
+            NET_VALUE_STAGE_TIME.labels(stage="db_commit", mode="writer").observe(time.perf_counter() - started)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _retry_later(self, news_impacts: List[dict], calculation_logs: List[dict], error: Exception):
+        """失败次数未达上限的行放回缓冲，达到上限的转入死信日志"""
+        requeued_logs = []
+        with self._lock:
+            for kind, rows in (('news_impact', news_impacts), ('calculation_log', calculation_logs)):
+                for row in rows:
+                    attempts = self._attempts.pop(row['id'], 0) + 1
+                    if attempts >= self.max_retries:
+                        self._dead_letter(kind, row, str(error)[:500])
+                        continue
+                    if kind == 'news_impact':
+                        # 期间同一(news_id, fund_id)有更新的行时丢弃旧行
+                        key = (row['news_id'], row['fund_id'])
+                        if key in self._news_impacts:
+                            continue
+                        self._news_impacts[key] = row
+                    else:
+                        requeued_logs.append(row)
+                    self._attempts[row['id']] = attempts
+            self._calculation_logs = requeued_logs + self._calculation_logs
+
+    def flush(self) -> int:
+        """将缓冲中的行写入数据库，返回写入行数
+
+        新行整批写入；曾经失败过的行逐行写入，使个别无法写入的行不再拖累整批
+        """
+        with self._flush_lock:
+            with self._lock:
+                news_impacts = list(self._news_impacts.values())
+                calculation_logs = self._calculation_logs
+                self._news_impacts = {}
+                self._calculation_logs = []
+            if not news_impacts and not calculation_logs:
+                return 0
+
+            written = 0
+            fresh_impacts = [row for row in news_impacts if row['id'] not in self._attempts]
+            fresh_logs = [row for row in calculation_logs if row['id'] not in self._attempts]
+            retried = ([([row], []) for row in news_impacts if row['id'] in self._attempts]
+                       + [([], [row]) for row in calculation_logs if row['id'] in self._attempts])
+            if fresh_impacts or fresh_logs:
+                try:
+                    self._write(fresh_impacts, fresh_logs)
+                    written += len(fresh_impacts) + len(fresh_logs)
+                except Exception as e:
+                    print(f"Bulk write error: {str(e)}")
+                    self._retry_later(fresh_impacts, fresh_logs, e)
+
+            for rows in retried:
+                try:
+                    self._write(*rows)
+                    written += 1
+                    for row in rows[0] + rows[1]:
+                        self._attempts.pop(row['id'], None)
+                except Exception as e:
+                    print(f"Bulk write retry error: {str(e)}")
+                    self._retry_later(*rows, e)
+            return written
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake_event.wait(self.flush_interval)
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                return
+            self.flush()
+
+    def start(self):
+        """启动落库线程（定时或缓冲满一批时唤醒），并注册进程退出时的落库"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="calculation-bulk-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """停止落库线程并落库全部剩余数据"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+
+# 计算服务共享的写入器
+result_writer = BulkWriter()
+result_writer.start()
\ No newline at end of file
@@ -3,6 +3,11 @@ from datetime import timedelta
 import os
 import redis
 import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
 
 class RedisCache:
     def __init__(self):
@@ -56,6 +61,36 @@ class RedisCache:
             print(f"Redis set error: {str(e)}")
             return False
     
+    def get_many(self, keys: list):
+        """批量获取缓存数据（单次MGET），返回与keys顺序一致的列表"""
+        if not self.client or not keys:
+            return [None] * len(keys)
+
+        try:
+            values = self.client.mget(keys)
+            return [json.loads(value) if value else None for value in values]
+        except Exception as e:
+            print(f"Redis mget error: {str(e)}")
+            return [None] * len(keys)
+
+    def set_many(self, items: dict, expire_seconds: Optional[int] = 3600):
+        """批量设置缓存数据（使用pipeline，一次往返）；expire_seconds为None时不过期"""
+        if not self.client or not items:
+            return False
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in items.items():
+                if expire_seconds is None:
+                    pipe.set(key, json.dumps(value))
+                else:
+                    pipe.setex(key, timedelta(seconds=expire_seconds), json.dumps(value))
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Redis pipeline set error: {str(e)}")
+            return False
+
     def delete(self, key: str):
         """删除缓存数据"""
         if not self.client:
@@ -82,5 +117,223 @@ class RedisCache:
             print(f"Redis clear pattern error: {str(e)}")
             return False
 
+# 回源结果写回Redis：只有键的版本号仍为回源前读到的值、且键不存在时才写入
+LOADED_SET_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+if redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3], 'NX') then
+    return 1
+end
+return 0
+"""
+
+class TwoTierCache:
+    """进程内LRU + Redis 两级读穿缓存，写入方通过pub/sub广播失效
+
+    - 读：先查进程内LRU，未命中查Redis，再未命中调用loader回源并写回两级
+    - 写：更新Redis与本地并递增键的版本号，然后在channel上发布失效消息，其他进程收到后丢弃本地条目
+    - 回源写回Redis以版本号为条件：回源期间有写入或失效时放弃写回，旧值不会覆盖新值
+    - 本地条目另有较短TTL，作为漏收失效消息时的兜底；订阅断线重连后清空本地
+    值为可JSON序列化的dict，序列化由调用方统一定义。
+    """
+
+    def __init__(self, channel: str, max_entries: int = 10000, local_ttl_seconds: float = 60,
+                 redis_ttl_seconds: int = 3600, redis_cache: Optional[RedisCache] = None):
+        self.channel = channel
+        self.max_entries = max_entries
+        self.local_ttl_seconds = local_ttl_seconds
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self.redis = redis_cache or cache
+        self.origin = uuid.uuid4().hex
+        # key -> (过期时间, 值)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # 每收到一次失效递增，回源期间发生失效的结果不写入本地
+        self._generation = 0
+        self._listener = None
+        self._loaded_set = None
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # 本地LRU
+    def _local_get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _local_set(self, key: str, value: dict, generation: Optional[int] = None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.local_ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _local_drop(self, keys: Iterable[str]):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear_local(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    # 版本号
+    @staticmethod
+    def _version_key(key: str) -> str:
+        return f"cache_version:{key}"
+
+    def _read_version(self, key: str) -> Optional[str]:
+        """回源前读取键的版本号（不存在时为空串）；Redis不可用时返回None"""
+        if not self.redis.client:
+            return None
+        try:
+            return self.redis.client.get(self._version_key(key)) or ''
+        except Exception as e:
+            print(f"Redis get error: {str(e)}")
+            return None
+
+    def _bump_versions(self, pipe, keys: Iterable[str]):
+        for key in keys:
+            pipe.incr(self._version_key(key))
+            pipe.expire(self._version_key(key), self.redis_ttl_seconds)
+
+    def _store_loaded(self, key: str, value: dict, version: str):
+        """版本号未变化时把回源结果写入Redis"""
+        try:
+            if self._loaded_set is None:
+                self._loaded_set = self.redis.client.register_script(LOADED_SET_SCRIPT)
+            self._loaded_set(keys=[key, self._version_key(key)],
+                             args=[version, json.dumps(value), self.redis_ttl_seconds])
+        except Exception as e:
+            print(f"Redis set error: {str(e)}")
+
+    # 读写
+    def get(self, key: str, loader: Optional[Callable[[], Optional[dict]]] = None) -> Optional[dict]:
+        """读穿：本地 -> Redis -> loader；loader返回None时不缓存"""
+        self.start_listener()
+        value = self._local_get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        generation = self._generation
+        value = self.redis.get(key)
+        if value is not None:
+            self.redis_hits += 1
+            self._local_set(key, value, generation)
+            return value
+
+        self.misses += 1
+        if loader is None:
+            return None
+        version = self._read_version(key)
+        value = loader()
+        if value is not None:
+            if version is not None:
+                self._store_loaded(key, value, version)
+            self._local_set(key, value, generation)
+        return value
+
+    def set(self, key: str, value: dict):
+        """写入新值并通知其他进程丢弃旧的本地条目"""
+        if self.redis.client:
+            try:
+                pipe = self.redis.client.pipeline(transaction=True)
+                pipe.set(key, json.dumps(value), ex=self.redis_ttl_seconds)
+                self._bump_versions(pipe, [key])
+                pipe.execute()
+            except Exception as e:
+                print(f"Redis set error: {str(e)}")
+        self._local_drop([key])
+        self._local_set(key, value)
+        self._publish([key])
+
+    def invalidate(self, *keys: str):
+        """删除两级缓存中的条目并广播失效"""
+        if not keys:
+            return
+        self._local_drop(keys)
+        if self.redis.client:
+            try:
+                pipe = self.redis.client.pipeline(transaction=True)
+                pipe.delete(*keys)
+                self._bump_versions(pipe, keys)
+                pipe.execute()
+            except Exception as e:
+                print(f"Redis delete error: {str(e)}")
+        self._publish(keys)
+
+    def _publish(self, keys: Iterable[str]):
+        if not self.redis.client:
+            return
+        try:
+            self.redis.client.publish(self.channel, json.dumps({'origin': self.origin, 'keys': list(keys)}))
+        except Exception as e:
+            print(f"Redis publish error: {str(e)}")
+
+    # 失效订阅
+    def start_listener(self):
+        """启动后台订阅线程（每个进程一个，重复调用无副作用）"""
+        if self._listener is not None or not self.redis.client:
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(target=self._listen, name=f"cache-invalidation-{self.channel}", daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # 订阅建立前可能漏收失效消息
+                self.clear_local()
+                for message in pubsub.listen():
+                    self._on_message(message.get('data'))
+            except Exception as e:
+                print(f"Cache invalidation listener error: {str(e)}")
+                self.clear_local()
+                time.sleep(1)
+
+    def _on_message(self, data):
+        try:
+            payload = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if payload.get('origin') == self.origin:
+            return
+        self.invalidations += 1
+        self._local_drop(payload.get('keys', []))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            'size': size,
+            'max_entries': self.max_entries,
+            'local_hits': self.hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'invalidations_received': self.invalidations,
+            'local_hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
 # 创建缓存实例
-cache = RedisCache()
\ No newline at end of file
+cache = RedisCache()
+# 底层Redis客户端（直接使用redis-py接口的模块共用）
+redis_client = cache.client
\ No newline at end of file
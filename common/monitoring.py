@@ -1,4 +1,8 @@
 from prometheus_client import Counter, Histogram, Gauge
+from collections import deque
+from contextlib import contextmanager
+import math
+import threading
 import time
 from starlette.requests import Request
 from starlette.responses import Response
@@ -43,10 +47,25 @@ TRANSACTION_COUNT = Counter(
     ['type', 'status']
 )
 
-# 基金净值计算指标
+# 基金净值计算指标（mode: single单基金调用 / batch批量运行）
 NET_VALUE_CALCULATION_TIME = Histogram(
     'net_value_calculation_time_seconds', 
-    'Time taken to calculate fund net value'
+    'Time taken to calculate fund net value',
+    ['mode']
+)
+
+# 基金净值计算各阶段耗时
+NET_VALUE_STAGE_TIME = Histogram(
+    'net_value_calculation_stage_seconds',
+    'Time spent in each stage of the fund net value calculation',
+    ['stage', 'mode']
+)
+
+# 最近一次计算的吞吐（基金数/秒）
+NET_VALUE_CALCULATION_THROUGHPUT = Gauge(
+    'net_value_calculation_funds_per_second',
+    'Funds calculated per second in the latest calculation',
+    ['mode']
 )
 
 # API网关请求分发指标
@@ -56,6 +75,94 @@ API_GATEWAY_REQUESTS = Counter(
     ['service', 'status_code']
 )
 
+# 每个 (模式, 阶段) 保留的最近耗时样本数，用于跨分区、跨运行计算分位数
+STAGE_SAMPLE_WINDOW = 2048
+
+def _percentile(sorted_samples, percentile):
+    """最近秩法计算分位数"""
+    rank = max(1, math.ceil(percentile / 100 * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+class StageSamples:
+    """进程内按 (模式, 阶段) 保留最近的耗时样本（滚动窗口）
+
+    单次计算每个阶段通常只有一个样本，分位数需要在多个分区和多次运行之间汇总
+    """
+
+    def __init__(self, window: int = STAGE_SAMPLE_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, mode: str, stage: str, elapsed: float):
+        with self._lock:
+            samples = self._samples.get((mode, stage))
+            if samples is None:
+                samples = self._samples[(mode, stage)] = deque(maxlen=self.window)
+            samples.append(elapsed)
+
+    def quantiles(self, mode: str, stage: str) -> dict:
+        """窗口内样本数与p50/p95"""
+        with self._lock:
+            ordered = sorted(self._samples.get((mode, stage), ()))
+        if not ordered:
+            return {'window_samples': 0, 'p50_seconds': None, 'p95_seconds': None}
+        return {
+            'window_samples': len(ordered),
+            'p50_seconds': round(_percentile(ordered, 50), 6),
+            'p95_seconds': round(_percentile(ordered, 95), 6)
+        }
+
+# 进程级阶段耗时样本窗口
+stage_samples = StageSamples()
+
+class StageTimer:
+    """净值计算分阶段计时器
+
+    每个阶段的耗时同时写入Prometheus直方图、进程级样本窗口与本次计算的样本，
+    summary()给出本次计算各阶段的次数与总耗时，p50/p95取自样本窗口（跨分区、跨运行）
+    """
+
+    def __init__(self, mode: str = "single"):
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.samples = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.samples.setdefault(name, []).append(elapsed)
+            stage_samples.add(self.mode, name, elapsed)
+            NET_VALUE_STAGE_TIME.labels(stage=name, mode=self.mode).observe(elapsed)
+
+    def finish(self, fund_count: int = 1) -> dict:
+        """结束计时，记录总耗时与吞吐并返回汇总"""
+        total = time.perf_counter() - self.started
+        NET_VALUE_CALCULATION_TIME.labels(mode=self.mode).observe(total)
+        funds_per_second = fund_count / total if total > 0 else 0.0
+        NET_VALUE_CALCULATION_THROUGHPUT.labels(mode=self.mode).set(funds_per_second)
+        return self.summary(fund_count, total, funds_per_second)
+
+    def summary(self, fund_count: int, total: float, funds_per_second: float) -> dict:
+        stages = {}
+        for name, samples in self.samples.items():
+            stages[name] = dict(
+                stage_samples.quantiles(self.mode, name),
+                count=len(samples),
+                total_seconds=round(sum(samples), 6)
+            )
+        return {
+            'mode': self.mode,
+            'fund_count': fund_count,
+            'total_seconds': round(total, 6),
+            'funds_per_second': round(funds_per_second, 2),
+            'stages': stages
+        }
+
 def track_request_metrics():
     """FastAPI中间件，用于跟踪请求指标"""
     async def middleware(request: Request, call_next):
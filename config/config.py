@@ -94,6 +94,13 @@ class MicroserviceConfig:
     NEWS_SERVICE_URL = os.environ.get("NEWS_SERVICE_URL", "http://localhost:8001")
     CALCULATION_SERVICE_URL = os.environ.get("CALCULATION_SERVICE_URL", "http://localhost:8002")
     FUND_SERVICE_URL = os.environ.get("FUND_SERVICE_URL", "http://localhost:8003")
+    
+    # 服务间调用客户端配置
+    CLIENT_TIMEOUT = float(os.environ.get("SERVICE_CLIENT_TIMEOUT", "5.0"))  # 单次调用截止时间（秒）
+    CLIENT_MAX_CONNECTIONS = int(os.environ.get("SERVICE_CLIENT_MAX_CONNECTIONS", "20"))  # 连接池大小
+    CLIENT_MAX_CONCURRENCY = int(os.environ.get("SERVICE_CLIENT_MAX_CONCURRENCY", "10"))  # 最大并发请求数
+    CLIENT_HEDGE_DELAY = float(os.environ.get("SERVICE_CLIENT_HEDGE_DELAY", "0.5"))  # 对冲请求延迟（秒），0表示关闭
+    CLIENT_WINDOW_DEADLINE = float(os.environ.get("SERVICE_CLIENT_WINDOW_DEADLINE", "30.0"))  # 分页拉取新闻窗口的总截止时间（秒）
 
 # 日志配置
 class LogConfig:
@@ -129,6 +136,15 @@ class UserConfig:
     
     # 交易限额开关
     ENABLE_TRANSACTION_LIMITS = os.environ.get("ENABLE_TRANSACTION_LIMITS", "False").lower() == "true"  # 默认关闭限额
+    
+    # 密码哈希配置（bcrypt成本策略与独立进程池）
+    PASSWORD_HASH_ROUNDS = int(os.environ.get("PASSWORD_HASH_ROUNDS", "14"))  # 新哈希使用的bcrypt成本
+    PASSWORD_HASH_MIN_ROUNDS = int(os.environ.get("PASSWORD_HASH_MIN_ROUNDS", str(PASSWORD_HASH_ROUNDS)))  # 低于该成本的哈希在登录时重新哈希
+    PASSWORD_HASH_MAX_ROUNDS = int(os.environ.get("PASSWORD_HASH_MAX_ROUNDS", str(PASSWORD_HASH_ROUNDS)))  # 高于该成本的哈希在登录时重新哈希
+    # 哈希进程数，0表示在请求线程内执行；Vercel等无法创建子进程的环境默认为0
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "0" if os.environ.get("VERCEL") else "2"))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "8"))  # 排队+执行中的任务上限，超过返回429
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", "10.0"))  # 单次哈希/校验等待上限（秒）
 
 # 计算服务配置
 class CalculationConfig:
@@ -141,6 +157,63 @@ class CalculationConfig:
     TIME_DECAY_FACTOR = float(os.environ.get("TIME_DECAY_FACTOR", "0.1"))  # 时间衰减因子
     SOURCE_RELIABILITY_WEIGHT = float(os.environ.get("SOURCE_RELIABILITY_WEIGHT", "0.3"))
     KEYWORD_RELEVANCE_WEIGHT = float(os.environ.get("KEYWORD_RELEVANCE_WEIGHT", "0.2"))
+    
+    # 影响系数备忘缓存配置
+    IMPACT_MEMO_SIZE = int(os.environ.get("IMPACT_MEMO_SIZE", "100000"))  # 最大缓存条目数
+    IMPACT_DECAY_BUCKET_SECONDS = int(os.environ.get("IMPACT_DECAY_BUCKET_SECONDS", "300"))  # 时间衰减分桶（秒）
+    
+    # 定时计算调度配置
+    CALCULATION_INTERVAL = int(os.environ.get("CALCULATION_INTERVAL", "3600"))  # 计算间隔（秒）
+    SCHEDULER_ENABLED = os.environ.get("CALCULATION_SCHEDULER_ENABLED", "True").lower() == "true"
+    SCHEDULER_WORKERS = int(os.environ.get("CALCULATION_SCHEDULER_WORKERS", "4"))  # 分区工作线程数
+    SCHEDULER_PARTITION_SIZE = int(os.environ.get("CALCULATION_PARTITION_SIZE", "500"))  # 每个分区的基金数
+    SCHEDULER_LEASE_SECONDS = int(os.environ.get("CALCULATION_LEASE_SECONDS", "300"))  # 分区租约时长，过期后可被其他工作者接管
+    
+    # 分布式计算作业队列配置
+    QUEUE_BACKEND = os.environ.get("CALCULATION_QUEUE_BACKEND", "redis")  # redis 或 memory
+    QUEUE_STREAM = os.environ.get("CALCULATION_QUEUE_STREAM", "calc:nav_jobs")
+    QUEUE_CHUNK_SIZE = int(os.environ.get("CALCULATION_QUEUE_CHUNK_SIZE", "200"))  # 每个块的基金数
+    QUEUE_MAX_ATTEMPTS = int(os.environ.get("CALCULATION_QUEUE_MAX_ATTEMPTS", "3"))  # 块最大尝试次数
+    QUEUE_VISIBILITY_TIMEOUT = int(os.environ.get("CALCULATION_QUEUE_VISIBILITY_TIMEOUT", "300"))  # 未确认块被重新认领的空闲时间（秒）
+    QUEUE_LOCAL_WORKERS = int(os.environ.get("CALCULATION_QUEUE_LOCAL_WORKERS", "0"))  # 计算服务进程内的消费线程数
+    
+    # 回测配置
+    BACKTESTING_DAYS = int(os.environ.get("BACKTESTING_DAYS", "90"))  # 回测天数
+    BACKTEST_WORKERS = int(os.environ.get("BACKTEST_WORKERS", "0"))  # 回测进程数，0表示使用全部CPU核心
+    
+    # 计算结果写入配置（写后批量落库）
+    WRITE_BATCH_SIZE = int(os.environ.get("CALCULATION_WRITE_BATCH_SIZE", "1000"))  # 缓冲达到该行数立即落库
+    WRITE_FLUSH_INTERVAL = float(os.environ.get("CALCULATION_WRITE_FLUSH_INTERVAL", "2.0"))  # 定时落库间隔（秒）
+    WRITE_MAX_RETRIES = int(os.environ.get("CALCULATION_WRITE_MAX_RETRIES", "5"))  # 每行最多写入次数，超过后转入死信日志
+    WRITE_MAX_BUFFER = int(os.environ.get("CALCULATION_WRITE_MAX_BUFFER", "100000"))  # 缓冲行数上限，满时新行转入死信日志
+
+# 基金服务配置
+class FundConfig:
+    # 列式净值存储目录（每个基金一个内存映射文件）
+    NAV_STORE_DIR = os.environ.get("NAV_STORE_DIR", os.path.join(os.getcwd(), "data", "nav_store"))
+    
+    # 基金信息两级缓存（进程内LRU + Redis，pub/sub广播失效）
+    FUND_CACHE_SIZE = int(os.environ.get("FUND_CACHE_SIZE", "10000"))  # 进程内最大条目数
+    FUND_CACHE_LOCAL_TTL = float(os.environ.get("FUND_CACHE_LOCAL_TTL", "60"))  # 进程内条目兜底过期时间（秒）
+    FUND_CACHE_REDIS_TTL = int(os.environ.get("FUND_CACHE_REDIS_TTL", "3600"))  # Redis条目过期时间（秒）
+    FUND_CACHE_CHANNEL = os.environ.get("FUND_CACHE_CHANNEL", "fund_cache:invalidate")
+    
+    # 风险收益分析配置
+    RISK_FREE_RATE = float(os.environ.get("RISK_FREE_RATE", "0.02"))  # 年化无风险利率
+    TRADING_DAYS_PER_YEAR = int(os.environ.get("TRADING_DAYS_PER_YEAR", "252"))  # 年化使用的年交易日数
+    ANALYTICS_CACHE_TTL = int(os.environ.get("ANALYTICS_CACHE_TTL", str(2 * 24 * 3600)))  # 分析结果缓存时间（秒）
+    
+    # 基金相关性矩阵配置
+    CORRELATION_WINDOW = int(os.environ.get("CORRELATION_WINDOW", "250"))  # 收益率窗口（交易日）
+    CORRELATION_MIN_OBSERVATIONS = int(os.environ.get("CORRELATION_MIN_OBSERVATIONS", "60"))  # 纳入矩阵所需的最少有效收益数
+    CORRELATION_REBUILD_INTERVAL = int(os.environ.get("CORRELATION_REBUILD_INTERVAL", "50"))  # 增量更新次数达到后整体重建
+    
+    # 绩效排名表后台重建配置
+    RANKING_REFRESH_INTERVAL = float(os.environ.get("RANKING_REFRESH_INTERVAL", "5"))  # 检查过期标记的间隔（秒）
+    RANKING_REFRESH_LOCK_SECONDS = int(os.environ.get("RANKING_REFRESH_LOCK_SECONDS", "300"))  # 跨进程重建锁的过期时间（秒）
+    
+    # 净值图表降采样结果缓存时间（秒）
+    CHART_CACHE_TTL = int(os.environ.get("CHART_CACHE_TTL", str(24 * 3600)))
 
 # 合并所有配置
 class Config:
@@ -152,6 +225,7 @@ class Config:
     crawler = CrawlerConfig()
     calculation = CalculationConfig()
     user = UserConfig()
+    fund = FundConfig()
 
 # 创建全局配置实例
 config = Config()
\ No newline at end of file
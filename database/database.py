@@ -56,6 +56,35 @@ def get_db():
     finally:
         db.close()
 
+def upsert_rows(db, table, rows, conflict_columns, update_columns, chunk_size: int = 1000):
+    """按唯一键批量插入或更新
+
+    每个分块生成一条多行INSERT：MySQL使用ON DUPLICATE KEY UPDATE，
+    SQLite/PostgreSQL使用ON CONFLICT DO UPDATE
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise NotImplementedError(f"Upsert is not supported for dialect {dialect}")
+    
+    for start in range(0, len(rows), chunk_size):
+        stmt = insert(table).values(rows[start:start + chunk_size])
+        if dialect == "mysql":
+            stmt = stmt.on_duplicate_key_update({column: stmt.inserted[column] for column in update_columns})
+        else:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=conflict_columns,
+                set_={column: stmt.excluded[column] for column in update_columns}
+            )
+        db.execute(stmt)
+
 def create_tables():
     """创建数据库表"""
     Base.metadata.create_all(bind=engine)
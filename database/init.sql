@@ -104,6 +104,55 @@ CREATE TABLE IF NOT EXISTS `fund_net_values` (
   INDEX `idx_date` (`date`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- 创建净值计算运行表（active_slot唯一，运行中为'nav'，结束后置空，保证同一时刻最多一个运行）
+CREATE TABLE IF NOT EXISTS `calculation_runs` (
+  `id` VARCHAR(36) PRIMARY KEY,
+  `active_slot` VARCHAR(20) DEFAULT NULL,
+  `owner` VARCHAR(100) DEFAULT NULL,
+  `status` VARCHAR(20) DEFAULT 'running',
+  `started_at` DATETIME DEFAULT NULL,
+  `heartbeat_at` DATETIME DEFAULT NULL,
+  `finished_at` DATETIME DEFAULT NULL,
+  `news_snapshot_id` VARCHAR(64) DEFAULT NULL,
+  `fund_count` INT DEFAULT 0,
+  `partition_count` INT DEFAULT 0,
+  `failed_partitions` INT DEFAULT 0,
+  `duration_seconds` FLOAT DEFAULT NULL,
+  `funds_per_second` FLOAT DEFAULT NULL,
+  UNIQUE KEY `unique_active_slot` (`active_slot`),
+  INDEX `idx_started_at` (`started_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 创建净值计算分区表（工作者通过带过期时间的租约认领分区）
+CREATE TABLE IF NOT EXISTS `calculation_partitions` (
+  `id` VARCHAR(36) PRIMARY KEY,
+  `run_id` VARCHAR(36) NOT NULL,
+  `partition_index` INT NOT NULL,
+  `fund_ids` JSON NOT NULL,
+  `status` VARCHAR(20) DEFAULT 'pending',
+  `owner` VARCHAR(100) DEFAULT NULL,
+  `lease_expires_at` DATETIME DEFAULT NULL,
+  `attempts` INT DEFAULT 0,
+  `duration_seconds` FLOAT DEFAULT NULL,
+  `error_message` VARCHAR(500) DEFAULT NULL,
+  UNIQUE KEY `unique_run_partition` (`run_id`, `partition_index`),
+  INDEX `idx_run_id` (`run_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 创建基金绩效排名表（按周期预先计算）
+CREATE TABLE IF NOT EXISTS `fund_performance_rankings` (
+  `period` VARCHAR(20) NOT NULL,
+  `performance_rank` INT NOT NULL,
+  `fund_id` VARCHAR(36) NOT NULL,
+  `fund_name` VARCHAR(100) DEFAULT NULL,
+  `fund_code` VARCHAR(20) DEFAULT NULL,
+  `growth_rate` FLOAT NOT NULL,
+  `latest_nav` FLOAT DEFAULT NULL,
+  `refreshed_at` DATETIME DEFAULT NULL,
+  PRIMARY KEY (`period`, `performance_rank`),
+  INDEX `idx_period_fund` (`period`, `fund_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- 创建示例数据
 
 -- 插入规则示例数据
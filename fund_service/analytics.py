@@ -0,0 +1,250 @@
+import argparse
+import json
+import time
+import numpy as np
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from common.cache import cache
+from config.config import config
+from database.database import SessionLocal
+from .models import Fund, FundStatus
+from .nav_store import nav_store
+
+# 滚动收益窗口（按净值记录条数，即交易日）
+ROLLING_WINDOWS = {
+    '1m': 21,
+    '3m': 63,
+    '6m': 126,
+    '1y': 252
+}
+ANALYTICS_CACHE_PREFIX = "fund_analytics"
+# 批量计算时每次拼接计算的基金数，限制拼接序列的内存
+ANALYTICS_BATCH_FUNDS = 500
+# 对数净值的组偏移，需大于任一基金对数净值的取值范围，使累积最大值不跨基金
+_GROUP_OFFSET = 1e3
+_MIN_NAV = 1e-12
+
+def _nullable(value, scale: float = 1.0) -> Optional[float]:
+    return None if np.isnan(value) or np.isinf(value) else round(float(value) * scale, 4)
+
+def _day(value) -> str:
+    return str(np.datetime64(value, 'D'))
+
+def compute_analytics(dates: np.ndarray, net_values: np.ndarray, group_starts: Optional[Sequence[int]] = None,
+                      risk_free_rate: float = 0.0,
+                      periods_per_year: int = 252) -> List[Dict]:
+    """向量化计算风险收益指标，多个基金的序列首尾拼接后一次计算
+
+    group_starts为每个基金在拼接序列中的起始位置（每组非空、组内按日期升序），
+    为空时视为单个基金。收益率、波动率与回撤为百分比：
+    - annualized_return: 首末净值的年化复合收益（按自然日）
+    - volatility: 日收益率标准差年化
+    - sharpe_ratio / sortino_ratio: 年化平均收益减无风险利率，除以波动率 / 下行偏差
+    - max_drawdown: 最大回撤及其峰值、谷底与恢复日期（未恢复时为None）
+    - rolling_returns: 各窗口滚动收益的最新值、均值、最小值、最大值与正收益占比
+    """
+    net_values = np.asarray(net_values, dtype=np.float64)
+    days = np.asarray(dates).astype('datetime64[D]')
+    count = len(net_values)
+    if count == 0:
+        return []
+    starts = np.asarray([0] if group_starts is None else group_starts, dtype=np.int64)
+    sizes = np.diff(np.append(starts, count))
+    ends = starts + sizes - 1
+    groups = np.repeat(np.arange(len(starts)), sizes)
+    positions = np.arange(count)
+
+    # 日收益率，每组首条没有收益
+    returns = np.full(count, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = net_values[1:] / net_values[:-1] - 1.0
+    returns[starts] = np.nan
+    valid = np.isfinite(returns)
+    return_counts = np.add.reduceat(valid.astype(np.int64), starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.add.reduceat(np.where(valid, returns, 0.0), starts) / return_counts
+        squared = np.where(valid, (returns - mean[groups]) ** 2, 0.0)
+        volatility = np.where(return_counts > 1,
+                              np.sqrt(np.add.reduceat(squared, starts) / (return_counts - 1)), np.nan)
+        volatility *= np.sqrt(periods_per_year)
+        excess_return = mean * periods_per_year - risk_free_rate
+        downside = np.where(valid, np.minimum(returns - risk_free_rate / periods_per_year, 0.0), 0.0)
+        downside_deviation = np.sqrt(np.add.reduceat(downside ** 2, starts) / return_counts * periods_per_year)
+        sharpe = np.where(volatility > 0, excess_return / volatility, np.nan)
+        sortino = np.where(downside_deviation > 0, excess_return / downside_deviation, np.nan)
+
+        # 年化收益（复合）
+        span_days = (days[ends] - days[starts]).astype(np.int64)
+        growth = net_values[ends] / net_values[starts]
+        annualized = np.where((span_days > 0) & (net_values[starts] > 0),
+                              np.power(growth, 365.25 / np.maximum(span_days, 1)) - 1.0, np.nan)
+
+    # 最大回撤：对数净值加组偏移后整体一次累积最大值
+    shifted = np.log(np.maximum(net_values, _MIN_NAV)) + groups * _GROUP_OFFSET
+    running_max = np.maximum.accumulate(shifted)
+    drawdown = 1.0 - np.exp(shifted - running_max)
+    peak_index = np.maximum.accumulate(np.where(shifted >= running_max, positions, 0))
+    # 按 (组, 回撤) 排序后每组最后一条即该组最大回撤的谷底
+    trough = np.lexsort((drawdown, groups))[ends]
+    peak = peak_index[trough]
+    max_drawdown = drawdown[trough]
+    recovered = (positions > trough[groups]) & (shifted >= shifted[peak][groups])
+    recovery = np.minimum.reduceat(np.where(recovered, positions, count), starts)
+
+    rolling = {}
+    for label, window in ROLLING_WINDOWS.items():
+        base = positions - window
+        in_group = base >= starts[groups]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rolling_return = np.where(in_group, net_values / net_values[np.maximum(base, 0)] - 1.0, np.nan)
+        in_group &= np.isfinite(rolling_return)
+        windows = np.add.reduceat(in_group.astype(np.int64), starts)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rolling[label] = {
+                'latest': rolling_return[ends],
+                'mean': np.add.reduceat(np.where(in_group, rolling_return, 0.0), starts) / windows,
+                'min': np.fmin.reduceat(np.where(in_group, rolling_return, np.nan), starts),
+                'max': np.fmax.reduceat(np.where(in_group, rolling_return, np.nan), starts),
+                'positive_ratio': np.add.reduceat((in_group & (rolling_return > 0)).astype(np.int64), starts) / windows
+            }
+
+    results = []
+    for group, (start, end) in enumerate(zip(starts, ends)):
+        has_drawdown = max_drawdown[group] > 0
+        results.append({
+            'start_date': _day(days[start]),
+            'end_date': _day(days[end]),
+            'observations': int(sizes[group]),
+            'latest_nav': float(net_values[end]),
+            'annualized_return': _nullable(annualized[group], 100),
+            'volatility': _nullable(volatility[group], 100),
+            'sharpe_ratio': _nullable(sharpe[group]),
+            'sortino_ratio': _nullable(sortino[group]),
+            'max_drawdown': _nullable(max_drawdown[group], 100),
+            'max_drawdown_peak_date': _day(days[peak[group]]) if has_drawdown else None,
+            'max_drawdown_trough_date': _day(days[trough[group]]) if has_drawdown else None,
+            'max_drawdown_recovery_date': (_day(days[recovery[group]])
+                                           if has_drawdown and recovery[group] < count else None),
+            'rolling_returns': {
+                label: {
+                    'latest': _nullable(stats['latest'][group], 100),
+                    'mean': _nullable(stats['mean'][group], 100),
+                    'min': _nullable(stats['min'][group], 100),
+                    'max': _nullable(stats['max'][group], 100),
+                    'positive_ratio': _nullable(stats['positive_ratio'][group])
+                }
+                for label, stats in rolling.items()
+            }
+        })
+    return results
+
+# 缓存：每个基金一个Redis哈希，字段为截止日期，净值入库时整体删除
+def _cache_key(fund_id: str) -> str:
+    return f"{ANALYTICS_CACHE_PREFIX}:{fund_id}"
+
+def _as_of_end(as_of: date) -> datetime:
+    return datetime(as_of.year, as_of.month, as_of.day) + timedelta(days=1) - timedelta(seconds=1)
+
+def _analyze(fund_id: str, series: np.ndarray, as_of: date) -> Dict:
+    result = compute_analytics(
+        series['date'], series['net_value'],
+        risk_free_rate=config.fund.RISK_FREE_RATE,
+        periods_per_year=config.fund.TRADING_DAYS_PER_YEAR
+    )[0]
+    return {'fund_id': fund_id, 'as_of': as_of.isoformat(), **result}
+
+def _store(results: List[Dict]):
+    if not cache.client or not results:
+        return
+    try:
+        pipe = cache.client.pipeline(transaction=False)
+        for result in results:
+            key = _cache_key(result['fund_id'])
+            pipe.hset(key, result['as_of'], json.dumps(result))
+            pipe.expire(key, config.fund.ANALYTICS_CACHE_TTL)
+        pipe.execute()
+    except Exception as e:
+        print(f"Redis analytics cache error: {str(e)}")
+
+def get_fund_analytics(db: Session, fund_id: str, as_of: Optional[date] = None) -> Optional[Dict]:
+    """单个基金截至as_of（默认今天）的风险收益指标，按 (基金, 截止日期) 缓存；无净值时返回None"""
+    as_of = as_of or datetime.utcnow().date()
+    if cache.client:
+        try:
+            cached = cache.client.hget(_cache_key(fund_id), as_of.isoformat())
+            if cached:
+                return json.loads(cached)
+        except Exception as e:
+            print(f"Redis analytics cache error: {str(e)}")
+
+    nav_store.ensure(db, fund_id)
+    series = nav_store.range(fund_id, end_date=_as_of_end(as_of))
+    if len(series) == 0:
+        return None
+    result = _analyze(fund_id, series, as_of)
+    _store([result])
+    return result
+
+def invalidate_analytics(fund_ids: Sequence[str]):
+    """净值入库后删除相关基金所有截止日期的缓存结果"""
+    if not cache.client or not fund_ids:
+        return
+    try:
+        cache.client.delete(*[_cache_key(fund_id) for fund_id in fund_ids])
+    except Exception as e:
+        print(f"Redis analytics cache error: {str(e)}")
+
+def batch_analytics(db: Session, as_of: Optional[date] = None,
+                    fund_ids: Optional[Sequence[str]] = None) -> Dict:
+    """为全部存续基金（或指定基金）计算并缓存指标：每ANALYTICS_BATCH_FUNDS个基金拼接后一次向量化计算"""
+    started = time.monotonic()
+    as_of = as_of or datetime.utcnow().date()
+    if fund_ids is None:
+        fund_ids = db.execute(select(Fund.id).where(Fund.status != FundStatus.CLOSED)).scalars().all()
+    missing = [fund_id for fund_id in fund_ids if not nav_store.has_fund(fund_id)]
+    if missing:
+        nav_store.rebuild_from_table(db, missing)
+
+    as_of_end = _as_of_end(as_of)
+    computed = 0
+    for offset in range(0, len(fund_ids), ANALYTICS_BATCH_FUNDS):
+        chunk = [(fund_id, nav_store.range(fund_id, end_date=as_of_end))
+                 for fund_id in fund_ids[offset:offset + ANALYTICS_BATCH_FUNDS]]
+        chunk = [(fund_id, series) for fund_id, series in chunk if len(series)]
+        if not chunk:
+            continue
+        lengths = [len(series) for _, series in chunk]
+        results = compute_analytics(
+            np.concatenate([series['date'] for _, series in chunk]),
+            np.concatenate([series['net_value'] for _, series in chunk]),
+            group_starts=np.cumsum([0] + lengths[:-1]),
+            risk_free_rate=config.fund.RISK_FREE_RATE,
+            periods_per_year=config.fund.TRADING_DAYS_PER_YEAR
+        )
+        _store([
+            {'fund_id': fund_id, 'as_of': as_of.isoformat(), **result}
+            for (fund_id, _), result in zip(chunk, results)
+        ])
+        computed += len(results)
+
+    return {
+        'as_of': as_of.isoformat(),
+        'funds': computed,
+        'duration_seconds': round(time.monotonic() - started, 3)
+    }
+
+def main():
+    """夜间批量任务（由cron等调度）：python -m fund_service.analytics [--as-of YYYY-MM-DD]"""
+    parser = argparse.ArgumentParser(description="Compute risk/return analytics for all funds")
+    parser.add_argument('--as-of', type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        print(batch_analytics(db, args.as_of))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,95 @@
+import json
+import numpy as np
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+from sqlalchemy.orm import Session
+from common.cache import cache
+from config.config import config
+from .nav_store import nav_store
+
+CHART_CACHE_PREFIX = "fund_chart"
+DEFAULT_CHART_POINTS = 500
+MIN_CHART_POINTS = 3
+MAX_CHART_POINTS = 5000
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets降采样，返回保留点的下标（含首尾点）
+
+    中间点按下标均分为threshold-2个桶，每个桶选出与上一个选中点、下一个桶均值点
+    构成三角形面积最大的点；桶边界与各桶均值一次向量化算出，逐桶只做一次argmax
+    """
+    count = len(y)
+    if threshold >= count or threshold < MIN_CHART_POINTS:
+        return np.arange(count)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    buckets = threshold - 2
+    edges = (np.floor(np.arange(buckets + 1) * (count - 2) / buckets) + 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    sizes = ends - starts
+    # 下一个桶的均值点；最后一个桶的"下一个桶"为末点
+    avg_x = np.append((np.add.reduceat(x[1:-1], starts - 1) / sizes)[1:], x[-1])
+    avg_y = np.append((np.add.reduceat(y[1:-1], starts - 1) / sizes)[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    previous = 0
+    for bucket in range(buckets):
+        start, end = starts[bucket], ends[bucket]
+        ax, ay = x[previous], y[previous]
+        areas = np.abs((ax - avg_x[bucket]) * (y[start:end] - ay) - (ax - x[start:end]) * (avg_y[bucket] - ay))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+def _cache_key(fund_id: str) -> str:
+    return f"{CHART_CACHE_PREFIX}:{fund_id}"
+
+def _cache_field(start_date: Optional[datetime], end_date: Optional[datetime], points: int) -> str:
+    return f"{start_date.isoformat() if start_date else ''}|{end_date.isoformat() if end_date else ''}|{points}"
+
+def get_chart_series(db: Session, fund_id: str, start_date: Optional[datetime] = None,
+                     end_date: Optional[datetime] = None, points: int = DEFAULT_CHART_POINTS) -> Dict:
+    """净值图表序列：对区间内净值做LTTB降采样，按 (基金, 区间, 点数) 缓存，净值入库后失效"""
+    field = _cache_field(start_date, end_date, points)
+    if cache.client:
+        try:
+            cached = cache.client.hget(_cache_key(fund_id), field)
+            if cached:
+                return json.loads(cached)
+        except Exception as e:
+            print(f"Redis chart cache error: {str(e)}")
+
+    nav_store.ensure(db, fund_id)
+    records = nav_store.range(fund_id, start_date, end_date)
+    # 按日期轴（秒）降采样，交易日间隔不均时保持形状
+    indices = lttb(records['date'].astype(np.int64), records['net_value'], points)
+    sampled = records[indices]
+    result = {
+        "fund_id": fund_id,
+        "dates": np.datetime_as_string(sampled['date'], unit='D').tolist(),
+        "net_values": sampled['net_value'].tolist(),
+        "accumulated_net_values": sampled['accumulated_net_value'].tolist(),
+        "points": len(sampled),
+        "total_items": len(records)
+    }
+
+    if cache.client:
+        try:
+            pipe = cache.client.pipeline(transaction=False)
+            pipe.hset(_cache_key(fund_id), field, json.dumps(result))
+            pipe.expire(_cache_key(fund_id), config.fund.CHART_CACHE_TTL)
+            pipe.execute()
+        except Exception as e:
+            print(f"Redis chart cache error: {str(e)}")
+    return result
+
+def invalidate_charts(fund_ids: Sequence[str]):
+    """净值入库后删除相关基金全部区间与分辨率的缓存"""
+    if not cache.client or not fund_ids:
+        return
+    try:
+        cache.client.delete(*[_cache_key(fund_id) for fund_id in fund_ids])
+    except Exception as e:
+        print(f"Redis chart cache error: {str(e)}")
\ No newline at end of file
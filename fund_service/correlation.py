@@ -0,0 +1,360 @@
+import json
+import threading
+import time
+import uuid
+import numpy as np
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from common.cache import cache
+from config.config import config
+from database.database import SessionLocal
+from .models import Fund, FundStatus
+from .nav_store import nav_store
+
+# 任一进程标记过期后递增，其他进程据此重建
+CORRELATION_VERSION_KEY = "fund_correlation_version"
+# 净值增量广播频道：其他进程收到当天的净值后同样做增量更新
+CORRELATION_ROWS_CHANNEL = "fund_correlation:rows"
+# 检查远端版本号的最小间隔（秒）
+REFRESH_CHECK_INTERVAL = 30
+
+def _round_matrix(matrix: np.ndarray) -> List[List[Optional[float]]]:
+    return [[None if np.isnan(value) else round(float(value), 6) for value in row] for row in matrix]
+
+class CorrelationStore:
+    """全部存续基金在最近window个交易日上的日收益率相关系数与协方差矩阵
+
+    各基金净值对齐到统一的交易日网格（取网格日当天或之前的最后一条净值，缺失日视为0收益），
+    收益率矩阵保存在环形缓冲区中，同时维护列和S与叉积矩阵C = RᵀR：
+    新一天净值到达时减去最旧一行、加上新的一行，以O(N²)更新S与C，
+    协方差与相关系数由S、C直接得出并缓存到下一次更新。
+    同一天的净值分多批到达时替换最新一行，并通过pub/sub广播给其他进程做同样的增量更新；
+    回填历史会标记过期，每累计rebuild_interval次增量更新也标记过期，消除浮点累积误差。
+    首次使用时同步构建，之后的整体重建在后台线程进行，完成前读取返回上一次的结果。
+    """
+
+    def __init__(self, window: Optional[int] = None, min_observations: Optional[int] = None,
+                 rebuild_interval: Optional[int] = None, session_factory=None):
+        self.window = window or config.fund.CORRELATION_WINDOW
+        self.min_observations = min_observations or config.fund.CORRELATION_MIN_OBSERVATIONS
+        self.rebuild_interval = rebuild_interval or config.fund.CORRELATION_REBUILD_INTERVAL
+        self.session_factory = session_factory or SessionLocal
+        self._lock = threading.RLock()
+        # 同一进程同时只有一个重建
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = False
+        self._built = False
+        # 每次增量更新或标记过期递增，重建期间有变化时重建完成后仍保持过期
+        self._generation = 0
+        self.origin = uuid.uuid4().hex
+        self._listener = None
+        self.fund_ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._dates: List[np.datetime64] = []
+        self._returns = np.zeros((0, 0))
+        self._head = 0
+        self._last_navs = np.zeros(0)
+        self._prev_navs = np.zeros(0)
+        self._sum = np.zeros(0)
+        self._cross = np.zeros((0, 0))
+        self._matrices = None
+        self._updates = 0
+        self._stale = True
+        self._remote_version = None
+        self._last_refresh_check = 0.0
+
+    # 构建
+    def _read_remote_version(self) -> Optional[str]:
+        if not cache.client:
+            return None
+        try:
+            return cache.client.get(CORRELATION_VERSION_KEY)
+        except Exception as e:
+            print(f"Correlation version check error: {str(e)}")
+            return None
+
+    def _bump_version(self):
+        if cache.client:
+            try:
+                self._remote_version = str(cache.client.incr(CORRELATION_VERSION_KEY))
+            except Exception as e:
+                print(f"Correlation version error: {str(e)}")
+
+    def rebuild(self, db: Session) -> Dict:
+        """从列式净值存储整体重建收益率矩阵与S、C（持有重建锁）"""
+        with self._rebuild_lock:
+            return self._rebuild(db)
+
+    def _rebuild(self, db: Session) -> Dict:
+        with self._lock:
+            generation = self._generation
+        remote_version = self._read_remote_version()
+        fund_ids = sorted(db.execute(select(Fund.id).where(Fund.status != FundStatus.CLOSED)).scalars())
+        missing = [fund_id for fund_id in fund_ids if not nav_store.has_fund(fund_id)]
+        if missing:
+            nav_store.rebuild_from_table(db, missing)
+
+        series = {fund_id: nav_store.series(fund_id) for fund_id in fund_ids}
+        series = {fund_id: records for fund_id, records in series.items() if len(records)}
+        if series:
+            tails = [records['date'][-(self.window + 1):].astype('datetime64[D]') for records in series.values()]
+            grid = np.unique(np.concatenate(tails))[-(self.window + 1):]
+        else:
+            grid = np.empty(0, dtype='datetime64[D]')
+
+        # (日期, 基金) 净值矩阵：每个网格日取当天或之前的最后一条净值
+        navs = np.full((len(grid), len(series)), np.nan)
+        for column, records in enumerate(series.values()):
+            positions = np.searchsorted(records['date'].astype('datetime64[D]'), grid, side='right') - 1
+            navs[:, column] = np.where(positions >= 0, records['net_value'][np.maximum(positions, 0)], np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = navs[1:] / navs[:-1] - 1.0
+        valid = np.isfinite(returns)
+        keep = valid.sum(axis=0) >= self.min_observations
+        returns = np.where(valid, returns, 0.0)[:, keep]
+        kept_ids = [fund_id for fund_id, kept in zip(series, keep) if kept]
+
+        with self._lock:
+            self.fund_ids = kept_ids
+            self._index = {fund_id: column for column, fund_id in enumerate(kept_ids)}
+            self._dates = list(grid)
+            self._returns = returns
+            self._head = 0
+            self._last_navs = navs[-1, keep] if len(grid) else np.zeros(0)
+            self._prev_navs = navs[-2, keep] if len(grid) > 1 else np.zeros(0)
+            self._sum = returns.sum(axis=0)
+            self._cross = returns.T @ returns
+            self._matrices = None
+            self._updates = 0
+            self._stale = self._generation != generation
+            self._built = True
+            self._remote_version = remote_version
+            return self.summary()
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._background_rebuild, name="fund-correlation-rebuild", daemon=True).start()
+
+    def _background_rebuild(self):
+        db = self.session_factory()
+        try:
+            self.rebuild(db)
+        except Exception as e:
+            print(f"Correlation rebuild error: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._rebuilding = False
+
+    def _mark_local_stale(self):
+        with self._lock:
+            self._stale = True
+            self._generation += 1
+
+    def mark_stale(self):
+        """回填历史或基金状态变化后调用，本进程与其他进程随后整体重建"""
+        self._mark_local_stale()
+        self._bump_version()
+
+    def ensure_fresh(self, db: Session):
+        """首次使用时同步构建；之后过期或其他进程标记过期时在后台重建，重建完成前沿用当前结果"""
+        self.start_listener()
+        if not self._built:
+            self.rebuild(db)
+            return
+        if self._stale:
+            self._rebuild_in_background()
+            return
+        now = time.monotonic()
+        if now - self._last_refresh_check < REFRESH_CHECK_INTERVAL:
+            return
+        self._last_refresh_check = now
+        remote_version = self._read_remote_version()
+        if remote_version is not None and remote_version != self._remote_version:
+            self._rebuild_in_background()
+
+    # 增量更新
+    def _row(self, navs: np.ndarray, base: np.ndarray) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            row = navs / base - 1.0
+        return np.where(np.isfinite(row), row, 0.0)
+
+    def _replace_row(self, position: int, row: np.ndarray):
+        old = self._returns[position]
+        self._sum += row - old
+        self._cross += np.outer(row, row) - np.outer(old, old)
+        self._returns[position] = row
+
+    def apply_day(self, date: datetime, navs: Dict[str, float]) -> bool:
+        """应用某一天的净值；返回是否完成增量更新（否则已标记过期）"""
+        day = np.datetime64(date, 'D')
+        with self._lock:
+            self._generation += 1
+            if self._stale or len(self._dates) < 2:
+                return False
+            last_day = self._dates[-1]
+            if day < last_day:
+                self._stale = True
+                return False
+
+            updated = self._last_navs.copy()
+            for fund_id, net_value in navs.items():
+                column = self._index.get(fund_id)
+                if column is not None:
+                    updated[column] = net_value
+
+            if day == last_day:
+                # 同一天的后续批次：替换最新一行
+                newest = (self._head - 1) % len(self._returns)
+                self._replace_row(newest, self._row(updated, self._prev_navs))
+            else:
+                # 新的一天：最旧一行出窗，新行写入其位置
+                self._replace_row(self._head, self._row(updated, self._last_navs))
+                self._head = (self._head + 1) % len(self._returns)
+                self._dates = self._dates[1:] + [day]
+                self._prev_navs = self._last_navs
+            self._last_navs = updated
+            self._matrices = None
+            self._updates += 1
+            if self._updates >= self.rebuild_interval:
+                self._stale = True
+            return True
+
+    def _apply_days(self, by_day: Dict[np.datetime64, Dict[str, float]]):
+        for day in sorted(by_day):
+            if not self.apply_day(day, by_day[day]):
+                break
+
+    def apply_rows(self, rows: Iterable[dict]):
+        """净值入库后调用，rows含fund_id、date、net_value；按日期顺序逐日增量更新并广播给其他进程"""
+        by_day: Dict[np.datetime64, Dict[str, float]] = defaultdict(dict)
+        for row in rows:
+            by_day[np.datetime64(row['date'], 'D')][row['fund_id']] = row['net_value']
+        if not by_day:
+            return
+        self._apply_days(by_day)
+        if cache.client:
+            payload = {
+                'origin': self.origin,
+                'days': {str(day): navs for day, navs in by_day.items()}
+            }
+            try:
+                cache.client.publish(CORRELATION_ROWS_CHANNEL, json.dumps(payload))
+            except Exception as e:
+                print(f"Correlation publish error: {str(e)}")
+
+    # 增量订阅
+    def start_listener(self):
+        """启动净值增量订阅线程（每个进程一个，重复调用无副作用）"""
+        if self._listener is not None or not cache.client:
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(target=self._listen, name="fund-correlation-rows", daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = cache.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CORRELATION_ROWS_CHANNEL)
+                for message in pubsub.listen():
+                    self._on_rows_message(message.get('data'))
+            except Exception as e:
+                print(f"Correlation listener error: {str(e)}")
+            # 断线期间可能漏收增量，下次读取时整体重建
+            self._mark_local_stale()
+            time.sleep(1)
+
+    def _on_rows_message(self, data):
+        try:
+            payload = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if payload.get('origin') == self.origin:
+            return
+        self._apply_days({np.datetime64(day, 'D'): navs for day, navs in (payload.get('days') or {}).items()})
+
+    # 查询
+    def matrices(self):
+        """(协方差矩阵, 相关系数矩阵)，按日收益率计算，更新前一直复用"""
+        with self._lock:
+            if self._matrices is None:
+                observations = len(self._returns)
+                if observations < 2:
+                    empty = np.full((len(self.fund_ids), len(self.fund_ids)), np.nan)
+                    self._matrices = (empty, empty)
+                    return self._matrices
+                mean = self._sum / observations
+                covariance = (self._cross - observations * np.outer(mean, mean)) / (observations - 1)
+                std = np.sqrt(np.clip(np.diag(covariance), 0.0, None))
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    correlation = np.clip(covariance / np.outer(std, std), -1.0, 1.0)
+                correlation[std == 0, :] = np.nan
+                correlation[:, std == 0] = np.nan
+                np.fill_diagonal(correlation, np.where(std > 0, 1.0, np.nan))
+                self._matrices = (covariance, correlation)
+            return self._matrices
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                'funds': len(self.fund_ids),
+                'observations': len(self._returns),
+                'start_date': str(self._dates[0]) if self._dates else None,
+                'end_date': str(self._dates[-1]) if self._dates else None
+            }
+
+    def matrix(self, fund_ids: Optional[Sequence[str]] = None, include_covariance: bool = False) -> Dict:
+        """相关系数（及协方差）矩阵；指定fund_ids时只返回这些基金的子矩阵"""
+        covariance, correlation = self.matrices()
+        with self._lock:
+            if fund_ids:
+                unknown = [fund_id for fund_id in fund_ids if fund_id not in self._index]
+                if unknown:
+                    raise KeyError(", ".join(unknown))
+                columns = [self._index[fund_id] for fund_id in fund_ids]
+            else:
+                fund_ids = list(self.fund_ids)
+                columns = list(range(len(fund_ids)))
+            result = {**self.summary(), 'fund_ids': list(fund_ids),
+                      'correlation': _round_matrix(correlation[np.ix_(columns, columns)])}
+            if include_covariance:
+                result['covariance'] = _round_matrix(covariance[np.ix_(columns, columns)])
+            return result
+
+    def top_correlated(self, fund_id: str, k: int = 10, least: bool = False) -> List[Dict]:
+        """与某基金相关性最高（least为真时最低）的k个基金，用argpartition选出后只对k个排序"""
+        covariance, correlation = self.matrices()
+        with self._lock:
+            column = self._index.get(fund_id)
+            if column is None:
+                raise KeyError(fund_id)
+            row = correlation[column].copy()
+            row[column] = np.nan
+            candidates = np.flatnonzero(np.isfinite(row))
+            k = min(k, len(candidates))
+            if k <= 0:
+                return []
+            scores = -row[candidates] if least else row[candidates]
+            selected = candidates[np.argpartition(-scores, k - 1)[:k]]
+            order = np.argsort(row[selected])
+            selected = selected[order] if least else selected[order[::-1]]
+            return [
+                {
+                    'fund_id': self.fund_ids[other],
+                    'correlation': round(float(row[other]), 6),
+                    'covariance': round(float(covariance[column, other]), 10)
+                }
+                for other in selected
+            ]
+
+# 基金服务共享的相关性矩阵
+correlation_store = CorrelationStore()
\ No newline at end of file
@@ -0,0 +1,173 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import select, or_, and_
+from database.database import SessionLocal
+from .models import Fund, FundNetValue
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow导出为可选功能
+    pa = None
+
+# 每次从数据库读取的行数（键集分页）
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+
+# 导出列及其Arrow类型
+NAV_EXPORT_COLUMNS = {
+    'fund_id': 'string',
+    'date': 'timestamp',
+    'net_value': 'float64',
+    'accumulated_net_value': 'float64',
+    'daily_growth_rate': 'float64',
+    'weekly_growth_rate': 'float64',
+    'monthly_growth_rate': 'float64',
+    'quarterly_growth_rate': 'float64',
+    'yearly_growth_rate': 'float64'
+}
+FUND_EXPORT_COLUMNS = {
+    'id': 'string',
+    'code': 'string',
+    'name': 'string',
+    'fund_type': 'string',
+    'manager': 'string',
+    'management_fee': 'float64',
+    'risk_level': 'string',
+    'status': 'string',
+    'latest_nav': 'float64',
+    'launch_date': 'timestamp'
+}
+
+def parse_nav_cursor(cursor: Optional[str]) -> Optional[Tuple[str, datetime]]:
+    """净值导出游标为最后收到一行的 "fund_id|date"，从其后一行继续"""
+    if not cursor:
+        return None
+    fund_id, _, date = cursor.partition('|')
+    if not fund_id or not date:
+        raise ValueError("NAV cursor must be '<fund_id>|<ISO date>'")
+    return fund_id, datetime.fromisoformat(date)
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _text(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _keyset_chunks(build_query: Callable, after, next_after: Callable,
+                   chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[List[tuple]]:
+    """按键集分页逐块读取，每块一个短查询，内存只保留当前块"""
+    db = SessionLocal()
+    try:
+        while True:
+            rows = db.execute(build_query(after).limit(chunk_size)).all()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < chunk_size:
+                return
+            after = next_after(rows[-1])
+            # 每块结束释放会话中的状态，避免长事务
+            db.rollback()
+    finally:
+        db.close()
+
+def iter_nav_chunks(fund_ids: Optional[Sequence[str]] = None, start_date: Optional[datetime] = None,
+                    end_date: Optional[datetime] = None, cursor: Optional[str] = None) -> Iterator[List[dict]]:
+    """按(fund_id, date)顺序分块读取净值"""
+    columns = [getattr(FundNetValue, column) for column in NAV_EXPORT_COLUMNS]
+
+    def build_query(after):
+        stmt = select(*columns).order_by(FundNetValue.fund_id, FundNetValue.date)
+        if fund_ids:
+            stmt = stmt.where(FundNetValue.fund_id.in_(list(fund_ids)))
+        if start_date:
+            stmt = stmt.where(FundNetValue.date >= start_date)
+        if end_date:
+            stmt = stmt.where(FundNetValue.date <= end_date)
+        if after:
+            stmt = stmt.where(or_(
+                FundNetValue.fund_id > after[0],
+                and_(FundNetValue.fund_id == after[0], FundNetValue.date > after[1])
+            ))
+        return stmt
+
+    for rows in _keyset_chunks(build_query, parse_nav_cursor(cursor), lambda row: (row.fund_id, row.date)):
+        yield [dict(zip(NAV_EXPORT_COLUMNS, row)) for row in rows]
+
+def iter_fund_chunks(fund_type=None, status=None, cursor: Optional[str] = None) -> Iterator[List[dict]]:
+    """按基金ID顺序分块读取基金列表，游标为最后收到的基金ID"""
+    columns = [getattr(Fund, column) for column in FUND_EXPORT_COLUMNS]
+
+    def build_query(after):
+        stmt = select(*columns).order_by(Fund.id)
+        if fund_type:
+            stmt = stmt.where(Fund.fund_type == fund_type)
+        if status:
+            stmt = stmt.where(Fund.status == status)
+        if after:
+            stmt = stmt.where(Fund.id > after)
+        return stmt
+
+    for rows in _keyset_chunks(build_query, cursor, lambda row: row.id):
+        yield [
+            {column: getattr(value, 'value', value) for column, value in zip(FUND_EXPORT_COLUMNS, row)}
+            for row in rows
+        ]
+
+def encode_ndjson(chunks: Iterator[List[dict]], columns: Dict[str, str]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield ''.join(
+            json.dumps(row, ensure_ascii=False, default=_json_default) + '\n' for row in rows
+        ).encode('utf-8')
+
+def encode_csv(chunks: Iterator[List[dict]], columns: Dict[str, str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(columns))
+    writer.writeheader()
+    for rows in chunks:
+        writer.writerows({column: _text(value) for column, value in row.items()} for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def _arrow_schema(columns: Dict[str, str]):
+    types = {'string': pa.string(), 'float64': pa.float64(), 'timestamp': pa.timestamp('us')}
+    return pa.schema([(column, types[type_name]) for column, type_name in columns.items()])
+
+def encode_arrow(chunks: Iterator[List[dict]], columns: Dict[str, str]) -> Iterator[bytes]:
+    """Arrow IPC流：先发送schema，每个数据块写为一个RecordBatch，写完即发送"""
+    schema = _arrow_schema(columns)
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    for rows in chunks:
+        writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+ENCODERS = {
+    'ndjson': encode_ndjson,
+    'csv': encode_csv,
+    'arrow': encode_arrow
+}
+
+def export_stream(chunks: Iterator[List[dict]], columns: Dict[str, str], export_format: str) -> Iterator[bytes]:
+    """按格式编码分块数据流；arrow格式需要安装pyarrow"""
+    if export_format not in ENCODERS:
+        raise ValueError(f"Unsupported export format: {export_format}. Valid formats are: {', '.join(ENCODERS)}")
+    if export_format == 'arrow' and pa is None:
+        raise ValueError("Arrow export requires pyarrow to be installed")
+    return ENCODERS[export_format](chunks, columns)
\ No newline at end of file
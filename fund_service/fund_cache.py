@@ -0,0 +1,54 @@
+import json
+from typing import Iterable, Optional
+from common.cache import TwoTierCache
+from config.config import config
+from .models import Fund, FundNetValue
+from .schemas import FundResponse, FundNetValueResponse
+
+# 基金详情与最新净值共用一个两级缓存
+fund_cache = TwoTierCache(
+    channel=config.fund.FUND_CACHE_CHANNEL,
+    max_entries=config.fund.FUND_CACHE_SIZE,
+    local_ttl_seconds=config.fund.FUND_CACHE_LOCAL_TTL,
+    redis_ttl_seconds=config.fund.FUND_CACHE_REDIS_TTL
+)
+
+def fund_key(fund_id: str) -> str:
+    return f"fund:{fund_id}"
+
+def latest_nav_key(fund_id: str) -> str:
+    return f"fund:{fund_id}:latest_nav"
+
+# 缓存中统一保存响应模型的JSON形式
+def serialize_fund(fund: Fund) -> dict:
+    return json.loads(FundResponse.from_orm(fund).json())
+
+def serialize_net_value(net_value: FundNetValue) -> dict:
+    return json.loads(FundNetValueResponse.from_orm(net_value).json())
+
+def get_cached_fund(fund_id: str, load) -> Optional[FundResponse]:
+    """读穿获取基金详情，load()返回ORM对象或None"""
+    data = fund_cache.get(fund_key(fund_id), lambda: _serialize_or_none(load(), serialize_fund))
+    return FundResponse(**data) if data is not None else None
+
+def get_cached_latest_nav(fund_id: str, load) -> Optional[FundNetValueResponse]:
+    data = fund_cache.get(latest_nav_key(fund_id), lambda: _serialize_or_none(load(), serialize_net_value))
+    return FundNetValueResponse(**data) if data is not None else None
+
+def _serialize_or_none(obj, serializer):
+    return serializer(obj) if obj is not None else None
+
+def cache_fund(fund: Fund):
+    """基金写入后刷新缓存并广播失效"""
+    fund_cache.set(fund_key(fund.id), serialize_fund(fund))
+
+def cache_latest_nav(fund: Fund, net_value: FundNetValue):
+    """新净值写入后：基金详情中的latest_nav与最新净值一起刷新"""
+    fund_cache.set(fund_key(fund.id), serialize_fund(fund))
+    fund_cache.set(latest_nav_key(fund.id), serialize_net_value(net_value))
+
+def invalidate_funds(fund_ids: Iterable[str]):
+    keys = []
+    for fund_id in fund_ids:
+        keys.extend((fund_key(fund_id), latest_nav_key(fund_id)))
+    fund_cache.invalidate(*keys)
\ No newline at end of file
@@ -0,0 +1,105 @@
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from .models import FundNetValue
+
+# 增长率列 -> 回看窗口：('obs', 1)为上一条记录，('D', n)为n个自然日，('M', n)为n个自然月
+GROWTH_WINDOWS = {
+    'daily_growth_rate': ('obs', 1),
+    'weekly_growth_rate': ('D', 7),
+    'monthly_growth_rate': ('M', 1),
+    'quarterly_growth_rate': ('M', 3),
+    'yearly_growth_rate': ('M', 12)
+}
+# 组合键中基金编号的倍数，需大于任何日期的天数编号
+_GROUP_STRIDE = np.int64(1 << 32)
+UPDATE_CHUNK_SIZE = 1000
+# 只重算某日期之后的记录时额外读取的历史天数（覆盖最长的12个月窗口及节假日缺口）
+LOOKBACK_MARGIN_DAYS = 400
+
+def subtract_months(days: np.ndarray, months: int) -> np.ndarray:
+    """日期（datetime64[D]）回退若干自然月，目标月没有该日时取月末（如3月31日回退1个月为2月末）"""
+    month_start = days.astype('datetime64[M]')
+    day_of_month = days - month_start.astype('datetime64[D]')
+    target_month = month_start - np.timedelta64(months, 'M')
+    days_in_target = (target_month + 1).astype('datetime64[D]') - target_month.astype('datetime64[D]')
+    return target_month.astype('datetime64[D]') + np.minimum(day_of_month, days_in_target - np.timedelta64(1, 'D'))
+
+def compute_growth_rates(dates: np.ndarray, net_values: np.ndarray,
+                         group_ids: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """向量化计算每条净值记录的各窗口增长率（百分比）
+
+    dates需在每个基金内按日期升序，group_ids为每条记录所属基金的编号（整体按编号、日期排序）。
+    每个窗口的基准为回看目标日当天或之前的最后一条记录，非交易日缺口自然落到前一个交易日；
+    历史不足或基准净值非正时为NaN
+    """
+    count = len(net_values)
+    net_values = np.asarray(net_values, dtype=np.float64)
+    days = np.asarray(dates).astype('datetime64[D]')
+    groups = np.zeros(count, dtype=np.int64) if group_ids is None else np.asarray(group_ids, dtype=np.int64)
+    keys = groups * _GROUP_STRIDE + days.astype(np.int64)
+    positions = np.arange(count)
+
+    rates = {}
+    for column, (unit, size) in GROWTH_WINDOWS.items():
+        if unit == 'obs':
+            base = positions - size
+        else:
+            target = days - np.timedelta64(size, 'D') if unit == 'D' else subtract_months(days, size)
+            base = np.searchsorted(keys, groups * _GROUP_STRIDE + target.astype(np.int64), side='right') - 1
+        valid = base >= 0
+        valid[valid] &= groups[base[valid]] == groups[valid]
+        base_values = np.where(valid, net_values[np.where(valid, base, 0)], np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = np.where(base_values > 0, (net_values / base_values - 1.0) * 100, np.nan)
+        rates[column] = np.round(rate, 4)
+    return rates
+
+def latest_growth_rates(dates: np.ndarray, net_values: np.ndarray) -> Dict[str, Optional[float]]:
+    """单个基金序列最后一条记录的各窗口增长率，无法计算的为None"""
+    if len(net_values) == 0:
+        return {column: None for column in GROWTH_WINDOWS}
+    rates = compute_growth_rates(dates, net_values)
+    return {column: _nullable(values[-1]) for column, values in rates.items()}
+
+def _nullable(value) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+def recompute_growth_rates(db: Session, fund_ids: Optional[Sequence[str]] = None,
+                           since: Optional[datetime] = None, commit: bool = True) -> int:
+    """回填历史后整体重算增长率列：一次查询读取全部序列，跨基金一次向量化计算，
+    按主键批量UPDATE；返回更新的行数
+
+    指定since时只更新该日期及之后的记录，历史只回读LOOKBACK_MARGIN_DAYS天作为基准
+    """
+    stmt = (
+        select(FundNetValue.id, FundNetValue.fund_id, FundNetValue.date, FundNetValue.net_value)
+        .order_by(FundNetValue.fund_id, FundNetValue.date)
+    )
+    if fund_ids is not None:
+        stmt = stmt.where(FundNetValue.fund_id.in_(list(fund_ids)))
+    if since is not None:
+        stmt = stmt.where(FundNetValue.date >= since - timedelta(days=LOOKBACK_MARGIN_DAYS))
+    rows = db.execute(stmt).all()
+    if not rows:
+        return 0
+
+    ids, funds, dates, net_values = zip(*rows)
+    fund_array = np.array(funds, dtype=object)
+    group_ids = np.cumsum(np.append(False, fund_array[1:] != fund_array[:-1]))
+    rates = compute_growth_rates(np.array(dates, dtype='datetime64[s]'), np.array(net_values), group_ids)
+
+    columns = list(GROWTH_WINDOWS)
+    values = [rates[column].tolist() for column in columns]
+    updates: List[dict] = [
+        dict(zip(columns, map(_nullable, row_rates)), id=row_id)
+        for row_id, row_date, row_rates in zip(ids, dates, zip(*values))
+        if since is None or row_date >= since
+    ]
+    for start in range(0, len(updates), UPDATE_CHUNK_SIZE):
+        db.execute(update(FundNetValue), updates[start:start + UPDATE_CHUNK_SIZE])
+    if commit:
+        db.commit()
+    return len(updates)
\ No newline at end of file
@@ -0,0 +1,213 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from database.database import upsert_rows
+from .models import Fund, FundNetValue
+from .growth import GROWTH_WINDOWS, recompute_growth_rates
+from .nav_store import nav_store
+from .ranking import ranking_store
+from .search_index import fund_search_index
+from .fund_cache import invalidate_funds
+from .analytics import invalidate_analytics
+from .correlation import correlation_store
+from .chart import invalidate_charts
+
+# 每批校验并写入的行数
+INGEST_BATCH_SIZE = 5000
+# 响应中最多返回的校验错误数
+MAX_REPORTED_ERRORS = 100
+
+CSV_CONTENT_TYPES = ('text/csv', 'application/csv')
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+NAV_CONFLICT_COLUMNS = ['fund_id', 'date']
+NAV_UPDATE_COLUMNS = ['net_value', 'accumulated_net_value', 'updated_at'] + list(GROWTH_WINDOWS)
+
+def iter_json_array(body: bytes) -> Iterator[dict]:
+    records = json.loads(body)
+    if not isinstance(records, list):
+        raise ValueError("JSON body must be an array of NAV records")
+    return iter(records)
+
+def iter_ndjson(lines: Iterable[str]) -> Iterator[dict]:
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def iter_csv(lines: Iterable[str]) -> Iterator[dict]:
+    """CSV首行为表头：fund_id,date,net_value,accumulated_net_value[,增长率列]"""
+    for row in csv.DictReader(lines):
+        yield {key: value for key, value in row.items() if value not in (None, '')}
+
+async def iter_stream_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """将请求体字节块流切分为文本行，不把整个请求体读入内存"""
+    buffer = b''
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            yield line.decode('utf-8')
+    if buffer:
+        yield buffer.decode('utf-8')
+
+async def stream_batches(chunks: AsyncIterator[bytes], content_type: str,
+                         size: int = INGEST_BATCH_SIZE) -> AsyncIterator[List[dict]]:
+    """流式解析CSV/NDJSON请求体，每凑满size行产出一批"""
+    is_csv = content_type in CSV_CONTENT_TYPES
+    header = None
+    batch = []
+    async for line in iter_stream_lines(chunks):
+        if not line.strip():
+            continue
+        if is_csv:
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            batch.append({key: value for key, value in zip(header, values) if value != ''})
+        else:
+            batch.append(json.loads(line))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def normalize_content_type(content_type: str) -> str:
+    return (content_type or '').split(';')[0].strip().lower()
+
+def parse_records(body: bytes, content_type: str) -> Iterator[dict]:
+    """按Content-Type解析完整请求体：application/json、text/csv或application/x-ndjson"""
+    content_type = normalize_content_type(content_type)
+    if content_type in CSV_CONTENT_TYPES:
+        return iter_csv(io.StringIO(body.decode('utf-8')))
+    if content_type in NDJSON_CONTENT_TYPES:
+        return iter_ndjson(body.decode('utf-8').splitlines())
+    return iter_json_array(body)
+
+def batched(records: Iterable[dict], size: int = INGEST_BATCH_SIZE) -> Iterator[List[dict]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _parse_date(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+
+def validate_batch(records: List[dict], offset: int = 0) -> Tuple[List[dict], List[Dict]]:
+    """逐行解析字段，返回 (有效行, 错误列表)；同一批内(fund_id, date)重复时以后出现的为准"""
+    valid: Dict[Tuple[str, datetime], dict] = {}
+    errors = []
+    now = datetime.utcnow()
+    for index, record in enumerate(records, start=offset):
+        try:
+            fund_id = str(record['fund_id'])
+            net_value = float(record['net_value'])
+            accumulated_net_value = float(record.get('accumulated_net_value', net_value))
+            if not fund_id or len(fund_id) > 36:
+                raise ValueError("invalid fund_id")
+            if net_value < 0 or accumulated_net_value < 0:
+                raise ValueError("net values must be non-negative")
+            date = _parse_date(record['date'])
+        except KeyError as e:
+            errors.append({'row': index, 'error': f"missing field {e.args[0]}"})
+            continue
+        except (TypeError, ValueError) as e:
+            errors.append({'row': index, 'error': str(e)})
+            continue
+        valid[(fund_id, date)] = {
+            'id': str(uuid.uuid4()),
+            'fund_id': fund_id,
+            'date': date,
+            'net_value': net_value,
+            'accumulated_net_value': accumulated_net_value,
+            'created_at': now,
+            'updated_at': now,
+            # 增长率由服务端在写入后统一计算
+            **{column: None for column in GROWTH_WINDOWS},
+            '_row': index
+        }
+    return list(valid.values()), errors
+
+def ingest_batch(db: Session, records: List[dict], offset: int = 0) -> Dict:
+    """校验并写入一批净值记录
+
+    一次查询确认基金存在，按(fund_id, date)批量upsert，重算受影响基金的增长率，
+    一条UPDATE刷新所有受影响基金的latest_nav，每批只失效一次缓存
+    """
+    rows, errors = validate_batch(records, offset)
+    if rows:
+        fund_ids = {row['fund_id'] for row in rows}
+        known = set(db.execute(select(Fund.id).where(Fund.id.in_(fund_ids))).scalars())
+        for row in rows:
+            if row['fund_id'] not in known:
+                errors.append({'row': row['_row'], 'error': f"fund {row['fund_id']} not found"})
+        rows = [row for row in rows if row['fund_id'] in known]
+
+    if not rows:
+        return {'written': 0, 'errors': errors, 'fund_ids': []}
+
+    for row in rows:
+        del row['_row']
+    fund_ids = sorted({row['fund_id'] for row in rows})
+    try:
+        upsert_rows(db, FundNetValue.__table__, rows, NAV_CONFLICT_COLUMNS, NAV_UPDATE_COLUMNS)
+        recompute_growth_rates(db, fund_ids, since=min(row['date'] for row in rows), commit=False)
+        refresh_latest_navs(db, fund_ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    latest_navs = dict(db.execute(select(Fund.id, Fund.latest_nav).where(Fund.id.in_(fund_ids))).all())
+    _update_read_models(rows, fund_ids, latest_navs)
+    return {'written': len(rows), 'errors': errors, 'fund_ids': fund_ids}
+
+def refresh_latest_navs(db: Session, fund_ids: List[str]):
+    """一条UPDATE将基金的latest_nav设为其日期最新的净值"""
+    latest = (
+        select(FundNetValue.net_value)
+        .where(FundNetValue.fund_id == Fund.id)
+        .order_by(FundNetValue.date.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(Fund)
+        .where(Fund.id.in_(fund_ids))
+        .values(latest_nav=latest, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+def _update_read_models(rows: List[dict], fund_ids: List[str], latest_navs: Dict[str, float]):
+    """批次写入后：每个基金一次写入列式净值存储，缓存失效、排名过期与搜索索引更新各一次"""
+    by_fund: Dict[str, list] = {}
+    for row in rows:
+        by_fund.setdefault(row['fund_id'], []).append(
+            (row['date'], row['net_value'], row['accumulated_net_value'])
+        )
+    for fund_id, fund_rows in by_fund.items():
+        try:
+            nav_store.append_many(fund_id, fund_rows)
+        except Exception as e:
+            print(f"NAV store append error for fund {fund_id}: {e}")
+
+    # 一条DEL加一条失效广播
+    invalidate_funds(fund_ids)
+    invalidate_analytics(fund_ids)
+    invalidate_charts(fund_ids)
+    correlation_store.apply_rows(rows)
+    ranking_store.mark_stale()
+    fund_search_index.update_navs(latest_navs)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, String, Float, DateTime, Boolean, JSON, Enum
-from sqlalchemy import Column, String, Float, DateTime, Enum, JSON
+from sqlalchemy import Column, String, Float, Integer, DateTime, Enum, JSON, UniqueConstraint, Index
 from datetime import datetime
 from database.database import Base
 import enum
@@ -45,6 +45,10 @@ class Fund(Base):
 
 class FundNetValue(Base):
     __tablename__ = "fund_net_values"
+    __table_args__ = (
+        # 与init.sql一致：按(基金, 日期)唯一，同时作为区间查询的索引
+        UniqueConstraint('fund_id', 'date', name='unique_fund_date'),
+    )
     
     id = Column(String(36), primary_key=True)
     fund_id = Column(String(36), nullable=False)
@@ -57,4 +61,20 @@ class FundNetValue(Base):
     quarterly_growth_rate = Column(Float)
     yearly_growth_rate = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class FundPerformanceRanking(Base):
+    """按周期预先计算的基金绩效排名，净值入库后标记过期并由后台线程整体刷新"""
+    __tablename__ = "fund_performance_rankings"
+    __table_args__ = (
+        Index('idx_period_fund', 'period', 'fund_id'),
+    )
+    
+    period = Column(String(20), primary_key=True)
+    performance_rank = Column(Integer, primary_key=True)
+    fund_id = Column(String(36), nullable=False)
+    fund_name = Column(String(100))
+    fund_code = Column(String(20))
+    growth_rate = Column(Float, nullable=False)
+    latest_nav = Column(Float)
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
@@ -0,0 +1,191 @@
+import os
+import threading
+import numpy as np
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from config.config import config
+from .models import FundNetValue
+
+try:
+    import fcntl
+except ImportError:  # 非POSIX平台只使用进程内锁
+    fcntl = None
+
+# 每条净值记录的定长结构，文件内按日期升序紧密排列
+NAV_DTYPE = np.dtype([
+    ('date', 'datetime64[s]'),
+    ('net_value', '<f8'),
+    ('accumulated_net_value', '<f8')
+])
+NAV_FILE_SUFFIX = ".nav"
+# 写入时持有的文件锁后缀（fcntl.flock，跨进程串行化同一基金的写入）
+LOCK_FILE_SUFFIX = ".lock"
+# 从净值表重建时每批读取的行数
+REBUILD_FETCH_SIZE = 10000
+
+def _to_datetime64(value) -> np.datetime64:
+    return np.datetime64(value, 's')
+
+class NavStore:
+    """列式净值时间序列存储
+
+    每个基金一个文件，由NAV_DTYPE定长记录按日期升序组成，读取时内存映射，
+    区间读取为searchsorted后的零拷贝切片；入库时按日期追加到文件尾，
+    乱序或覆盖写入时整体重写（写临时文件后原子替换）。同一基金的写入由进程内锁和
+    文件锁串行化，读取不加锁。作为fund_net_values表的读模型，可随时由rebuild_from_table从表重建。
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or config.fund.NAV_STORE_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # fund_id -> (映射时的文件标识 (inode, mtime, 大小), 内存映射数组)
+        self._maps: Dict[str, Tuple[Tuple[int, int, int], np.ndarray]] = {}
+        # fund_id -> 进程内写锁
+        self._write_locks: Dict[str, threading.Lock] = {}
+
+    def _path(self, fund_id: str) -> str:
+        return os.path.join(self.directory, f"{fund_id}{NAV_FILE_SUFFIX}")
+
+    @contextmanager
+    def _writing(self, fund_id: str):
+        """持有基金的进程内写锁与文件锁，期间其他线程和进程不能写入该基金"""
+        with self._lock:
+            write_lock = self._write_locks.setdefault(fund_id, threading.Lock())
+        with write_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{self._path(fund_id)}{LOCK_FILE_SUFFIX}", 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def has_fund(self, fund_id: str) -> bool:
+        return os.path.exists(self._path(fund_id))
+
+    def series(self, fund_id: str) -> np.ndarray:
+        """基金全部净值记录（只读内存映射）；文件被追加或被其他进程替换后自动重新映射"""
+        path = self._path(fund_id)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return np.empty(0, dtype=NAV_DTYPE)
+        size = stat.st_size - stat.st_size % NAV_DTYPE.itemsize
+        # 整体重写后文件大小可能不变，以inode和修改时间区分
+        identity = (stat.st_ino, stat.st_mtime_ns, size)
+        with self._lock:
+            mapped = self._maps.get(fund_id)
+            if mapped is not None and mapped[0] == identity:
+                return mapped[1]
+            if size == 0:
+                records = np.empty(0, dtype=NAV_DTYPE)
+            else:
+                records = np.memmap(path, dtype=NAV_DTYPE, mode='r', shape=(size // NAV_DTYPE.itemsize,))
+            self._maps[fund_id] = (identity, records)
+            return records
+
+    def range(self, fund_id: str, start_date: Optional[datetime] = None,
+              end_date: Optional[datetime] = None) -> np.ndarray:
+        """[start_date, end_date]区间内的净值记录，返回内存映射上的切片视图"""
+        records = self.series(fund_id)
+        dates = records['date']
+        lo = 0 if start_date is None else np.searchsorted(dates, _to_datetime64(start_date), side='left')
+        hi = len(records) if end_date is None else np.searchsorted(dates, _to_datetime64(end_date), side='right')
+        return records[lo:hi]
+
+    def latest(self, fund_id: str) -> Optional[np.void]:
+        records = self.series(fund_id)
+        return records[-1] if len(records) else None
+
+    def value_at_or_before(self, fund_id: str, when: datetime) -> Optional[np.void]:
+        """不晚于when的最后一条记录"""
+        records = self.series(fund_id)
+        index = np.searchsorted(records['date'], _to_datetime64(when), side='right') - 1
+        return records[index] if index >= 0 else None
+
+    def _write(self, fund_id: str, records: np.ndarray):
+        """整体写入（临时文件+原子替换），读者不会看到写了一半的文件；调用方需持有写锁"""
+        path = self._path(fund_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(np.ascontiguousarray(records, dtype=NAV_DTYPE).tobytes())
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._maps.pop(fund_id, None)
+
+    def append(self, fund_id: str, date: datetime, net_value: float, accumulated_net_value: float):
+        """写入一条净值；日期晚于末条记录时追加到文件尾，否则按日期合并重写"""
+        self.append_many(fund_id, [(date, net_value, accumulated_net_value)])
+
+    def append_many(self, fund_id: str, rows: Iterable[Tuple[datetime, float, float]]):
+        """批量写入同一基金的净值记录 (日期, 净值, 累计净值)，同一日期以后写入的为准"""
+        new_records = np.array(
+            [(_to_datetime64(date), net_value, accumulated_net_value)
+             for date, net_value, accumulated_net_value in rows],
+            dtype=NAV_DTYPE
+        )
+        if len(new_records) == 0:
+            return
+        new_records = new_records[np.argsort(new_records['date'], kind='stable')]
+        in_order = np.all(new_records['date'][1:] > new_records['date'][:-1])
+        with self._writing(fund_id):
+            # 持锁后读取，看到其他写入者已提交的全部记录
+            existing = self.series(fund_id)
+            if in_order and (len(existing) == 0 or new_records['date'][0] > existing['date'][-1]):
+                with open(self._path(fund_id), 'ab') as f:
+                    f.write(new_records.tobytes())
+                return
+
+            merged = np.concatenate([np.array(existing), new_records])
+            # 同一日期保留最后写入的记录
+            order = np.argsort(merged['date'], kind='stable')
+            merged = merged[order]
+            keep = np.append(merged['date'][1:] != merged['date'][:-1], True)
+            self._write(fund_id, merged[keep])
+
+    def _replace(self, fund_id: str, records: np.ndarray):
+        with self._writing(fund_id):
+            self._write(fund_id, records)
+
+    def rebuild_from_table(self, db: Session, fund_ids: Optional[Sequence[str]] = None) -> int:
+        """从fund_net_values表重建存储文件，按基金流式读取不构造ORM对象；返回重建的基金数
+
+        表中没有净值记录的基金不创建文件，以免为任意ID在磁盘上留下文件
+        """
+        stmt = (
+            select(FundNetValue.fund_id, FundNetValue.date, FundNetValue.net_value,
+                   FundNetValue.accumulated_net_value)
+            .order_by(FundNetValue.fund_id, FundNetValue.date)
+            .execution_options(yield_per=REBUILD_FETCH_SIZE)
+        )
+        if fund_ids is not None:
+            stmt = stmt.where(FundNetValue.fund_id.in_(list(fund_ids)))
+
+        rebuilt = set()
+        current_fund, buffer = None, []
+        for fund_id, date, net_value, accumulated_net_value in db.execute(stmt):
+            if fund_id != current_fund:
+                if current_fund is not None:
+                    self._replace(current_fund, np.array(buffer, dtype=NAV_DTYPE))
+                    rebuilt.add(current_fund)
+                current_fund, buffer = fund_id, []
+            buffer.append((_to_datetime64(date), net_value, accumulated_net_value))
+        if current_fund is not None:
+            self._replace(current_fund, np.array(buffer, dtype=NAV_DTYPE))
+            rebuilt.add(current_fund)
+        return len(rebuilt)
+
+    def ensure(self, db: Session, fund_id: str) -> np.ndarray:
+        """读取基金序列，文件不存在时先从表重建该基金；调用方应先确认基金存在"""
+        if not self.has_fund(fund_id):
+            self.rebuild_from_table(db, [fund_id])
+        return self.series(fund_id)
+
+# 基金服务共享的净值存储
+nav_store = NavStore()
\ No newline at end of file
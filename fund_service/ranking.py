@@ -0,0 +1,237 @@
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import select, delete, insert, func, case, and_
+from sqlalchemy.orm import Session
+from common.cache import cache
+from config.config import config
+from database.database import SessionLocal
+from .models import Fund, FundNetValue, FundStatus, FundPerformanceRanking
+
+RANKING_PERIODS = ["daily", "weekly", "monthly", "quarterly", "yearly", "ytd"]
+
+# 各周期对应的最新净值记录中的增长率列（ytd单独计算）
+GROWTH_RATE_COLUMNS = {
+    "daily": "daily_growth_rate",
+    "weekly": "weekly_growth_rate",
+    "monthly": "monthly_growth_rate",
+    "quarterly": "quarterly_growth_rate",
+    "yearly": "yearly_growth_rate"
+}
+
+# 排名过期标记（Redis，多个基金服务进程共享）
+RANKING_STALE_KEY = "fund_ranking:stale"
+# 排名重建锁（Redis，SET NX），同一时刻只有一个进程重建排名表
+RANKING_REFRESH_LOCK_KEY = "fund_ranking:refresh_lock"
+# 每次插入的排名行数
+INSERT_CHUNK_SIZE = 1000
+
+def _latest_nav_rows(where=None):
+    """每个基金按日期倒序编号的净值记录子查询，rn=1为最新一条"""
+    stmt = select(
+        FundNetValue.fund_id,
+        FundNetValue.net_value,
+        *[getattr(FundNetValue, column) for column in GROWTH_RATE_COLUMNS.values()],
+        func.row_number().over(
+            partition_by=FundNetValue.fund_id,
+            order_by=FundNetValue.date.desc()
+        ).label('rn')
+    )
+    if where is not None:
+        stmt = stmt.where(where)
+    return stmt.subquery()
+
+def ranking_query(period: str, now: Optional[datetime] = None):
+    """单条窗口函数查询：全部活跃基金在该周期的增长率，按增长率降序
+
+    与逐基金查询的语义一致：没有净值记录的基金不参与排名，增长率缺失按0计
+    """
+    latest = _latest_nav_rows()
+    if period == "ytd":
+        year_start = datetime((now or datetime.utcnow()).year, 1, 1)
+        year_start_nav = _latest_nav_rows(FundNetValue.date <= year_start)
+        growth_rate = case(
+            (year_start_nav.c.net_value > 0,
+             (latest.c.net_value - year_start_nav.c.net_value) / year_start_nav.c.net_value * 100),
+            else_=0.0
+        )
+    else:
+        growth_rate = func.coalesce(latest.c[GROWTH_RATE_COLUMNS[period]], 0.0)
+    growth_rate = growth_rate.label('growth_rate')
+
+    stmt = (
+        select(Fund.id, Fund.name, Fund.code, Fund.latest_nav, growth_rate)
+        .join(latest, and_(latest.c.fund_id == Fund.id, latest.c.rn == 1))
+        .where(Fund.status == FundStatus.ACTIVE)
+        .order_by(growth_rate.desc(), Fund.id)
+    )
+    if period == "ytd":
+        stmt = stmt.outerjoin(
+            year_start_nav,
+            and_(year_start_nav.c.fund_id == Fund.id, year_start_nav.c.rn == 1)
+        )
+    return stmt
+
+class RankingStore:
+    """预计算排名表的维护
+
+    净值入库时标记过期并唤醒后台线程，后台线程在Redis锁下整体重建；
+    读取从不触发重建，始终返回最近一次物化的排名表
+    """
+
+    def __init__(self, session_factory=None, refresh_interval: Optional[float] = None,
+                 lock_seconds: Optional[int] = None):
+        self.session_factory = session_factory or SessionLocal
+        self.refresh_interval = refresh_interval or config.fund.RANKING_REFRESH_INTERVAL
+        self.lock_seconds = lock_seconds or config.fund.RANKING_REFRESH_LOCK_SECONDS
+        self._refresh_lock = threading.Lock()
+        self._local_stale = True
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def mark_stale(self):
+        """净值或基金状态变化后调用"""
+        self._local_stale = True
+        if cache.client:
+            try:
+                cache.client.set(RANKING_STALE_KEY, "1")
+            except Exception as e:
+                print(f"Redis set error: {str(e)}")
+        self._wake_event.set()
+
+    def is_stale(self) -> bool:
+        if cache.client:
+            try:
+                return bool(cache.client.exists(RANKING_STALE_KEY)) or self._local_stale
+            except Exception as e:
+                print(f"Redis exists error: {str(e)}")
+        return self._local_stale
+
+    def _acquire_refresh_lock(self) -> Optional[str]:
+        """获取跨进程重建锁，返回锁令牌；其他进程正在重建时返回None，Redis不可用时只依赖进程内锁"""
+        token = uuid.uuid4().hex
+        if cache.client:
+            try:
+                if not cache.client.set(RANKING_REFRESH_LOCK_KEY, token, nx=True, ex=self.lock_seconds):
+                    return None
+            except Exception as e:
+                print(f"Redis set error: {str(e)}")
+        return token
+
+    def _release_refresh_lock(self, token: str):
+        if cache.client:
+            try:
+                if cache.client.get(RANKING_REFRESH_LOCK_KEY) == token:
+                    cache.client.delete(RANKING_REFRESH_LOCK_KEY)
+            except Exception as e:
+                print(f"Redis delete error: {str(e)}")
+
+    def refresh(self, db: Session, periods: Sequence[str] = RANKING_PERIODS) -> Optional[Dict[str, int]]:
+        """在重建锁下按周期重建排名表，返回每个周期的排名行数；其他进程正在重建时返回None"""
+        with self._refresh_lock:
+            token = self._acquire_refresh_lock()
+            if token is None:
+                return None
+            try:
+                return self._rebuild(db, periods)
+            finally:
+                self._release_refresh_lock(token)
+
+    def _rebuild(self, db: Session, periods: Sequence[str]) -> Dict[str, int]:
+        # 先清除标记：重建期间到达的新净值会重新设置标记
+        self._local_stale = False
+        if cache.client:
+            try:
+                cache.client.delete(RANKING_STALE_KEY)
+            except Exception as e:
+                print(f"Redis delete error: {str(e)}")
+
+        refreshed_at = datetime.utcnow()
+        counts = {}
+        try:
+            for period in periods:
+                rows = [
+                    {
+                        'period': period,
+                        'performance_rank': rank,
+                        'fund_id': fund_id,
+                        'fund_name': name,
+                        'fund_code': code,
+                        'growth_rate': float(growth_rate),
+                        'latest_nav': latest_nav,
+                        'refreshed_at': refreshed_at
+                    }
+                    for rank, (fund_id, name, code, latest_nav, growth_rate)
+                    in enumerate(db.execute(ranking_query(period, refreshed_at)), start=1)
+                ]
+                db.execute(delete(FundPerformanceRanking).where(FundPerformanceRanking.period == period))
+                for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+                    db.execute(insert(FundPerformanceRanking.__table__).values(rows[start:start + INSERT_CHUNK_SIZE]))
+                counts[period] = len(rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            self.mark_stale()
+            raise
+        return counts
+
+    def refresh_if_stale(self) -> Optional[Dict[str, int]]:
+        """排名表过期时使用独立会话重建"""
+        if not self.is_stale():
+            return None
+        db = self.session_factory()
+        try:
+            return self.refresh(db)
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake_event.wait(self.refresh_interval)
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                return
+            try:
+                self.refresh_if_stale()
+            except Exception as e:
+                print(f"Ranking refresh error: {e}")
+                self._stop_event.wait(self.refresh_interval)
+
+    def start(self):
+        """启动后台重建线程：被mark_stale唤醒，或每refresh_interval秒检查一次跨进程的过期标记"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="fund-ranking-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def top(self, db: Session, period: str, limit: int) -> List[Dict]:
+        """读取某周期前limit名（最近一次物化的排名表，不触发重建）；读取只按(period, rank)主键范围扫描"""
+        rows = db.execute(
+            select(FundPerformanceRanking)
+            .where(FundPerformanceRanking.period == period, FundPerformanceRanking.performance_rank <= limit)
+            .order_by(FundPerformanceRanking.performance_rank)
+        ).scalars().all()
+        return [
+            {
+                'fund_id': row.fund_id,
+                'fund_name': row.fund_name,
+                'fund_code': row.fund_code,
+                'growth_rate': row.growth_rate,
+                'latest_nav': row.latest_nav,
+                'performance_rank': row.performance_rank
+            }
+            for row in rows
+        ]
+
+# 基金服务共享的排名表实例
+ranking_store = RankingStore()
\ No newline at end of file
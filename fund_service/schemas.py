@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List, Dict
 from pydantic import BaseModel, Field
 from .models import FundType, RiskLevel, FundStatus
@@ -62,6 +62,13 @@ class FundSearchRequest(BaseModel):
     name_contains: Optional[str] = None
     min_nav: Optional[float] = None
     max_nav: Optional[float] = None
+    # 排序键：id 或 latest_nav；cursor为上一页返回的next_cursor
+    sort_by: str = 'id'
+    cursor: Optional[str] = None
+
+class FundSearchResponse(BaseModel):
+    items: List[FundResponse]
+    next_cursor: Optional[str] = None
 
 class FundPerformanceResponse(BaseModel):
     fund_id: str
@@ -75,4 +82,29 @@ class FundPerformanceResponse(BaseModel):
     yearly_growth_rate: Optional[float] = None
     year_to_date_growth: Optional[float] = None
     creation_date: datetime
-    performance_rank: Optional[int] = None
\ No newline at end of file
+    performance_rank: Optional[int] = None
+
+class RollingReturnStats(BaseModel):
+    latest: Optional[float] = None
+    mean: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    positive_ratio: Optional[float] = None
+
+class FundAnalyticsResponse(BaseModel):
+    # 收益率、波动率与回撤均为百分比
+    fund_id: str
+    as_of: date
+    start_date: date
+    end_date: date
+    observations: int
+    latest_nav: float
+    annualized_return: Optional[float] = None
+    volatility: Optional[float] = None
+    sharpe_ratio: Optional[float] = None
+    sortino_ratio: Optional[float] = None
+    max_drawdown: Optional[float] = None
+    max_drawdown_peak_date: Optional[date] = None
+    max_drawdown_trough_date: Optional[date] = None
+    max_drawdown_recovery_date: Optional[date] = None
+    rolling_returns: Dict[str, RollingReturnStats] = {}
\ No newline at end of file
@@ -0,0 +1,345 @@
+import bisect
+import json
+import threading
+import time
+import uuid
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from common.cache import cache
+from .models import Fund
+
+# 基金索引变更版本号，任一进程修改基金后递增，其他进程据此重新加载
+FUND_SEARCH_VERSION_KEY = "fund_search_index_version"
+# 净值变化广播频道：只更新排序列，不需要其他进程整体重新加载
+FUND_SEARCH_NAV_CHANNEL = "fund_search_index:navs"
+# 检查远端版本号的最小间隔（秒）
+REFRESH_CHECK_INTERVAL = 30
+# 位图索引的字段
+BITMAP_FIELDS = ('fund_type', 'status', 'risk_level')
+SORT_KEYS = ('id', 'latest_nav')
+INITIAL_CAPACITY = 1024
+
+def _field_value(value) -> Optional[str]:
+    value = getattr(value, 'value', value)
+    return None if value is None else str(value)
+
+def _nav_key(nav: float) -> float:
+    """latest_nav为空（NaN）的基金排在最后"""
+    return np.inf if np.isnan(nav) else nav
+
+def _grams(text: str) -> set:
+    """单字与相邻双字n-gram（中文名称按字切分同样适用）"""
+    text = (text or '').lower()
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+def _query_grams(text: str) -> set:
+    text = text.lower()
+    if len(text) < 2:
+        return {text}
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+class FundSearchIndex:
+    """进程内基金搜索索引
+
+    - 名称/代码的单字与双字n-gram倒排表，候选集再做子串校验
+    - fund_type/status/risk_level每个取值一个布尔位图，组合筛选为位图按位与
+    - latest_nav排序列，区间筛选为二分查找
+    - 结果按 (排序键, 基金ID) 排序，以最后一条的键作为游标做键集分页
+    文档编号在进程内稠密分配，删除只清除存活位。基金增删改通过版本号通知其他进程
+    重新加载，净值变化通过pub/sub广播增量，其他进程只更新排序列。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._doc_of: Dict[str, int] = {}
+        self._fund_ids: List[str] = []
+        self._texts: List[Tuple[str, str]] = []
+        self._size = 0
+        self._alive = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self._nav = np.zeros(INITIAL_CAPACITY, dtype=np.float64)
+        self._bitmaps: Dict[str, Dict[str, np.ndarray]] = {field: {} for field in BITMAP_FIELDS}
+        self._field_values: Dict[str, List[Optional[str]]] = {field: [] for field in BITMAP_FIELDS}
+        self._postings: Dict[str, set] = {}
+        # 排序列缓存，内容变化后惰性重建
+        self._orders: Dict[str, np.ndarray] = {}
+        self._sorted_keys: Dict[str, list] = {}
+        self._remote_version = None
+        self._last_refresh_check = 0.0
+        self.loaded = False
+        self.origin = uuid.uuid4().hex
+        self._listener = None
+
+    # 维护
+    def _grow(self, capacity: int):
+        def grown(array):
+            result = np.zeros(capacity, dtype=array.dtype)
+            result[:len(array)] = array
+            return result
+        self._alive = grown(self._alive)
+        self._nav = grown(self._nav)
+        for field in BITMAP_FIELDS:
+            self._bitmaps[field] = {value: grown(bitmap) for value, bitmap in self._bitmaps[field].items()}
+
+    def _set_bitmap(self, field: str, doc: int, value: Optional[str]):
+        previous = self._field_values[field][doc]
+        if previous is not None:
+            self._bitmaps[field][previous][doc] = False
+        if value is not None:
+            bitmap = self._bitmaps[field].get(value)
+            if bitmap is None:
+                bitmap = self._bitmaps[field][value] = np.zeros(len(self._alive), dtype=bool)
+            bitmap[doc] = True
+        self._field_values[field][doc] = value
+
+    def _set_text(self, doc: int, name: str, code: str):
+        old_name, old_code = self._texts[doc]
+        for gram in _grams(old_name) | _grams(old_code):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(doc)
+                if not postings:
+                    del self._postings[gram]
+        for gram in _grams(name) | _grams(code):
+            self._postings.setdefault(gram, set()).add(doc)
+        self._texts[doc] = ((name or '').lower(), (code or '').lower())
+
+    def _upsert(self, fund_id: str, name: str, code: str, fund_type, status, risk_level, latest_nav):
+        doc = self._doc_of.get(fund_id)
+        if doc is None:
+            doc = self._size
+            if doc >= len(self._alive):
+                self._grow(len(self._alive) * 2)
+            self._doc_of[fund_id] = doc
+            self._fund_ids.append(fund_id)
+            self._texts.append(('', ''))
+            for field in BITMAP_FIELDS:
+                self._field_values[field].append(None)
+            self._size += 1
+        self._alive[doc] = True
+        self._nav[doc] = latest_nav if latest_nav is not None else np.nan
+        self._set_text(doc, name, code)
+        for field, value in zip(BITMAP_FIELDS, (fund_type, status, risk_level)):
+            self._set_bitmap(field, doc, _field_value(value))
+        self._orders = {}
+
+    def _read_remote_version(self) -> Optional[str]:
+        if not cache.client:
+            return None
+        try:
+            return cache.client.get(FUND_SEARCH_VERSION_KEY)
+        except Exception as e:
+            print(f"Fund search index version check error: {str(e)}")
+            return None
+
+    def load(self, db: Session):
+        """从funds表整体重建索引"""
+        # 先读版本号再读表，期间的修改会在下次检查时再次触发加载
+        remote_version = self._read_remote_version()
+        rows = db.execute(select(
+            Fund.id, Fund.name, Fund.code, Fund.fund_type, Fund.status, Fund.risk_level, Fund.latest_nav
+        )).all()
+        fresh = FundSearchIndex()
+        for row in rows:
+            fresh._upsert(*row)
+        with self._lock:
+            self.__dict__.update({
+                name: value for name, value in fresh.__dict__.items()
+                if name not in ('_lock', '_last_refresh_check', 'origin', '_listener')
+            })
+            self._remote_version = remote_version
+            self.loaded = True
+
+    def _bump_version(self):
+        """通知其他进程重新加载"""
+        if cache.client:
+            try:
+                self._advance_remote_version(cache.client.incr(FUND_SEARCH_VERSION_KEY))
+            except Exception as e:
+                print(f"Fund search index version error: {str(e)}")
+
+    def _advance_remote_version(self, new_version):
+        """只有INCR结果恰为已知版本号+1（期间没有其他进程修改）时才记录；
+        否则其他进程的修改尚未加载，清空检查时间使下次ensure_fresh立即重新加载"""
+        with self._lock:
+            try:
+                expected = int(self._remote_version or 0) + 1
+            except ValueError:
+                expected = None
+            if int(new_version) == expected:
+                self._remote_version = str(new_version)
+            else:
+                self._last_refresh_check = 0.0
+
+    def upsert_fund(self, fund: Fund):
+        """基金创建或更新后调用"""
+        with self._lock:
+            if self.loaded:
+                self._upsert(fund.id, fund.name, fund.code, fund.fund_type, fund.status,
+                             fund.risk_level, fund.latest_nav)
+        self._bump_version()
+
+    def remove_fund(self, fund_id: str):
+        with self._lock:
+            doc = self._doc_of.get(fund_id)
+            if doc is not None:
+                self._alive[doc] = False
+                self._orders = {}
+        self._bump_version()
+
+    def _apply_navs(self, latest_navs: Dict[str, float]):
+        with self._lock:
+            for fund_id, latest_nav in latest_navs.items():
+                doc = self._doc_of.get(fund_id)
+                if doc is not None and latest_nav is not None:
+                    self._nav[doc] = latest_nav
+            self._orders = {}
+
+    def update_navs(self, latest_navs: Dict[str, float]):
+        """净值入库后更新latest_nav排序列，并向其他进程广播净值增量"""
+        latest_navs = {fund_id: nav for fund_id, nav in latest_navs.items() if nav is not None}
+        if not latest_navs:
+            return
+        self._apply_navs(latest_navs)
+        if cache.client:
+            try:
+                cache.client.publish(FUND_SEARCH_NAV_CHANNEL, json.dumps({'origin': self.origin, 'navs': latest_navs}))
+            except Exception as e:
+                print(f"Fund search index publish error: {str(e)}")
+
+    def start_listener(self):
+        """启动净值增量订阅线程（每个进程一个，重复调用无副作用）"""
+        if self._listener is not None or not cache.client:
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(target=self._listen, name="fund-search-navs", daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = cache.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(FUND_SEARCH_NAV_CHANNEL)
+                for message in pubsub.listen():
+                    self._on_nav_message(message.get('data'))
+            except Exception as e:
+                print(f"Fund search index listener error: {str(e)}")
+            # 断线期间可能漏收净值增量，下次ensure_fresh时整体重新加载
+            with self._lock:
+                self._remote_version = None
+                self._last_refresh_check = 0.0
+            time.sleep(1)
+
+    def _on_nav_message(self, data):
+        try:
+            payload = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if payload.get('origin') == self.origin:
+            return
+        self._apply_navs(payload.get('navs') or {})
+
+    def ensure_fresh(self, db: Session):
+        """首次使用时加载；之后按间隔检查远端版本号，其他进程有修改时重新加载"""
+        self.start_listener()
+        if not self.loaded:
+            self.load(db)
+            return
+        now = time.monotonic()
+        if now - self._last_refresh_check < REFRESH_CHECK_INTERVAL or not cache.client:
+            return
+        self._last_refresh_check = now
+        remote_version = self._read_remote_version()
+        if remote_version is not None and remote_version != self._remote_version:
+            self.load(db)
+
+    # 查询
+    def _order(self, sort_by: str) -> np.ndarray:
+        """按 (排序键, 基金ID) 排好序的文档编号，并缓存对应的排序键列表供游标二分"""
+        order = self._orders.get(sort_by)
+        if order is None:
+            if sort_by == 'latest_nav':
+                keys = [(_nav_key(self._nav[doc]), fund_id) for doc, fund_id in enumerate(self._fund_ids)]
+            else:
+                keys = list(self._fund_ids)
+            docs = sorted(range(self._size), key=keys.__getitem__)
+            order = np.array(docs, dtype=np.int64)
+            self._sorted_keys[sort_by] = [keys[doc] for doc in docs]
+            self._orders[sort_by] = order
+        return order
+
+    def _text_mask(self, text: str, size: int) -> np.ndarray:
+        mask = np.zeros(size, dtype=bool)
+        postings = [self._postings.get(gram, set()) for gram in _query_grams(text)]
+        if not all(postings):
+            return mask
+        candidates = set.intersection(*sorted(postings, key=len))
+        text = text.lower()
+        matched = [doc for doc in candidates if text in self._texts[doc][0] or text in self._texts[doc][1]]
+        mask[matched] = True
+        return mask
+
+    def _nav_mask(self, min_nav: Optional[float], max_nav: Optional[float], size: int) -> np.ndarray:
+        """用latest_nav排序列二分得到区间内的文档"""
+        order = self._order('latest_nav')
+        sorted_nav = self._nav[:size][order]
+        lo = 0 if min_nav is None else np.searchsorted(sorted_nav, min_nav, side='left')
+        # 排在末尾的空值不参与区间筛选
+        hi = size - int(np.isnan(sorted_nav).sum()) if max_nav is None else np.searchsorted(sorted_nav, max_nav, side='right')
+        mask = np.zeros(size, dtype=bool)
+        mask[order[lo:hi]] = True
+        return mask
+
+    def _cursor_position(self, sort_by: str, cursor: str) -> int:
+        """游标之后第一条在排序列中的位置"""
+        if sort_by == 'latest_nav':
+            nav, _, fund_id = cursor.partition('|')
+            key = (_nav_key(float(nav)), fund_id)
+        else:
+            key = cursor
+        return bisect.bisect_right(self._sorted_keys[sort_by], key)
+
+    def search(self, fund_type=None, status=None, risk_level=None, text: Optional[str] = None,
+               min_nav: Optional[float] = None, max_nav: Optional[float] = None,
+               sort_by: str = 'id', cursor: Optional[str] = None, skip: int = 0,
+               limit: int = 100) -> Tuple[List[str], Optional[str]]:
+        """组合筛选，返回 (基金ID列表, 下一页游标)"""
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Invalid sort key. Valid keys are: {', '.join(SORT_KEYS)}")
+        with self._lock:
+            size = self._size
+            mask = self._alive[:size].copy()
+            for field, value in zip(BITMAP_FIELDS, (fund_type, status, risk_level)):
+                value = _field_value(value)
+                if value is not None:
+                    bitmap = self._bitmaps[field].get(value)
+                    if bitmap is None:
+                        return [], None
+                    mask &= bitmap[:size]
+            if text:
+                mask &= self._text_mask(text, size)
+            if min_nav is not None or max_nav is not None:
+                mask &= self._nav_mask(min_nav, max_nav, size)
+
+            order = self._order(sort_by)
+            start = self._cursor_position(sort_by, cursor) if cursor else 0
+            remaining = order[start:]
+            docs = remaining[mask[remaining]][skip:skip + limit + 1]
+            has_more = len(docs) > limit
+            docs = docs[:limit]
+            fund_ids = [self._fund_ids[doc] for doc in docs]
+
+            next_cursor = None
+            if has_more and len(docs):
+                last = docs[-1]
+                next_cursor = (f"{float(self._nav[last])!r}|{self._fund_ids[last]}"
+                               if sort_by == 'latest_nav' else self._fund_ids[last])
+            return fund_ids, next_cursor
+
+# 基金服务共享的搜索索引
+fund_search_index = FundSearchIndex()
\ No newline at end of file
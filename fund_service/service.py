@@ -1,17 +1,36 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import Depends, HTTPException, Request, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from .models import Fund, FundNetValue, FundStatus
+from .models import Fund, FundNetValue, FundStatus, FundType
 from .schemas import (
     FundCreate, FundUpdate, FundResponse,
-    FundNetValueCreate, FundNetValueResponse,
-    FundSearchRequest, FundPerformanceResponse
+    FundNetValueCreate,
+    FundSearchRequest, FundSearchResponse, FundPerformanceResponse, FundAnalyticsResponse
+)
+from database.database import get_db, SessionLocal
+from .ranking import ranking_store, RANKING_PERIODS
+from .nav_store import nav_store
+from .growth import GROWTH_WINDOWS, latest_growth_rates, recompute_growth_rates
+from .ingest import (
+    ingest_batch, batched, parse_records, stream_batches, normalize_content_type,
+    CSV_CONTENT_TYPES, NDJSON_CONTENT_TYPES, MAX_REPORTED_ERRORS
+)
+from .export import (
+    EXPORT_FORMATS, NAV_EXPORT_COLUMNS, FUND_EXPORT_COLUMNS,
+    iter_nav_chunks, iter_fund_chunks, export_stream, parse_nav_cursor
+)
+from .search_index import fund_search_index
+from .analytics import get_fund_analytics, batch_analytics, invalidate_analytics
+from .correlation import correlation_store
+from .chart import get_chart_series, invalidate_charts, DEFAULT_CHART_POINTS, MIN_CHART_POINTS, MAX_CHART_POINTS
+from .fund_cache import (
+    get_cached_fund, get_cached_latest_nav, cache_fund, cache_latest_nav, invalidate_funds
 )
-from database.database import get_db
-from common.cache import redis_client
 import uuid
-from datetime import datetime, timedelta
-import json
-from fastapi import HTTPException, Depends
+import numpy as np
+from datetime import date, datetime
+from typing import List, Optional
 
 # 基金CRUD操作
 def create_fund(fund: FundCreate, db: Session):
@@ -50,29 +69,20 @@ def create_fund(fund: FundCreate, db: Session):
     )
     db.add(initial_nav)
     db.commit()
+    fund_search_index.upsert_fund(db_fund)
     
     # 更新缓存
-    cache_key = f"fund:{db_fund.id}"
-    redis_client.set(cache_key, json.dumps(fund.dict()))
+    cache_fund(db_fund)
     
     return db_fund
 
 @app.get("/funds/{fund_id}", response_model=FundResponse)
 def get_fund(fund_id: str, db: Session = Depends(get_db)):
     """获取基金详情"""
-    # 先检查缓存
-    cache_key = f"fund:{fund_id}"
-    cached_fund = redis_client.get(cache_key)
-    if cached_fund:
-        fund_data = json.loads(cached_fund)
-        return FundResponse(**fund_data)
-    
-    fund = db.query(Fund).filter(Fund.id == fund_id).first()
+    # 进程内缓存 -> Redis -> 数据库
+    fund = get_cached_fund(fund_id, lambda: db.query(Fund).filter(Fund.id == fund_id).first())
     if not fund:
         raise HTTPException(status_code=404, detail="Fund not found")
-    
-    # 存入缓存
-    redis_client.set(cache_key, json.dumps(fund.dict()))
     return fund
 
 @app.put("/funds/{fund_id}", response_model=FundResponse)
@@ -88,10 +98,11 @@ def update_fund(fund_id: str, fund: FundUpdate, db: Session = Depends(get_db)):
     
     db.commit()
     db.refresh(db_fund)
+    ranking_store.mark_stale()
+    fund_search_index.upsert_fund(db_fund)
     
     # 更新缓存
-    cache_key = f"fund:{fund_id}"
-    redis_client.set(cache_key, json.dumps(db_fund.dict()))
+    cache_fund(db_fund)
     
     return db_fund
 
@@ -105,10 +116,12 @@ def delete_fund(fund_id: str, db: Session = Depends(get_db)):
     # 不实际删除，而是将状态设置为CLOSED
     fund.status = FundStatus.CLOSED
     db.commit()
+    ranking_store.mark_stale()
+    correlation_store.mark_stale()
+    fund_search_index.upsert_fund(fund)
     
     # 从缓存中删除
-    cache_key = f"fund:{fund_id}"
-    redis_client.delete(cache_key)
+    invalidate_funds([fund_id])
     
     return {"message": "Fund marked as closed"}
 
@@ -128,51 +141,105 @@ def add_fund_net_value(fund_id: str, net_value: FundNetValueCreate, db: Session)
     if existing_nav:
         raise HTTPException(status_code=400, detail="Net value for this date already exists")
     
+    # 服务端按基金净值序列计算各窗口增长率；历史不足无法计算时沿用调用方提供的值
+    series = nav_store.ensure(db, fund_id)
+    backfill = len(series) > 0 and np.datetime64(net_value.date, 's') < series['date'][-1]
+    growth_rates = latest_growth_rates(
+        np.append(series['date'], np.datetime64(net_value.date, 's')),
+        np.append(series['net_value'], net_value.net_value)
+    )
+    for column in GROWTH_WINDOWS:
+        if growth_rates[column] is None:
+            growth_rates[column] = getattr(net_value, column)
+    
     db_net_value = FundNetValue(
         id=str(uuid.uuid4()),
         fund_id=fund_id,
         date=net_value.date,
         net_value=net_value.net_value,
         accumulated_net_value=net_value.accumulated_net_value,
-        daily_growth_rate=net_value.daily_growth_rate,
-        weekly_growth_rate=net_value.weekly_growth_rate,
-        monthly_growth_rate=net_value.monthly_growth_rate,
-        quarterly_growth_rate=net_value.quarterly_growth_rate,
-        yearly_growth_rate=net_value.yearly_growth_rate
+        **growth_rates
     )
     
     db.add(db_net_value)
     db.commit()
+    
+    # 回填历史日期会改变其后各记录的增长率基准，整体重算该基金
+    if backfill:
+        recompute_growth_rates(db, [fund_id])
     db.refresh(db_net_value)
     
-    # 更新基金的最新净值
-    fund.latest_nav = net_value.net_value
-    db.commit()
-    
-    # 更新缓存
-    cache_key = f"fund:{fund_id}:latest_nav"
-    redis_client.set(cache_key, json.dumps(db_net_value.dict()))
+    # 更新基金的最新净值（回填历史日期时最新净值不变）
+    if not backfill:
+        fund.latest_nav = net_value.net_value
+        db.commit()
+        fund_search_index.update_navs({fund_id: fund.latest_nav})
+    ranking_store.mark_stale()
+    
+    # 同步写入列式净值存储（读模型，失败时可由净值表重建）
+    try:
+        nav_store.append(fund_id, net_value.date, net_value.net_value, net_value.accumulated_net_value)
+    except Exception as e:
+        print(f"NAV store append error for fund {fund_id}: {e}")
+    
+    # 更新缓存（回填历史时最新净值记录不变，只需失效）
+    if backfill:
+        invalidate_funds([fund_id])
+    else:
+        cache_latest_nav(fund, db_net_value)
+    invalidate_analytics([fund_id])
+    invalidate_charts([fund_id])
+    correlation_store.apply_rows([{'fund_id': fund_id, 'date': net_value.date, 'net_value': net_value.net_value}])
     
     return db_net_value
 
+@app.post("/funds/net_values/bulk")
+async def bulk_ingest_net_values(request: Request):
+    """批量导入净值记录
+
+    支持JSON数组、CSV（带表头）与NDJSON；CSV/NDJSON按行流式读取请求体。
+    每批一次校验基金存在性、按(fund_id, date) upsert、一条UPDATE刷新latest_nav，
+    并只失效一次缓存
+    """
+    content_type = normalize_content_type(request.headers.get('content-type'))
+    db = SessionLocal()
+    summary = {"received": 0, "written": 0, "rejected": 0, "funds": 0, "errors": []}
+    fund_ids = set()
+    
+    async def process(batch):
+        try:
+            result = await run_in_threadpool(ingest_batch, db, batch, summary["received"])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Bulk ingest failed after {summary['written']} rows: {e}")
+        summary["received"] += len(batch)
+        summary["written"] += result['written']
+        summary["rejected"] += len(result['errors'])
+        summary["errors"].extend(result['errors'][:MAX_REPORTED_ERRORS - len(summary["errors"])])
+        fund_ids.update(result['fund_ids'])
+    
+    try:
+        if content_type in CSV_CONTENT_TYPES or content_type in NDJSON_CONTENT_TYPES:
+            async for batch in stream_batches(request.stream(), content_type):
+                await process(batch)
+        else:
+            for batch in batched(parse_records(await request.body(), content_type)):
+                await process(batch)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed payload after row {summary['received']}: {e}")
+    finally:
+        db.close()
+    
+    summary["funds"] = len(fund_ids)
+    return summary
+
 def get_latest_net_value(fund_id: str, db: Session):
     """获取基金最新净值"""
-    # 先检查缓存
-    cache_key = f"fund:{fund_id}:latest_nav"
-    cached_nav = redis_client.get(cache_key)
-    if cached_nav:
-        nav_data = json.loads(cached_nav)
-        return FundNetValueResponse(**nav_data)
-    
-    net_value = db.query(FundNetValue).filter(
+    net_value = get_cached_latest_nav(fund_id, lambda: db.query(FundNetValue).filter(
         FundNetValue.fund_id == fund_id
-    ).order_by(FundNetValue.date.desc()).first()
+    ).order_by(FundNetValue.date.desc()).first())
     
     if not net_value:
         raise HTTPException(status_code=404, detail="No net value data found")
-    
-    # 存入缓存
-    redis_client.set(cache_key, json.dumps(net_value.dict()))
     return net_value
 
 def get_fund_net_values(fund_id: str, start_date: datetime, end_date: datetime, db: Session):
@@ -188,33 +255,121 @@ def get_fund_net_values(fund_id: str, start_date: datetime, end_date: datetime,
     
     return net_values
 
+@app.get("/funds/{fund_id}/net_values/series")
+def get_fund_net_value_series(fund_id: str, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                              db: Session = Depends(get_db)):
+    """以列式结构返回净值区间，直接切片内存映射的净值存储"""
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="Start date must be before end date")
+    if not get_cached_fund(fund_id, lambda: db.query(Fund).filter(Fund.id == fund_id).first()):
+        raise HTTPException(status_code=404, detail="Fund not found")
+    
+    nav_store.ensure(db, fund_id)
+    records = nav_store.range(fund_id, start_date, end_date)
+    return {
+        "fund_id": fund_id,
+        "dates": np.datetime_as_string(records['date'], unit='D').tolist(),
+        "net_values": records['net_value'].tolist(),
+        "accumulated_net_values": records['accumulated_net_value'].tolist(),
+        "total_items": len(records)
+    }
+
+@app.get("/funds/{fund_id}/net_values/chart")
+def get_fund_net_value_chart(fund_id: str, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                             points: int = DEFAULT_CHART_POINTS, db: Session = Depends(get_db)):
+    """图表用净值序列：LTTB降采样到points个点，保持曲线形状"""
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="Start date must be before end date")
+    if not MIN_CHART_POINTS <= points <= MAX_CHART_POINTS:
+        raise HTTPException(status_code=400, detail=f"points must be between {MIN_CHART_POINTS} and {MAX_CHART_POINTS}")
+    if not get_cached_fund(fund_id, lambda: db.query(Fund).filter(Fund.id == fund_id).first()):
+        raise HTTPException(status_code=404, detail="Fund not found")
+    
+    return get_chart_series(db, fund_id, start_date, end_date, points)
+
+@app.post("/funds/net_values/recompute_growth")
+def recompute_fund_growth_rates(fund_ids: Optional[List[str]] = None, db: Session = Depends(get_db)):
+    """回填历史净值后重算增长率列（为空时重算全部基金）"""
+    updated = recompute_growth_rates(db, fund_ids)
+    ranking_store.mark_stale()
+    return {"updated_rows": updated}
+
+@app.post("/funds/nav_store/rebuild")
+def rebuild_nav_store(db: Session = Depends(get_db)):
+    """从净值表重建全部基金的列式净值存储"""
+    return {"rebuilt_funds": nav_store.rebuild_from_table(db)}
+
 # 基金搜索和筛选
+def _search_fund_page(request: FundSearchRequest, db: Session, skip: int = 0, limit: int = 100):
+    """在进程内搜索索引上筛选，再按主键一次取回当前页的基金"""
+    fund_search_index.ensure_fresh(db)
+    try:
+        fund_ids, next_cursor = fund_search_index.search(
+            fund_type=request.fund_type,
+            status=request.status,
+            risk_level=request.risk_level,
+            text=request.name_contains,
+            min_nav=request.min_nav,
+            max_nav=request.max_nav,
+            sort_by=request.sort_by,
+            cursor=request.cursor,
+            skip=skip,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not fund_ids:
+        return [], None
+    
+    funds = {fund.id: fund for fund in db.query(Fund).filter(Fund.id.in_(fund_ids)).all()}
+    return [funds[fund_id] for fund_id in fund_ids if fund_id in funds], next_cursor
+
 def search_funds(request: FundSearchRequest, db: Session, skip: int = 0, limit: int = 100):
     """搜索和筛选基金"""
-    query = db.query(Fund)
-    
-    # 应用筛选条件
-    if request.fund_type:
-        query = query.filter(Fund.fund_type == request.fund_type)
-    
-    if request.status:
-        query = query.filter(Fund.status == request.status)
-    
-    if request.risk_level:
-        query = query.filter(Fund.risk_level == request.risk_level)
-    
-    if request.name_contains:
-        query = query.filter(Fund.name.contains(request.name_contains))
-    
-    if request.min_nav is not None:
-        query = query.filter(Fund.latest_nav >= request.min_nav)
-    
-    if request.max_nav is not None:
-        query = query.filter(Fund.latest_nav <= request.max_nav)
-    
-    funds = query.offset(skip).limit(limit).all()
+    funds, _ = _search_fund_page(request, db, skip, limit)
     return funds
 
+@app.post("/funds/search", response_model=FundSearchResponse)
+def search_funds_page(request: FundSearchRequest, limit: int = 100, db: Session = Depends(get_db)):
+    """搜索和筛选基金，按键集游标分页：将返回的next_cursor放入下一次请求的cursor"""
+    funds, next_cursor = _search_fund_page(request, db, limit=min(limit, 1000))
+    return {"items": funds, "next_cursor": next_cursor}
+
+# 流式导出
+def _export_response(chunks, columns, export_format: str, filename: str):
+    try:
+        stream = export_stream(chunks, columns, export_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        stream,
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
+
+@app.get("/funds/net_values/export")
+def export_fund_net_values(format: str = "ndjson", fund_id: Optional[List[str]] = Query(None),
+                           start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                           cursor: Optional[str] = None):
+    """流式导出净值（NDJSON/CSV/Arrow IPC）
+
+    按(fund_id, date)键集分页逐块读取并立即写出，内存占用与结果规模无关；
+    中断后以最后收到一行的 "fund_id|date" 作为cursor继续
+    """
+    try:
+        parse_nav_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    chunks = iter_nav_chunks(fund_id, start_date, end_date, cursor)
+    return _export_response(chunks, NAV_EXPORT_COLUMNS, format, "fund_net_values")
+
+@app.get("/funds/list/export")
+def export_funds(format: str = "ndjson", fund_type: Optional[FundType] = None,
+                 status: Optional[FundStatus] = None, cursor: Optional[str] = None):
+    """流式导出基金列表，cursor为最后收到的基金ID"""
+    chunks = iter_fund_chunks(fund_type, status, cursor)
+    return _export_response(chunks, FUND_EXPORT_COLUMNS, format, "funds")
+
 # 基金绩效分析
 @app.get("/funds/{fund_id}/performance", response_model=FundPerformanceResponse)
 def get_fund_performance(fund_id: str, db: Session = Depends(get_db)):
@@ -228,16 +383,15 @@ def get_fund_performance(fund_id: str, db: Session = Depends(get_db)):
         FundNetValue.fund_id == fund_id
     ).order_by(FundNetValue.date.desc()).first()
     
-    # 计算年初至今增长率
+    # 计算年初至今增长率（从列式净值存储读取，不构造ORM对象）
     year_start = datetime(datetime.utcnow().year, 1, 1)
-    year_start_nav = db.query(FundNetValue).filter(
-        FundNetValue.fund_id == fund_id,
-        FundNetValue.date <= year_start
-    ).order_by(FundNetValue.date.desc()).first()
+    nav_store.ensure(db, fund_id)
+    year_start_nav = nav_store.value_at_or_before(fund_id, year_start)
     
     year_to_date_growth = None
-    if latest_nav and year_start_nav:
-        year_to_date_growth = ((latest_nav.net_value - year_start_nav.net_value) / year_start_nav.net_value) * 100
+    if latest_nav and year_start_nav is not None:
+        year_start_value = float(year_start_nav['net_value'])
+        year_to_date_growth = ((latest_nav.net_value - year_start_value) / year_start_value) * 100
     
     # 构建绩效响应
     performance = FundPerformanceResponse(
@@ -259,64 +413,86 @@ def get_fund_performance(fund_id: str, db: Session = Depends(get_db)):
     
     return performance
 
+@app.get("/funds/{fund_id}/analytics", response_model=FundAnalyticsResponse)
+def get_fund_analytics_endpoint(fund_id: str, as_of: Optional[date] = None, db: Session = Depends(get_db)):
+    """基金风险收益分析：年化收益、波动率、夏普/索提诺比率、最大回撤与滚动收益
+
+    按 (基金, 截止日期) 缓存，净值入库后失效
+    """
+    if not db.query(Fund.id).filter(Fund.id == fund_id).first():
+        raise HTTPException(status_code=404, detail="Fund not found")
+    analytics = get_fund_analytics(db, fund_id, as_of)
+    if analytics is None:
+        raise HTTPException(status_code=404, detail="No net value data found")
+    return analytics
+
+@app.post("/funds/analytics/batch")
+def run_fund_analytics_batch(background_tasks: BackgroundTasks, as_of: Optional[date] = None):
+    """在后台为全部存续基金计算并缓存分析结果（夜间任务也可直接运行 python -m fund_service.analytics）"""
+    background_tasks.add_task(_fund_analytics_batch_task, as_of)
+    return {"message": "Fund analytics batch started"}
+
+def _fund_analytics_batch_task(as_of: Optional[date]):
+    db = SessionLocal()
+    try:
+        print(f"Fund analytics batch finished: {batch_analytics(db, as_of)}")
+    except Exception as e:
+        print(f"Fund analytics batch error: {e}")
+    finally:
+        db.close()
+
+@app.get("/funds/correlation/matrix")
+def get_fund_correlation_matrix(fund_id: Optional[List[str]] = Query(None), include_covariance: bool = False,
+                                db: Session = Depends(get_db)):
+    """存续基金日收益率的相关系数矩阵（可选协方差），可按fund_id取子矩阵"""
+    correlation_store.ensure_fresh(db)
+    try:
+        return correlation_store.matrix(fund_id, include_covariance)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Funds not in correlation matrix: {e.args[0]}")
+
+@app.get("/funds/{fund_id}/correlated")
+def get_correlated_funds(fund_id: str, k: int = 10, order: str = "most", db: Session = Depends(get_db)):
+    """与某基金相关性最高（order=most）或最低（order=least）的k个基金"""
+    if order not in ("most", "least"):
+        raise HTTPException(status_code=400, detail="Invalid order. Valid orders are: most, least")
+    correlation_store.ensure_fresh(db)
+    try:
+        funds = correlation_store.top_correlated(fund_id, k, least=order == "least")
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Fund not in correlation matrix")
+    return {**correlation_store.summary(), "fund_id": fund_id, "order": order, "funds": funds}
+
+@app.post("/funds/correlation/rebuild")
+def rebuild_fund_correlation(db: Session = Depends(get_db)):
+    """立即从列式净值存储重建相关性矩阵"""
+    return correlation_store.rebuild(db)
+
 @app.get("/funds/performance/ranking")
 def get_fund_performance_ranking(period: str = "monthly", limit: int = 10, db: Session = Depends(get_db)):
-    """获取基金绩效排名"""
+    """获取基金绩效排名
+
+    从预计算排名表按(period, rank)读取前limit名；排名表在净值入库后标记过期，
+    由后台线程用单条窗口函数查询整体重建，读取始终返回最近一次物化的结果
+    """
     # 验证周期参数
-    valid_periods = ["daily", "weekly", "monthly", "quarterly", "yearly", "ytd"]
-    if period not in valid_periods:
-        raise HTTPException(status_code=400, detail=f"Invalid period. Valid periods are: {', '.join(valid_periods)}")
-    
-    # 获取所有活跃基金
-    active_funds = db.query(Fund).filter(Fund.status == FundStatus.ACTIVE).all()
-    
-    # 计算每个基金的绩效并排名
-    performance_list = []
-    
-    for fund in active_funds:
-        # 获取最新净值数据
-        latest_nav = db.query(FundNetValue).filter(
-            FundNetValue.fund_id == fund.id
-        ).order_by(FundNetValue.date.desc()).first()
-        
-        if latest_nav:
-            # 根据周期选择增长率
-            if period == "daily":
-                growth_rate = latest_nav.daily_growth_rate or 0
-            elif period == "weekly":
-                growth_rate = latest_nav.weekly_growth_rate or 0
-            elif period == "monthly":
-                growth_rate = latest_nav.monthly_growth_rate or 0
-            elif period == "quarterly":
-                growth_rate = latest_nav.quarterly_growth_rate or 0
-            elif period == "yearly":
-                growth_rate = latest_nav.yearly_growth_rate or 0
-            elif period == "ytd":
-                # 计算年初至今增长率
-                year_start = datetime(datetime.utcnow().year, 1, 1)
-                year_start_nav = db.query(FundNetValue).filter(
-                    FundNetValue.fund_id == fund.id,
-                    FundNetValue.date <= year_start
-                ).order_by(FundNetValue.date.desc()).first()
-                
-                if year_start_nav and year_start_nav.net_value > 0:
-                    growth_rate = ((latest_nav.net_value - year_start_nav.net_value) / year_start_nav.net_value) * 100
-                else:
-                    growth_rate = 0
-            
-            performance_list.append({
-                'fund_id': fund.id,
-                'fund_name': fund.name,
-                'fund_code': fund.code,
-                'growth_rate': growth_rate,
-                'latest_nav': fund.latest_nav
-            })
-    
-    # 按增长率降序排序
-    performance_list.sort(key=lambda x: x['growth_rate'], reverse=True)
-    
-    # 添加排名
-    for i, item in enumerate(performance_list[:limit]):
-        item['performance_rank'] = i + 1
-    
-    return performance_list[:limit]
\ No newline at end of file
+    if period not in RANKING_PERIODS:
+        raise HTTPException(status_code=400, detail=f"Invalid period. Valid periods are: {', '.join(RANKING_PERIODS)}")
+    
+    return ranking_store.top(db, period, limit)
+
+@app.post("/funds/performance/ranking/refresh")
+def refresh_fund_performance_ranking(db: Session = Depends(get_db)):
+    """立即重建全部周期的排名表"""
+    rankings = ranking_store.refresh(db)
+    if rankings is None:
+        raise HTTPException(status_code=409, detail="Ranking refresh already in progress")
+    return {"rankings": rankings}
+
+@app.on_event("startup")
+def start_ranking_refresher():
+    ranking_store.start()
+
+@app.on_event("shutdown")
+def stop_ranking_refresher():
+    ranking_store.stop()
\ No newline at end of file
@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 import re
 from textblob import TextBlob
 from common.cache import redis_client
+from config.config import config
 from fastapi import HTTPException, Depends
 
 # 爬虫相关函数
@@ -98,6 +99,20 @@ def process_news(news_item: News, db: Session):
     # 将处理后的新闻存入缓存
     cache_key = f"news:{news_item.id}"
     redis_client.set(cache_key, news_item.json(), ex=3600)  # 缓存1小时
+    
+    # 通知计算服务标记受影响的基金（增量重算），失败不影响新闻处理
+    try:
+        requests.post(
+            f"{config.microservices.CALCULATION_SERVICE_URL}/calculate/news_arrived",
+            json={
+                'news_id': news_item.id,
+                'keywords': keywords,
+                'categories': news_item.categories
+            },
+            timeout=5
+        )
+    except Exception as e:
+        print(f"Notify calculation service error: {e}")
 
 # 创建新闻函数
 def create_news(news: NewsCreate, db: Session):
@@ -194,8 +209,10 @@ def _crawl_news_task(source: str, crawl_type: str, db: Session):
         print(f"Crawl task error: {e}")
 
 @app.get("/news/latest")
-def get_latest_news(limit: int = 10, hours: int = 24, db: Session = Depends(get_db)):
-    """获取最新新闻"""
+def get_latest_news(limit: int = 10, hours: int = 24, offset: int = 0, db: Session = Depends(get_db)):
+    """获取最新新闻（支持offset分页拉取整个时间窗口）"""
     cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-    news = db.query(News).filter(News.published_at >= cutoff_time).order_by(News.published_at.desc()).limit(limit).all()
+    news = db.query(News).filter(News.published_at >= cutoff_time).order_by(
+        News.published_at.desc(), News.id
+    ).offset(offset).limit(limit).all()
     return news
\ No newline at end of file
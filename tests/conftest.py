@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.database import Base
+from fund_service.models import Fund, FundNetValue, FundPerformanceRanking
+from calculation_service.models import CalculationRun, CalculationPartition, CalculationLog, NewsImpact
+from news_service.models import News
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """临时SQLite文件库：每个会话独立连接，多个工作线程并发认领时由SQLite串行化写入"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'calculation.db'}",
+        connect_args={'check_same_thread': False, 'timeout': 10}
+    )
+    Base.metadata.create_all(engine, tables=[
+        Fund.__table__, FundNetValue.__table__, FundPerformanceRanking.__table__,
+        CalculationRun.__table__, CalculationPartition.__table__,
+        CalculationLog.__table__, NewsImpact.__table__, News.__table__
+    ])
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import pytest
+from datetime import datetime
+from common.cache import cache
+from calculation_service import backtest
+from calculation_service.keyword_index import FundKeywordIndex
+from fund_service.models import Fund, FundNetValue, FundStatus, FundType
+from news_service.models import News
+
+fakeredis = pytest.importorskip("fakeredis")
+
+@pytest.fixture
+def cold_index(monkeypatch):
+    """新进程中的关键词索引：尚未加载，词表为空，基金关键词只在Redis中"""
+    client = fakeredis.FakeRedis(decode_responses=True)
+    client.set("fund_keywords:f1", "green,solar")
+    client.set("fund_keywords:f2", "oil")
+    monkeypatch.setattr(cache, "client", client)
+    index = FundKeywordIndex()
+    monkeypatch.setattr(backtest, "fund_keyword_index", index)
+    return index
+
+@pytest.fixture
+def backtest_db(session_factory):
+    db = session_factory()
+    db.add_all([
+        Fund(id=fund_id, code=fund_id.upper(), name=fund_id, fund_type=FundType.ESG, status=FundStatus.ACTIVE)
+        for fund_id in ("f1", "f2")
+    ])
+    db.add_all([
+        FundNetValue(id=f"{fund_id}-start", fund_id=fund_id, date=datetime(2023, 12, 31),
+                     net_value=1.0, accumulated_net_value=1.0)
+        for fund_id in ("f1", "f2")
+    ])
+    db.add(FundNetValue(id="f1-day0", fund_id="f1", date=datetime(2024, 1, 1),
+                        net_value=1.0, accumulated_net_value=1.0))
+    db.add(News(id="n1", title="t", content="c", source="xinhua", url="http://example.com/n1",
+                published_at=datetime(2024, 1, 1, 12), keywords=["green", "solar"], sentiment_score=0.0))
+    db.commit()
+    yield db
+    db.close()
+    backtest.shutdown_pool()
+
+def _prepare(db):
+    return backtest.prepare_backtest(db, days=2, end_date=datetime(2024, 1, 3))
+
+def _run(db, partition_size=1):
+    events = list(backtest.stream_backtest(_prepare(db), partition_size=partition_size))
+    funds = sorted((event for event in events if event['type'] == 'fund'), key=lambda event: event['fund_id'])
+    summary = dict(events[-1])
+    summary.pop('elapsed_seconds')
+    return funds, summary
+
+def test_keyword_matched_news_moves_the_path_from_a_cold_index(backtest_db, cold_index):
+    prepared = _prepare(backtest_db)
+    assert cold_index.loaded
+    # 新闻关键词与基金关键词使用同一词表编码，不会被编为"未见"的负数ID
+    assert all(keyword_id >= 0 for keyword_id in prepared.news['keyword_ids'][0])
+    assert set(prepared.news['keyword_ids'][0]) == set(prepared.fund_keyword_ids[0])
+
+    paths = backtest.simulate_paths(prepared.news, prepared.fund_keyword_ids,
+                                    prepared.start_net_values, prepared.day_ends)
+    # 首日：情感0 -> 基础1.0；发布12小时 -> 时间权重1-12/168；新华社0.9；f1两个关键词重合 -> ×1.2
+    news_factor = 1.0 * (1 - 12 / 168) * 0.9
+    matched = 1.001 * news_factor * 1.2
+    unmatched = max(0.9, 1.001 * news_factor)
+    assert paths[0, 0] == pytest.approx(matched)
+    assert paths[0, 1] == pytest.approx(unmatched)
+    # 次日窗口内无新闻，影响系数为1
+    assert paths[1, 0] == pytest.approx(matched * 1.001)
+    assert paths[1, 1] == pytest.approx(unmatched * 1.001)
+
+def test_identical_runs_return_identical_paths_and_stats(backtest_db, cold_index):
+    assert _run(backtest_db) == _run(backtest_db, partition_size=2)
+
+def test_error_against_stored_nav_matches_hand_computed_value(backtest_db, cold_index):
+    funds, summary = _run(backtest_db)
+    stats = {event['fund_id']: event['statistics'] for event in funds}
+    # f1只有首日有已存储净值1.0
+    error = 1.001 * (1 - 12 / 168) * 0.9 * 1.2 - 1.0
+    assert stats['f1']['compared_days'] == 1
+    assert stats['f1']['mean_abs_error'] == pytest.approx(error)
+    assert stats['f1']['rmse'] == pytest.approx(error)
+    assert stats['f2']['compared_days'] == 0
+    assert stats['f2']['mean_abs_error'] is None
+    assert summary['mean_abs_error'] == pytest.approx(error)
+    assert summary['news_items'] == 1
\ No newline at end of file
@@ -0,0 +1,77 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from common.cache import cache
+from fund_service import correlation
+from fund_service.correlation import CorrelationStore
+from fund_service.models import Fund, FundStatus, FundType
+from fund_service.nav_store import NavStore
+
+START = datetime(2024, 1, 1)
+
+class _Publisher:
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, channel, data):
+        self.messages.append(data)
+
+    def get(self, key):
+        return None
+
+    def incr(self, key):
+        return 1
+
+@pytest.fixture
+def navs(session_factory, tmp_path, monkeypatch):
+    store = NavStore(str(tmp_path / "nav"))
+    monkeypatch.setattr(correlation, "nav_store", store)
+    monkeypatch.setattr(cache, "client", None)
+    db = session_factory()
+    for i in range(3):
+        db.add(Fund(id=f"f{i}", code=f"C{i}", name=f"Fund {i}", fund_type=FundType.ESG, status=FundStatus.ACTIVE))
+        store.append_many(f"f{i}", [(START + timedelta(days=day), 1.0 + 0.01 * ((day * (i + 1)) % 7), 1.0)
+                                    for day in range(10)])
+    db.commit()
+    db.close()
+    return store
+
+def _store(session_factory) -> CorrelationStore:
+    return CorrelationStore(window=20, min_observations=3, rebuild_interval=100, session_factory=session_factory)
+
+def test_peers_apply_broadcast_rows_incrementally(navs, session_factory, monkeypatch):
+    db = session_factory()
+    writer, peer = _store(session_factory), _store(session_factory)
+    writer.rebuild(db)
+    peer.rebuild(db)
+    db.close()
+
+    publisher = _Publisher()
+    monkeypatch.setattr(cache, "client", publisher)
+    day = START + timedelta(days=10)
+    writer.apply_rows([{'fund_id': "f0", 'date': day, 'net_value': 1.2},
+                       {'fund_id': "f1", 'date': day, 'net_value': 0.9}])
+    assert len(publisher.messages) == 1
+
+    peer._on_rows_message(publisher.messages[0])
+    writer._on_rows_message(publisher.messages[0])
+    assert not peer._stale
+    assert peer.summary() == writer.summary()
+    assert peer.matrix() == writer.matrix()
+
+def test_stale_store_rebuilds_in_background_and_serves_the_last_state(navs, session_factory):
+    store = _store(session_factory)
+    db = session_factory()
+    store.ensure_fresh(db)
+    assert store.summary()['end_date'] == "2024-01-10"
+
+    for i in range(3):
+        navs.append(f"f{i}", START + timedelta(days=10), 1.05, 1.0)
+    store.mark_stale()
+    store.ensure_fresh(db)
+    deadline = time.monotonic() + 5
+    while store.summary()['end_date'] != "2024-01-11" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.summary()['end_date'] == "2024-01-11"
+    assert not store._stale
+    db.close()
\ No newline at end of file
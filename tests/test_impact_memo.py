@@ -0,0 +1,58 @@
+from calculation_service.impact import ImpactMemo, impact_memo_key
+from calculation_service.keyword_index import FundKeywordIndex
+
+NEWS = {'id': "n1", 'sentiment_score': 0.4, 'source': "xinhua",
+        'published_at': "2024-01-01T00:00:00", 'keywords': ["green"]}
+
+class Counting:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return 1.0 + self.calls
+
+def test_hit_within_one_decay_bucket_and_miss_in_the_next():
+    memo = ImpactMemo(max_entries=10, bucket_seconds=300)
+    compute = Counting()
+    for now in (600.0, 750.0, 899.0):
+        memo.get_or_compute(impact_memo_key(NEWS, "f1", memo.decay_bucket(now), 1), compute)
+    assert compute.calls == 1
+    memo.get_or_compute(impact_memo_key(NEWS, "f1", memo.decay_bucket(900.0), 1), compute)
+    assert compute.calls == 2
+    assert memo.stats()['hits'] == 2
+    assert memo.stats()['misses'] == 2
+
+def test_miss_after_sentiment_or_keyword_change():
+    memo = ImpactMemo(max_entries=10, bucket_seconds=300)
+    index = FundKeywordIndex()
+    index.load({"f1": ["green"]})
+    compute = Counting()
+
+    def lookup(news):
+        return memo.get_or_compute(impact_memo_key(news, "f1", 2, index.version), compute)
+
+    first = lookup(NEWS)
+    assert lookup(dict(NEWS)) == first
+    # 新闻被重新处理，情感得分变化
+    assert lookup(dict(NEWS, sentiment_score=-0.2)) != first
+    # 新闻关键词变化
+    lookup(dict(NEWS, keywords=["green", "solar"]))
+    assert compute.calls == 3
+    # 基金关键词变化使索引版本递增
+    index.update_fund("f1", ["green", "solar"])
+    lookup(NEWS)
+    assert compute.calls == 4
+
+def test_eviction_at_max_entries():
+    memo = ImpactMemo(max_entries=2, bucket_seconds=300)
+    compute = Counting()
+    for fund_id in ("f1", "f2", "f3"):
+        memo.get_or_compute(impact_memo_key(NEWS, fund_id, 0, 1), compute)
+    assert memo.stats()['size'] == 2
+    assert memo.stats()['evictions'] == 1
+    # 最久未使用的f1被淘汰，重新计算
+    memo.get_or_compute(impact_memo_key(NEWS, "f1", 0, 1), compute)
+    assert compute.calls == 4
+    memo.get_or_compute(impact_memo_key(NEWS, "f3", 0, 1), compute)
+    assert compute.calls == 4
\ No newline at end of file
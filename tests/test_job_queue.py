@@ -0,0 +1,100 @@
+import subprocess
+import sys
+import time
+from datetime import datetime
+from calculation_service.job_queue import InProcessJobQueue, NavCalculationWorker, NavJobCoordinator
+from calculation_service.run_context import CalculationRunContext, NewsSnapshot
+
+class _Session:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def _context() -> CalculationRunContext:
+    return CalculationRunContext(NewsSnapshot([], datetime(2024, 1, 1)))
+
+def _worker(queue, calculate, **options) -> NavCalculationWorker:
+    options.setdefault('max_attempts', 3)
+    options.setdefault('visibility_timeout', 60)
+    return NavCalculationWorker(queue, calculate, session_factory=_Session, **options)
+
+def _drain(worker):
+    while worker.process_one(block_ms=10):
+        pass
+
+def test_jobs_are_split_into_chunks_sharing_one_snapshot():
+    queue = InProcessJobQueue()
+    run_context = _context()
+    seen = []
+    job_id = NavJobCoordinator(queue, chunk_size=2).submit(["a", "b", "c", "d", "e"], run_context)
+    _drain(_worker(queue, lambda fund_ids, db, context: seen.append((fund_ids, context))))
+
+    assert [fund_ids for fund_ids, _ in seen] == [["a", "b"], ["c", "d"], ["e"]]
+    assert all(context is run_context for _, context in seen)
+    status = NavJobCoordinator(queue).status(job_id)
+    assert status['finished']
+    assert status['completed_chunks'] == 3
+    assert status['completed_funds'] == 5
+    assert status['news_snapshot_id'] == run_context.snapshot.snapshot_id
+
+def test_failed_chunk_is_retried_then_recorded_as_failed():
+    queue = InProcessJobQueue()
+    attempts = []
+
+    def calculate(fund_ids, db, context):
+        attempts.append(list(fund_ids))
+        if "bad" in fund_ids:
+            raise RuntimeError("boom")
+
+    job_id = NavJobCoordinator(queue, chunk_size=1).submit(["ok", "bad"], _context())
+    _drain(_worker(queue, calculate, max_attempts=3))
+
+    assert attempts.count(["bad"]) == 3
+    status = NavJobCoordinator(queue).status(job_id)
+    assert status['finished']
+    assert status['completed_chunks'] == 1
+    assert status['failed_chunks'] == 1
+
+def test_unacked_chunk_is_reclaimed_after_visibility_timeout():
+    queue = InProcessJobQueue()
+    job_id = NavJobCoordinator(queue, chunk_size=10).submit(["a", "b"], _context())
+
+    # 消费者取走消息后崩溃，未确认
+    delivered = queue.get("crashed", block_ms=10)
+    assert delivered is not None
+    assert queue.reclaim("other", min_idle_ms=60000) is None
+
+    time.sleep(0.02)
+    calculated = []
+    worker = _worker(queue, lambda fund_ids, db, context: calculated.append(fund_ids), visibility_timeout=0.01)
+    assert worker.process_one(block_ms=10)
+    assert calculated == [["a", "b"]]
+    assert NavJobCoordinator(queue).status(job_id)['finished']
+    assert not worker.process_one(block_ms=10)
+
+def test_idle_queue_returns_no_work():
+    assert not _worker(InProcessJobQueue(), lambda fund_ids, db, context: None).process_one(block_ms=10)
+
+def test_reprocessed_chunk_is_counted_once():
+    queue = InProcessJobQueue()
+    job_id = NavJobCoordinator(queue, chunk_size=10).submit(["a", "b"], _context())
+
+    # 消费者算完块但在确认前崩溃，块被重新认领后再次处理
+    message_id, message = queue.get("crashed", block_ms=10)
+    assert queue.record_chunk(job_id, message['chunk'], "done", 2, 0.1)
+    time.sleep(0.02)
+    worker = _worker(queue, lambda fund_ids, db, context: None, visibility_timeout=0.01)
+    assert worker.process_one(block_ms=10)
+
+    status = NavJobCoordinator(queue).status(job_id)
+    assert status['completed_chunks'] == 1
+    assert status['completed_funds'] == 2
+    assert not queue.record_chunk(job_id, message['chunk'], "failed", 2, 0.1)
+
+def test_worker_entry_point_does_not_import_the_api_module():
+    # 独立工作进程只依赖批量计算模块，不导入FastAPI服务模块
+    code = ("import sys; from calculation_service.batch import run_batch_calculation; "
+            "assert 'calculation_service.service' not in sys.modules")
+    subprocess.run([sys.executable, "-c", code], check=True, timeout=60)
\ No newline at end of file
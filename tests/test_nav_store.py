@@ -0,0 +1,45 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from fund_service.models import FundNetValue
+from fund_service.nav_store import NavStore
+
+def test_rebuild_does_not_create_files_for_funds_without_rows(session_factory, tmp_path):
+    db = session_factory()
+    db.add(FundNetValue(id="nv1", fund_id="f1", date=datetime(2024, 1, 2), net_value=1.1,
+                        accumulated_net_value=1.1))
+    db.commit()
+    store = NavStore(str(tmp_path / "nav"))
+    assert store.rebuild_from_table(db, ["f1", "unknown"]) == 1
+    assert store.has_fund("f1")
+    assert not store.has_fund("unknown")
+    assert len(store.ensure(db, "unknown")) == 0
+    assert not store.has_fund("unknown")
+    db.close()
+
+def test_same_size_rewrite_is_remapped(tmp_path):
+    store = NavStore(str(tmp_path))
+    store.append_many("f1", [(datetime(2024, 1, 2), 1.0, 1.0), (datetime(2024, 1, 3), 1.1, 1.1)])
+    assert store.series("f1")['net_value'].tolist() == [1.0, 1.1]
+
+    # 另一个进程覆盖写入：文件大小不变，只有inode和修改时间变化
+    other = NavStore(str(tmp_path))
+    other.append("f1", datetime(2024, 1, 2), 0.9, 0.9)
+    assert store.series("f1")['net_value'].tolist() == [0.9, 1.1]
+
+def test_concurrent_writers_do_not_lose_records(tmp_path):
+    stores = [NavStore(str(tmp_path)) for _ in range(4)]
+    start = datetime(2024, 1, 1)
+
+    def write(store, offset):
+        # 交错的日期使部分写入走追加、部分走合并重写
+        for day in range(offset, 80, 4):
+            store.append("f1", start + timedelta(days=day), float(day), float(day))
+
+    threads = [threading.Thread(target=write, args=(store, i)) for i, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert NavStore(str(tmp_path)).series("f1")['net_value'].tolist() == [float(day) for day in range(80)]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
\ No newline at end of file
@@ -0,0 +1,114 @@
+import asyncio
+import time
+import httpx
+import pytest
+from calculation_service.client import NewsServiceClient, ServiceCallError
+
+def _client(handler, **options) -> NewsServiceClient:
+    options.setdefault('timeout', 2.0)
+    options.setdefault('hedge_delay', 0)
+    return NewsServiceClient(base_url="http://news.test", transport=httpx.MockTransport(handler), **options)
+
+@pytest.fixture
+def clients():
+    created = []
+    yield created
+    for client in created:
+        client.close()
+
+def test_hedged_request_returns_first_success(clients):
+    calls = []
+
+    async def handler(request):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            # 首个请求很慢，触发对冲
+            await asyncio.sleep(1.0)
+            return httpx.Response(200, json={'id': 'slow'})
+        return httpx.Response(200, json={'id': 'hedged'})
+
+    client = _client(handler, hedge_delay=0.05)
+    clients.append(client)
+    started = time.monotonic()
+    assert client.call(client.get_news('n1')) == {'id': 'hedged'}
+    assert len(calls) == 2
+    assert time.monotonic() - started < 0.5
+
+def test_fast_primary_is_not_hedged(clients):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={'id': 'n1'})
+
+    client = _client(handler, hedge_delay=0.2)
+    clients.append(client)
+    assert client.call(client.get_news('n1')) == {'id': 'n1'}
+    assert len(calls) == 1
+
+def test_call_deadline_raises_service_call_error(clients):
+    async def handler(request):
+        await asyncio.sleep(1.0)
+        return httpx.Response(200, json={})
+
+    client = _client(handler, timeout=0.1)
+    clients.append(client)
+    with pytest.raises(ServiceCallError):
+        client.call(client.get_news('n1'))
+
+def test_news_window_overall_deadline_spans_pages(clients):
+    pages = []
+
+    async def handler(request):
+        # 每页都在单次超时之内返回满页，只有跨页的总截止时间能终止拉取
+        pages.append(int(request.url.params['offset']))
+        await asyncio.sleep(0.05)
+        offset = int(request.url.params['offset'])
+        return httpx.Response(200, json=[{'id': f"n{offset}"}])
+
+    client = _client(handler, timeout=1.0)
+    clients.append(client)
+    started = time.monotonic()
+    with pytest.raises(ServiceCallError):
+        client.call(client.get_news_window(page_size=1, deadline=0.3))
+    assert time.monotonic() - started < 0.6
+    assert 2 <= len(pages) <= 8
+
+def test_news_window_dedupes_items_shifted_across_pages(clients):
+    # 第二页拉取前插入了新新闻，offset分页使n2再次出现
+    pages = {
+        0: [{'id': 'n1'}, {'id': 'n2'}],
+        2: [{'id': 'n2'}, {'id': 'n3'}],
+        4: [{'id': 'n4'}]
+    }
+
+    def handler(request):
+        return httpx.Response(200, json=pages[int(request.url.params['offset'])])
+
+    client = _client(handler)
+    clients.append(client)
+    news = client.call(client.get_news_window(page_size=2))
+    assert [item['id'] for item in news] == ['n1', 'n2', 'n3', 'n4']
+
+def test_semaphore_limits_concurrent_requests(clients):
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return httpx.Response(200, json={'id': request.url.path.rsplit('/', 1)[-1]})
+
+    client = _client(handler, max_concurrency=2)
+    clients.append(client)
+    futures = [client.submit(client.get_news(f"n{i}")) for i in range(8)]
+    assert [future.result(timeout=5)['id'] for future in futures] == [f"n{i}" for i in range(8)]
+    assert peak == 2
+
+def test_missing_news_returns_none(clients):
+    client = _client(lambda request: httpx.Response(404))
+    clients.append(client)
+    assert client.call(client.get_news('missing')) is None
\ No newline at end of file
@@ -0,0 +1,23 @@
+import os
+import pytest
+from user_service.password_pool import PasswordHasher, PasswordPoolUnavailable
+
+def _crash():
+    os._exit(1)
+
+def _echo(value):
+    return value
+
+def test_broken_pool_is_reported_as_unavailable_and_rebuilt():
+    hasher = PasswordHasher(workers=1, max_pending=4, timeout=30)
+    try:
+        broken_pool = hasher._get_pool()
+        with pytest.raises(PasswordPoolUnavailable):
+            hasher._result(*hasher._submit(_crash))
+        assert hasher.stats()['pending'] == 0
+        assert hasher._pool is not broken_pool
+
+        # 下次提交时重建进程池
+        assert hasher._result(*hasher._submit(_echo, "ok")) == "ok"
+    finally:
+        hasher.shutdown()
\ No newline at end of file
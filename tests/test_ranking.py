@@ -0,0 +1,53 @@
+import time
+from datetime import datetime
+import pytest
+from common.cache import cache
+from fund_service.models import Fund, FundNetValue, FundStatus, FundType
+from fund_service.ranking import RankingStore
+
+@pytest.fixture(autouse=True)
+def _no_redis(monkeypatch):
+    monkeypatch.setattr(cache, "client", None)
+
+def _add_funds(session_factory, growth_rates):
+    db = session_factory()
+    for i, growth_rate in enumerate(growth_rates):
+        fund_id = f"f{i}"
+        db.add(Fund(id=fund_id, code=f"C{i}", name=f"Fund {i}", fund_type=FundType.ESG,
+                    status=FundStatus.ACTIVE, latest_nav=1.0))
+        db.add(FundNetValue(id=f"nv{i}", fund_id=fund_id, date=datetime(2024, 1, 2), net_value=1.0,
+                            accumulated_net_value=1.0, monthly_growth_rate=growth_rate))
+    db.commit()
+    db.close()
+
+def _top(store, session_factory, limit=10):
+    db = session_factory()
+    try:
+        return [row['fund_id'] for row in store.top(db, "monthly", limit)]
+    finally:
+        db.close()
+
+def test_top_serves_the_materialized_table_without_refreshing(session_factory):
+    _add_funds(session_factory, [1.0, 3.0, 2.0])
+    store = RankingStore(session_factory, refresh_interval=60)
+    assert store.is_stale()
+    assert _top(store, session_factory) == []
+    assert store.is_stale()
+
+    assert store.refresh_if_stale()['monthly'] == 3
+    assert _top(store, session_factory) == ["f1", "f2", "f0"]
+    assert store.refresh_if_stale() is None
+
+def test_background_refresher_rebuilds_after_mark_stale(session_factory):
+    _add_funds(session_factory, [1.0, 3.0])
+    store = RankingStore(session_factory, refresh_interval=60)
+    store.start()
+    try:
+        store.mark_stale()
+        deadline = time.monotonic() + 5
+        while not _top(store, session_factory) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert _top(store, session_factory, limit=1) == ["f1"]
+        assert not store.is_stale()
+    finally:
+        store.stop()
\ No newline at end of file
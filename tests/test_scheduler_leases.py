@@ -0,0 +1,150 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from calculation_service.models import CalculationPartition, CalculationRun
+from calculation_service.run_context import CalculationRunContext, NewsSnapshot
+from calculation_service.scheduler import CalculationScheduler
+from fund_service.models import Fund, FundStatus, FundType
+
+def _context() -> CalculationRunContext:
+    return CalculationRunContext(NewsSnapshot([], datetime(2024, 1, 1)))
+
+def _scheduler(session_factory, calculate=None, owner="a", **options) -> CalculationScheduler:
+    options.setdefault('workers', 1)
+    options.setdefault('partition_size', 2)
+    options.setdefault('lease_seconds', 60)
+    return CalculationScheduler(
+        calculate or (lambda fund_ids, db, run_context: None),
+        session_factory=session_factory,
+        interval=3600,
+        context_factory=_context,
+        owner=owner,
+        **options
+    )
+
+def _add_funds(session_factory, count: int):
+    db = session_factory()
+    db.add_all([
+        Fund(id=f"f{i:03d}", code=f"C{i:03d}", name=f"Fund {i}",
+             fund_type=FundType.ESG, status=FundStatus.ACTIVE)
+        for i in range(count)
+    ])
+    db.commit()
+    db.close()
+
+def test_start_run_partitions_active_funds(session_factory):
+    _add_funds(session_factory, 5)
+    db = session_factory()
+    run, _ = _scheduler(session_factory).start_run(db)
+    partitions = db.query(CalculationPartition).order_by(CalculationPartition.partition_index).all()
+    assert run.partition_count == 3
+    assert [partition.fund_ids for partition in partitions] == [["f000", "f001"], ["f002", "f003"], ["f004"]]
+    db.close()
+
+def test_second_run_is_rejected_while_one_is_active(session_factory):
+    _add_funds(session_factory, 2)
+    db = session_factory()
+    assert _scheduler(session_factory, owner="a").start_run(db) is not None
+    assert _scheduler(session_factory, owner="b").start_run(db) is None
+    db.close()
+
+def test_held_lease_cannot_be_claimed_until_it_expires(session_factory):
+    _add_funds(session_factory, 2)
+    db = session_factory()
+    first = _scheduler(session_factory, owner="a")
+    second = _scheduler(session_factory, owner="b")
+    run, _ = first.start_run(db)
+
+    partition = first.claim_partition(db, run.id)
+    assert partition.owner == "a"
+    assert second.claim_partition(db, run.id) is None
+
+    # 持有者崩溃：租约过期后分区可被其他工作者重新认领
+    partition.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    reclaimed = second.claim_partition(db, run.id)
+    assert reclaimed.id == partition.id
+    assert reclaimed.owner == "b"
+    assert reclaimed.attempts == 2
+    db.close()
+
+def test_former_owner_cannot_complete_a_reclaimed_partition(session_factory):
+    _add_funds(session_factory, 2)
+    db = session_factory()
+    first = _scheduler(session_factory, owner="a")
+    second = _scheduler(session_factory, owner="b")
+    run, _ = first.start_run(db)
+    partition = first.claim_partition(db, run.id)
+    partition.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    second.claim_partition(db, run.id)
+
+    first._complete_partition(db, partition.id, "done", 1.0)
+    db.expire_all()
+    assert db.get(CalculationPartition, partition.id).status == "running"
+    second._complete_partition(db, partition.id, "done", 1.0)
+    db.expire_all()
+    assert db.get(CalculationPartition, partition.id).status == "done"
+    db.close()
+
+def test_concurrent_claims_never_share_a_partition(session_factory):
+    _add_funds(session_factory, 8)
+    db = session_factory()
+    run_id = _scheduler(session_factory).start_run(db)[0].id
+    db.close()
+    claimed = []
+    lock = threading.Lock()
+
+    def claim(owner):
+        scheduler = _scheduler(session_factory, owner=owner, workers=4)
+        session = session_factory()
+        try:
+            while True:
+                partition = scheduler.claim_partition(session, run_id)
+                if partition is None:
+                    return
+                with lock:
+                    claimed.append(partition.id)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=claim, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(claimed) == len(set(claimed)) == 4
+
+def test_run_once_records_failed_partitions(session_factory):
+    _add_funds(session_factory, 4)
+
+    def calculate(fund_ids, db, run_context):
+        if "f002" in fund_ids:
+            raise RuntimeError("boom")
+
+    summary = _scheduler(session_factory, calculate).run_once()
+    assert summary['status'] == "partial"
+    assert summary['failed_partitions'] == 1
+    db = session_factory()
+    run = db.get(CalculationRun, summary['run_id'])
+    assert run.active_slot is None
+    db.close()
+
+def test_lease_is_renewed_while_a_long_partition_runs(session_factory):
+    _add_funds(session_factory, 2)
+    claims = []
+
+    def calculate(fund_ids, db, run_context):
+        # 计算耗时超过租约时长，期间其他工作者不能接管分区
+        time.sleep(1.5)
+        session = session_factory()
+        try:
+            run_id = session.query(CalculationRun).one().id
+            claims.append(_scheduler(session_factory, owner="b", lease_seconds=1).claim_partition(session, run_id))
+        finally:
+            session.close()
+        time.sleep(0.5)
+
+    summary = _scheduler(session_factory, calculate, lease_seconds=1).run_once()
+    assert claims == [None]
+    assert summary['status'] == "success"
\ No newline at end of file
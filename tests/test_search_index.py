@@ -0,0 +1,46 @@
+import json
+import pytest
+from common.cache import cache
+from fund_service.search_index import FundSearchIndex
+
+@pytest.fixture(autouse=True)
+def _no_redis(monkeypatch):
+    monkeypatch.setattr(cache, "client", None)
+
+def _index(navs) -> FundSearchIndex:
+    index = FundSearchIndex()
+    for i, nav in enumerate(navs):
+        index._upsert(f"f{i}", f"Fund {i}", f"C{i}", "esg", "active", "medium", nav)
+    index.loaded = True
+    return index
+
+def test_latest_nav_cursor_pages_through_all_funds():
+    index = _index([1.5, 1.1, 1.3, 1.1, 1.2])
+    pages, cursor = [], None
+    while True:
+        fund_ids, cursor = index.search(sort_by='latest_nav', cursor=cursor, limit=2)
+        pages.append(fund_ids)
+        if cursor is None:
+            break
+        assert cursor.startswith("1.")
+    assert pages == [["f1", "f3"], ["f4", "f2"], ["f0"]]
+
+def test_concurrent_version_bump_forces_reload():
+    index = _index([1.0])
+    index._remote_version = "4"
+    index._last_refresh_check = 100.0
+    index._advance_remote_version(5)
+    assert index._remote_version == "5"
+    # 其他进程在此期间递增过版本号：不采纳，下次检查立即重新加载
+    index._advance_remote_version(7)
+    assert index._remote_version == "5"
+    assert index._last_refresh_check == 0.0
+
+def test_nav_deltas_from_other_processes_update_the_sort_column():
+    index = _index([1.0, 2.0])
+    index._on_nav_message(json.dumps({'origin': "other", 'navs': {"f0": 3.0}}))
+    assert index.search(sort_by='latest_nav')[0] == ["f1", "f0"]
+    index._on_nav_message(json.dumps({'origin': index.origin, 'navs': {"f0": 0.5}}))
+    assert index.search(sort_by='latest_nav')[0] == ["f1", "f0"]
+    index.update_navs({"f1": 4.0})
+    assert index.search(sort_by='latest_nav')[0] == ["f0", "f1"]
\ No newline at end of file
@@ -0,0 +1,45 @@
+from calculation_service.batch import _record_batch_summary, batch_summary
+from common.monitoring import StageSamples, StageTimer, stage_samples
+
+def test_stage_percentiles_aggregate_across_calculations():
+    samples = StageSamples(window=100)
+    for elapsed in range(1, 101):
+        samples.add("batch", "compute", elapsed / 100)
+    quantiles = samples.quantiles("batch", "compute")
+    assert quantiles['window_samples'] == 100
+    assert quantiles['p50_seconds'] == 0.5
+    assert quantiles['p95_seconds'] == 0.95
+    assert samples.quantiles("batch", "missing")['p95_seconds'] is None
+
+def test_timer_summary_reports_window_percentiles():
+    for _ in range(3):
+        timer = StageTimer("stage-summary-test")
+        with timer.stage("compute"):
+            pass
+        summary = timer.finish(10)
+    stage = summary['stages']['compute']
+    assert stage['count'] == 1
+    assert stage['window_samples'] == 3
+    assert stage_samples.quantiles("stage-summary-test", "compute")['window_samples'] == 3
+
+def _summary(fund_count, seconds):
+    return {
+        'mode': "batch", 'fund_count': fund_count, 'total_seconds': seconds, 'funds_per_second': 0.0,
+        'stages': {'compute': {'count': 1, 'total_seconds': seconds, 'window_samples': 1,
+                               'p50_seconds': seconds, 'p95_seconds': seconds}}
+    }
+
+def test_summaries_are_kept_per_run_and_merged_across_partitions():
+    _record_batch_summary("run-a", _summary(100, 1.0))
+    _record_batch_summary("run-b", _summary(50, 0.5))
+    _record_batch_summary("run-a", _summary(100, 1.0))
+
+    run_a = batch_summary("run-a")
+    assert run_a['batches'] == 2
+    assert run_a['fund_count'] == 200
+    assert run_a['funds_per_second'] == 100.0
+    assert run_a['stages']['compute']['count'] == 2
+    assert batch_summary("run-b")['fund_count'] == 50
+    # 默认返回最近更新的运行
+    assert batch_summary()['run_id'] == "run-a"
+    assert batch_summary("missing") is None
\ No newline at end of file
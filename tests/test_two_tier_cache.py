@@ -0,0 +1,32 @@
+import pytest
+from common.cache import RedisCache, TwoTierCache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+@pytest.fixture
+def two_tier():
+    redis_cache = RedisCache()
+    redis_cache.client = fakeredis.FakeRedis(decode_responses=True)
+    cache = TwoTierCache("test:invalidate", redis_cache=redis_cache)
+    # 测试中不启动订阅线程
+    cache._listener = object()
+    return cache
+
+def test_stale_load_does_not_overwrite_a_concurrent_set(two_tier):
+    def loader():
+        two_tier.set("fund:1", {"nav": 2.0})
+        return {"nav": 1.0}
+
+    two_tier.get("fund:1", loader)
+    assert two_tier.redis.get("fund:1") == {"nav": 2.0}
+
+def test_stale_load_is_not_written_back_after_an_invalidation(two_tier):
+    def loader():
+        two_tier.invalidate("fund:1")
+        return {"nav": 1.0}
+
+    two_tier.get("fund:1", loader)
+    assert two_tier.redis.get("fund:1") is None
+    assert two_tier._local_get("fund:1") is None
+    assert two_tier.get("fund:1", lambda: {"nav": 2.0}) == {"nav": 2.0}
+    assert two_tier.redis.get("fund:1") == {"nav": 2.0}
\ No newline at end of file
@@ -0,0 +1,56 @@
+import threading
+import time
+from calculation_service.models import CalculationLog
+from calculation_service.writer import BulkWriter
+
+def _rows(session_factory) -> int:
+    db = session_factory()
+    try:
+        return db.query(CalculationLog).count()
+    finally:
+        db.close()
+
+def test_poison_row_is_isolated_and_dead_lettered(session_factory):
+    writer = BulkWriter(session_factory, max_batch_size=100, flush_interval=60, max_retries=2)
+    for i in range(3):
+        writer.add_calculation_log(f"f{i}", result=1.0)
+    # fund_id非空约束使整批写入失败
+    writer.add_calculation_log(None, result=1.0)
+
+    assert writer.flush() == 0
+    assert writer.pending_count() == 4
+    # 重试时逐行写入：正常行落库，无法写入的行达到重试上限后转入死信
+    assert writer.flush() == 3
+    assert writer.pending_count() == 0
+    assert writer.dead_letters == 1
+    assert _rows(session_factory) == 3
+    assert writer.flush() == 0
+
+def test_buffer_is_bounded(session_factory):
+    writer = BulkWriter(session_factory, max_batch_size=100, flush_interval=60, max_buffer_size=2)
+    for i in range(3):
+        writer.add_calculation_log(f"f{i}")
+    writer.add_news_impact("n1", "f0", 1.0)
+    assert writer.pending_count() == 2
+    assert writer.dead_letters == 2
+
+def test_full_batch_is_flushed_on_the_writer_thread(session_factory):
+    flushing_threads = []
+
+    def tracking_factory():
+        flushing_threads.append(threading.current_thread().name)
+        return session_factory()
+
+    writer = BulkWriter(tracking_factory, max_batch_size=2, flush_interval=60)
+    writer.start()
+    try:
+        writer.add_calculation_log("f0")
+        writer.add_calculation_log("f1")
+        deadline = time.monotonic() + 5
+        while writer.pending_count() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.pending_count() == 0
+        assert flushing_threads == ["calculation-bulk-writer"]
+    finally:
+        writer.close()
+    assert _rows(session_factory) == 2
\ No newline at end of file
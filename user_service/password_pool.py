@@ -0,0 +1,171 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from config.config import config
+
+logger = logging.getLogger("user_service")
+
+class PasswordPoolBusy(Exception):
+    """等待中的哈希任务已达上限"""
+
+class PasswordPoolTimeout(Exception):
+    """哈希任务超时"""
+
+class PasswordPoolUnavailable(Exception):
+    """进程池损坏（工作进程异常退出），已丢弃并将在下次提交时重建"""
+
+def build_crypt_context(rounds: int, min_rounds: int, max_rounds: int) -> CryptContext:
+    """bcrypt成本策略：新哈希使用rounds，已存哈希成本不在[min_rounds, max_rounds]内时需要重新哈希"""
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=min_rounds,
+        bcrypt__max_rounds=max_rounds
+    )
+
+def _policy() -> Tuple[int, int, int]:
+    return (
+        config.user.PASSWORD_HASH_ROUNDS,
+        config.user.PASSWORD_HASH_MIN_ROUNDS,
+        config.user.PASSWORD_HASH_MAX_ROUNDS
+    )
+
+# 工作进程内的上下文，由进程池initializer创建
+_worker_context: Optional[CryptContext] = None
+
+def _init_worker(rounds: int, min_rounds: int, max_rounds: int):
+    global _worker_context
+    _worker_context = build_crypt_context(rounds, min_rounds, max_rounds)
+
+def _hash(password: str) -> str:
+    return _worker_context.hash(password)
+
+def _verify_and_update(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    """返回 (是否匹配, 需要升级时的新哈希)"""
+    return _worker_context.verify_and_update(password, password_hash)
+
+class PasswordHasher:
+    """在独立进程池中执行bcrypt哈希与校验，不占用请求工作线程的CPU
+
+    等待中（排队+执行）的任务数达到max_pending时立即抛出PasswordPoolBusy，
+    由调用方返回429，避免登录突发时请求在队列中堆积；workers为0时在调用线程内执行
+    （如无法创建子进程的Serverless环境），仍受max_pending限制。
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        self.workers = config.user.PASSWORD_HASH_WORKERS if workers is None else workers
+        self.max_pending = max_pending or config.user.PASSWORD_HASH_MAX_PENDING
+        self.timeout = timeout or config.user.PASSWORD_HASH_TIMEOUT
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn：避免fork出带有已启动线程（Redis订阅等）的进程
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=_policy()
+                )
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordPoolBusy()
+            self._pending += 1
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn, *args) -> Future:
+        """提交任务；超过等待上限时抛出PasswordPoolBusy"""
+        return self._submit(fn, *args)[1]
+
+    def _submit(self, fn, *args) -> Tuple[Optional[ProcessPoolExecutor], Future]:
+        """提交任务，返回 (执行任务的进程池, Future)；在调用线程内执行时进程池为None"""
+        self._acquire()
+        if self.workers <= 0:
+            future = Future()
+            try:
+                if _worker_context is None:
+                    _init_worker(*_policy())
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._release()
+            return None, future
+
+        try:
+            pool = self._get_pool()
+            try:
+                future = pool.submit(fn, *args)
+            except BrokenProcessPool:
+                # 工作进程异常退出后重建进程池
+                logger.error("密码哈希进程池已损坏，正在重建")
+                self._reset_pool(pool)
+                pool = self._get_pool()
+                future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            self._release()
+            raise PasswordPoolUnavailable()
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return pool, future
+
+    def _result(self, pool: Optional[ProcessPoolExecutor], future: Future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise PasswordPoolTimeout()
+        except BrokenProcessPool:
+            # 执行中工作进程异常退出：丢弃该进程池，下次提交时重建
+            logger.error("密码哈希进程池已损坏，已丢弃")
+            self._reset_pool(pool)
+            raise PasswordPoolUnavailable()
+
+    def hash(self, password: str) -> str:
+        return self._result(*self._submit(_hash, password))
+
+    def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        return self._result(*self._submit(_verify_and_update, password, password_hash))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'pending': self._pending,
+                'max_pending': self.max_pending,
+                'rejected': self.rejected
+            }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+# 用户服务共享的密码哈希器
+password_hasher = PasswordHasher()
\ No newline at end of file
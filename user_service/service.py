@@ -17,11 +17,11 @@ from datetime import datetime, timedelta
 import secrets
 import os
 from starlette import status
-# 添加passlib和bcrypt用于密码哈希
-from passlib.context import CryptContext
+# bcrypt密码哈希在独立进程池中执行
+from .password_pool import password_hasher, PasswordPoolBusy, PasswordPoolTimeout, PasswordPoolUnavailable
 import re
 import logging
-from typing import Tuple
+from typing import Optional, Tuple
 
 # 导入配置
 from config.config import config
@@ -29,8 +29,28 @@ from config.config import config
 # 配置日志
 logger = logging.getLogger("user_service")
 
-# 创建密码上下文对象，使用bcrypt算法
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=14)  # 增加rounds参数增强安全性
+# 密码哈希/校验：提交到进程池，排队已满时快速返回429
+def _run_password_task(task, *args):
+    try:
+        return task(*args)
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many concurrent password operations, please retry later",
+            headers={"Retry-After": "1"}
+        )
+    except PasswordPoolTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password operation timed out, please retry later",
+            headers={"Retry-After": "1"}
+        )
+    except PasswordPoolUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password service temporarily unavailable, please retry later",
+            headers={"Retry-After": "1"}
+        )
 
 # 密码复杂度验证函数
 def validate_password_strength(password: str) -> Tuple[bool, str]:
@@ -64,16 +84,21 @@ def hash_password(password: str) -> str:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=message
         )
-    return pwd_context.hash(password)
+    return _run_password_task(password_hasher.hash, password)
 
 # 密码验证函数
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码是否匹配"""
+def verify_password_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """验证密码是否匹配；已存哈希的成本不符合当前策略时一并返回新哈希"""
     try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception as e:
+        return _run_password_task(password_hasher.verify_and_update, plain_password, hashed_password)
+    except (ValueError, TypeError) as e:
+        # 已存哈希格式无效时视为不匹配；进程池繁忙、超时或不可用时由_run_password_task返回429/503
         logger.error(f"密码验证失败: {str(e)}")
-        return False
+        return False, None
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """验证密码是否匹配"""
+    return verify_password_and_update(plain_password, hashed_password)[0]
 
 # 生成会话ID
 def generate_session_id() -> str:
@@ -126,7 +151,8 @@ def login_user(login_data: UserLoginRequest, db: Session):
         )
     
     # 验证密码
-    if not verify_password(login_data.password, user.password_hash):
+    verified, new_hash = verify_password_and_update(login_data.password, user.password_hash)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password"
@@ -139,8 +165,10 @@ def login_user(login_data: UserLoginRequest, db: Session):
             detail="User account is not active"
         )
     
-    # 更新最后登录时间
+    # 更新最后登录时间；哈希成本与当前策略不符时透明升级
     user.last_login_at = datetime.utcnow()
+    if new_hash:
+        user.password_hash = new_hash
     db.commit()
     
     # 生成会话ID